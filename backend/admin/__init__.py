@@ -7,6 +7,7 @@ from . import routes
 from .activity import activity_routes
 from .articles import articles_routes
 from .auth_admin import auth_admin_routes
+from .metrics import metrics_routes
 from .progress import progress_routes
 from .tryout import tryout_routes
 from .users import users_routes
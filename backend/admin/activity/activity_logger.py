@@ -0,0 +1,283 @@
+# Write-behind logger untuk log aktivitas
+# Event ditampung di antrean in-process lalu ditulis oleh satu thread
+# background dengan insert_many(ordered=False) per collection, setiap
+# ACTIVITY_LOG_BATCH_SIZE event atau ACTIVITY_LOG_FLUSH_MS (mana yang duluan).
+# Request tidak lagi menunggu round trip MongoDB hanya untuk menulis log.
+#
+# - Antrean dibatasi (ACTIVITY_LOG_MAX_QUEUE). Jika penuh, pemanggil
+#   menunggu sebentar (backpressure) lalu menulis langsung supaya event
+#   tidak hilang.
+# - Sisa antrean di-flush saat worker berhenti (atexit).
+# - Batch yang gagal ditulis dicoba ulang (ACTIVITY_LOG_RETRIES, backoff);
+#   jika tetap gagal, dokumen ditulis ke file spill (JSONL) dan dimasukkan
+#   ulang oleh thread writer berikutnya yang start (worker mana pun).
+#   Event tetap bisa hilang jika proses di-kill keras sebelum flush, jadi
+#   rebuild progress memakai collection answers, bukan activity_logs.
+# - ACTIVITY_LOG_BUFFERED=0 → tulis sinkron seperti sebelumnya.
+
+import atexit
+import os
+import queue
+import threading
+import time
+import uuid
+from collections import defaultdict
+
+from bson import json_util
+from pymongo.errors import BulkWriteError
+
+from extensions import mongo
+
+# ======================
+# CONFIG
+# ======================
+ACTIVITY_LOG_BUFFERED = os.getenv("ACTIVITY_LOG_BUFFERED", "1") == "1"
+ACTIVITY_LOG_BATCH_SIZE = int(os.getenv("ACTIVITY_LOG_BATCH_SIZE", "200"))
+ACTIVITY_LOG_FLUSH_MS = float(os.getenv("ACTIVITY_LOG_FLUSH_MS", "500"))
+ACTIVITY_LOG_MAX_QUEUE = int(os.getenv("ACTIVITY_LOG_MAX_QUEUE", "10000"))
+ACTIVITY_LOG_ENQUEUE_TIMEOUT_MS = float(os.getenv("ACTIVITY_LOG_ENQUEUE_TIMEOUT_MS", "50"))
+ACTIVITY_LOG_RETRIES = int(os.getenv("ACTIVITY_LOG_RETRIES", "3"))
+ACTIVITY_LOG_RETRY_BACKOFF_MS = float(os.getenv("ACTIVITY_LOG_RETRY_BACKOFF_MS", "200"))
+# kosong = tidak ada spill, dokumen yang tetap gagal hanya dihitung di "failed"
+ACTIVITY_LOG_SPILL_FILE = os.getenv("ACTIVITY_LOG_SPILL_FILE", "activity_log_spill.jsonl")
+
+DUPLICATE_KEY = 11000
+
+_STOP = object()
+
+
+class ActivityLogger:
+    def __init__(self, enabled=ACTIVITY_LOG_BUFFERED, batch_size=ACTIVITY_LOG_BATCH_SIZE,
+                 flush_ms=ACTIVITY_LOG_FLUSH_MS, max_queue=ACTIVITY_LOG_MAX_QUEUE,
+                 enqueue_timeout_ms=ACTIVITY_LOG_ENQUEUE_TIMEOUT_MS, retries=ACTIVITY_LOG_RETRIES,
+                 retry_backoff_ms=ACTIVITY_LOG_RETRY_BACKOFF_MS, spill_file=ACTIVITY_LOG_SPILL_FILE):
+        self.enabled = enabled
+        self.batch_size = batch_size
+        self.flush_interval = flush_ms / 1000
+        self.enqueue_timeout = enqueue_timeout_ms / 1000
+        self.retries = retries
+        self.retry_backoff = retry_backoff_ms / 1000
+        self.spill_file = spill_file
+
+        self._queue = queue.Queue(maxsize=max_queue)
+        self._lock = threading.Lock()
+        self._thread = None
+        self._closed = False
+
+        self.enqueued = 0
+        self.written = 0
+        self.batches = 0
+        self.sync_writes = 0
+        self.failed = 0
+        self.retried = 0
+        self.spilled = 0
+        self.replayed = 0
+        self.last_flush_ms = None
+
+    # ---------- API ----------
+    def log(self, collection: str, doc: dict) -> None:
+        """
+        Tulis dokumen ke `collection` secara asinkron (write-behind).
+        Yang ditulis salinan dangkal: pymongo menambahkan _id ke dokumen saat
+        insert di thread writer, jadi dict milik pemanggil tidak ikut berubah.
+        """
+        doc = dict(doc)
+        if not self.enabled or self._closed:
+            self._write_now(collection, doc)
+            return
+
+        self._ensure_thread()
+        try:
+            self._queue.put((collection, doc), timeout=self.enqueue_timeout)
+            with self._lock:
+                self.enqueued += 1
+        except queue.Full:
+            # backpressure: penulis tertinggal, tulis langsung di thread pemanggil
+            self._write_now(collection, doc)
+
+    def flush(self) -> None:
+        """Tulis semua event yang masih di antrean (dipanggil di thread pemanggil)."""
+        batch = []
+        while True:
+            try:
+                item = self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if item is not _STOP:
+                batch.append(item)
+        if batch:
+            self._write_batch(batch)
+
+    def close(self, timeout: float = 5.0) -> None:
+        if self._closed:
+            return
+        self._closed = True
+        if self._thread is not None and self._thread.is_alive():
+            try:
+                self._queue.put(_STOP, timeout=timeout)
+            except queue.Full:
+                pass
+            self._thread.join(timeout)
+        self.flush()
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "enabled": self.enabled,
+                "queued": self._queue.qsize(),
+                "max_queue": self._queue.maxsize,
+                "enqueued": self.enqueued,
+                "written": self.written,
+                "batches": self.batches,
+                "avg_batch_size": round(self.written / self.batches, 1) if self.batches else 0.0,
+                "sync_writes": self.sync_writes,
+                "failed": self.failed,
+                "retried": self.retried,
+                "spilled": self.spilled,
+                "replayed": self.replayed,
+                "last_flush_ms": self.last_flush_ms,
+            }
+
+    # ---------- Internal ----------
+    def _ensure_thread(self) -> None:
+        if self._thread is not None and self._thread.is_alive():
+            return
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name="activity-logger", daemon=True)
+                self._thread.start()
+
+    def _run(self) -> None:
+        self.replay_spill()
+        while True:
+            item = self._queue.get()
+            if item is _STOP:
+                return
+
+            batch = [item]
+            deadline = time.monotonic() + self.flush_interval
+            stop = False
+            while len(batch) < self.batch_size:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    item = self._queue.get(timeout=remaining)
+                except queue.Empty:
+                    break
+                if item is _STOP:
+                    stop = True
+                    break
+                batch.append(item)
+
+            self._write_batch(batch)
+            if stop:
+                return
+
+    def replay_spill(self) -> int:
+        """Masukkan ulang dokumen dari file spill. Returns jumlah dokumen yang dicoba."""
+        if not self.spill_file or not os.path.exists(self.spill_file):
+            return 0
+
+        # rename dulu: hanya satu worker yang memproses file yang sama
+        claimed = f"{self.spill_file}.{uuid.uuid4().hex}.replay"
+        try:
+            os.replace(self.spill_file, claimed)
+        except FileNotFoundError:
+            return 0
+
+        by_collection = defaultdict(list)
+        try:
+            with open(claimed, "r", encoding="utf-8") as f:
+                for line in f:
+                    if line.strip():
+                        item = json_util.loads(line)
+                        by_collection[item["collection"]].append(item["doc"])
+        except Exception as e:
+            print("❌ activity_logger spill tidak bisa dibaca:", e)
+            return 0
+
+        total = 0
+        for collection, docs in by_collection.items():
+            total += len(docs)
+            with self._lock:
+                self.replayed += len(docs)
+            self._insert_with_retry(collection, docs)
+        os.remove(claimed)
+        return total
+
+    def _write_now(self, collection: str, doc: dict) -> None:
+        with self._lock:
+            self.sync_writes += 1
+        try:
+            mongo.db[collection].insert_one(doc)
+            with self._lock:
+                self.written += 1
+        except Exception as e:
+            print(f"❌ activity_logger insert {collection} error:", e)
+            self._spill(collection, [doc])
+
+    def _write_batch(self, batch) -> None:
+        start = time.perf_counter()
+        by_collection = defaultdict(list)
+        for collection, doc in batch:
+            by_collection[collection].append(doc)
+
+        for collection, docs in by_collection.items():
+            self._insert_with_retry(collection, docs)
+
+        with self._lock:
+            self.batches += 1
+            self.last_flush_ms = round((time.perf_counter() - start) * 1000, 1)
+
+    def _insert_with_retry(self, collection: str, docs: list) -> None:
+        """
+        insert_many(ordered=False) dengan retry untuk dokumen yang gagal saja.
+        insert_many memberi _id pada dokumen, jadi duplicate key saat retry
+        berarti dokumen sudah tertulis pada percobaan sebelumnya.
+        """
+        pending = docs
+        for attempt in range(self.retries + 1):
+            if attempt:
+                with self._lock:
+                    self.retried += len(pending)
+                time.sleep(self.retry_backoff * 2 ** (attempt - 1))
+
+            try:
+                mongo.db[collection].insert_many(pending, ordered=False)
+                written, pending = len(pending), []
+            except BulkWriteError as e:
+                # ordered=False: dokumen lain tetap tertulis
+                errors = e.details.get("writeErrors", [])
+                failed = {err["index"] for err in errors if err.get("code") != DUPLICATE_KEY}
+                written = len(pending) - len(failed)
+                pending = [doc for i, doc in enumerate(pending) if i in failed]
+            except Exception as e:
+                written = 0
+                print(f"❌ activity_logger bulk {collection} error:", e)
+
+            with self._lock:
+                self.written += written
+            if not pending:
+                return
+
+        print(f"❌ activity_logger bulk {collection}: {len(pending)} gagal setelah {self.retries} retry")
+        self._spill(collection, pending)
+
+    def _spill(self, collection: str, docs: list) -> None:
+        if self.spill_file:
+            try:
+                with self._lock, open(self.spill_file, "a", encoding="utf-8") as f:
+                    for doc in docs:
+                        f.write(json_util.dumps({"collection": collection, "doc": doc}) + "\n")
+                    self.spilled += len(docs)
+                return
+            except Exception as e:
+                print("❌ activity_logger spill error:", e)
+
+        with self._lock:
+            self.failed += len(docs)
+
+
+activity_logger = ActivityLogger()
+atexit.register(activity_logger.close)
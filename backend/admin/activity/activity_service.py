@@ -1,5 +1,6 @@
 from extensions import mongo
 from datetime import datetime
+from .activity_logger import activity_logger
 
 activity_col = mongo.db.activity_logs
 
@@ -10,7 +11,7 @@ def log_activity(user_id: str, action: str, detail: dict):
         "detail": detail,
         "timestamp": datetime.utcnow()
     }
-    activity_col.insert_one(activity)
+    activity_logger.log("activity_logs", activity)
     return activity
 
 def get_user_activity(user_id: str, limit: int = 50):
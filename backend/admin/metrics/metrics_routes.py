@@ -0,0 +1,53 @@
+from flask import jsonify, current_app
+from admin import admin_bp
+from admin.decorators import admin_required
+
+# =====================================================
+# ================= METRICS (ADMIN) ===================
+# =====================================================
+
+@admin_bp.route("/metrics", methods=["GET"])
+@admin_required
+def admin_get_metrics():
+    """
+    Admin lihat statistik runtime worker ini
+    (cache chatbot, dsb). Angka bersifat per-proses.
+    """
+    try:
+        from chatbot.service import (
+            retrievers,
+            embedding_batch_stats,
+            retrieval_cache,
+            semantic_cache,
+            vectorstores
+        )
+        from admin.activity.activity_logger import activity_logger
+        from chatbot.question_pool import question_pool
+        from extensions import pool_metrics
+        from llm.prompt_cache import prompt_cache
+        from llm.resilience import llm_guard
+        from llm.singleflight import singleflight
+
+        return jsonify({
+            "status": "success",
+            "metrics": {
+                "semantic_cache": semantic_cache.stats(),
+                "prompt_cache": prompt_cache.stats(),
+                "singleflight": singleflight.stats(),
+                "llm_resilience": llm_guard.stats(),
+                "vectorstores": vectorstores.stats(),
+                "retrievers": retrievers.stats(),
+                "embedding_batcher": embedding_batch_stats(),
+                "retrieval_cache": retrieval_cache.stats() if retrieval_cache else None,
+                "question_pool": question_pool.stats(),
+                "activity_logger": activity_logger.stats(),
+                "mongo_pool": pool_metrics.stats(),
+            }
+        }), 200
+
+    except Exception as e:
+        current_app.logger.error(f"Admin get metrics error: {e}")
+        return jsonify({
+            "status": "error",
+            "message": "Gagal mengambil metrics"
+        }), 500
@@ -1,12 +1,19 @@
-from flask import request, jsonify, current_app
+import csv
+import io
+import json
+
+from bson import ObjectId
+from flask import Response, request, jsonify, current_app, stream_with_context
 from flask_jwt_extended import jwt_required, get_jwt_identity
 
 from admin import admin_bp
 from admin.decorators import admin_required
 from admin.progress.progress_service import (
+    get_progress_page,
+    get_progress_stats,
     get_user_progress,
-    update_user_progress,
-    progress_col
+    iter_all_progress,
+    update_user_progress
 )
 
 
@@ -79,21 +86,122 @@ def update_progress():
 # ================= PROGRESS (ADMIN) ==================
 # =====================================================
 
+PROGRESS_PAGE_MAX_LIMIT = 1000
+PROGRESS_CSV_FIELDS = [
+    "user_id", "literasi", "numerik", "sains", "rating", "rating_count",
+    "total_lessons", "streak_days", "last_activity_date",
+]
+
+
+def _ndjson_lines(docs):
+    for doc in docs:
+        yield json.dumps(doc, default=str) + "\n"
+
+
+def _csv_lines(docs):
+    buffer = io.StringIO()
+    writer = csv.DictWriter(buffer, fieldnames=PROGRESS_CSV_FIELDS, extrasaction="ignore")
+    writer.writeheader()
+    for doc in docs:
+        writer.writerow(doc)
+        yield buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate(0)
+    # header saja jika collection kosong
+    if buffer.getvalue():
+        yield buffer.getvalue()
+
+
+def _legacy_json(docs):
+    """Bentuk respons lama ({status, total, progress}) tapi di-stream per dokumen."""
+    yield '{"status": "success", "progress": ['
+    total = 0
+    for doc in docs:
+        yield ("," if total else "") + json.dumps(doc, default=str)
+        total += 1
+    yield f'], "total": {total}}}'
+
+
 @admin_bp.route("/progress/all", methods=["GET"])
 @admin_required
 def get_all_progress():
-    """Admin lihat semua progress user"""
+    """
+    Admin lihat semua progress user.
+
+    - ?limit=N[&after=<cursor>]  → satu halaman (keyset), plus next_cursor
+    - ?format=ndjson | csv       → export streaming seluruh progress
+    - tanpa parameter            → bentuk lama {status, total, progress},
+                                   di-stream dari cursor tanpa list() di memori
+    """
     try:
-        all_progress = list(progress_col.find({}, {"_id": 0}))
+        export_format = request.args.get("format")
+        limit = request.args.get("limit")
+        after = request.args.get("after")
+
+        if export_format in ("ndjson", "csv"):
+            docs = iter_all_progress()
+            if export_format == "ndjson":
+                return Response(stream_with_context(_ndjson_lines(docs)),
+                                mimetype="application/x-ndjson")
+            return Response(
+                stream_with_context(_csv_lines(docs)),
+                mimetype="text/csv",
+                headers={"Content-Disposition": "attachment; filename=progress.csv"}
+            )
+
+        if export_format:
+            return jsonify({
+                "status": "error",
+                "message": "format harus ndjson atau csv"
+            }), 400
+
+        if limit is not None or after is not None:
+            try:
+                limit = max(1, min(int(limit or 100), PROGRESS_PAGE_MAX_LIMIT))
+                if after and not ObjectId.is_valid(after):
+                    raise ValueError(after)
+            except ValueError:
+                return jsonify({
+                    "status": "error",
+                    "message": "limit / after tidak valid"
+                }), 400
+
+            progress, next_cursor = get_progress_page(limit, after)
+            return jsonify({
+                "status": "success",
+                "progress": progress,
+                "limit": limit,
+                "next_cursor": next_cursor
+            }), 200
+
+        return Response(stream_with_context(_legacy_json(iter_all_progress())),
+                        mimetype="application/json")
+
+    except Exception as e:
+        current_app.logger.error(f"Get all progress error: {e}")
+        return jsonify({
+            "status": "error",
+            "message": "Terjadi kesalahan server"
+        }), 500
+
+
+@admin_bp.route("/progress/stats", methods=["GET"])
+@admin_required
+def get_progress_statistics():
+    """
+    Admin lihat rata-rata progress (global atau ?kelas=N).
+    Dibaca dari ringkasan materialized; stale_seconds = umur data.
+    """
+    try:
+        stats = get_progress_stats(request.args.get("kelas"))
 
         return jsonify({
             "status": "success",
-            "total": len(all_progress),
-            "progress": all_progress
+            "stats": stats
         }), 200
 
     except Exception as e:
-        current_app.logger.error(f"Get all progress error: {e}")
+        current_app.logger.error(f"Get progress stats error: {e}")
         return jsonify({
             "status": "error",
             "message": "Terjadi kesalahan server"
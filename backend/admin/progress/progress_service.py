@@ -1,13 +1,20 @@
-from pymongo import MongoClient
-from datetime import datetime
+from pymongo import ReplaceOne, ReturnDocument, UpdateOne
+from pymongo.errors import DuplicateKeyError
+from datetime import datetime, timedelta
 from bson import ObjectId
 import os
-from ..activity.activity_service import activity_col
+import threading
+import time
+import uuid
+from extensions import mongo
 
-# --- Setup koneksi MongoDB ---
-client = MongoClient(os.getenv("MONGO_URI", "mongodb://localhost:27017"))
-db = client["tutor_app"]
-progress_col = db["progress"]
+# pool & database yang sama dengan seluruh aplikasi (MONGODB_URI)
+progress_col = mongo.db.progress
+# sumber rebuild: satu dokumen per jawaban, ditulis sinkron (chatbot/answers.py);
+# activity_logs ditulis write-behind sehingga bisa kehilangan event
+answers_col = mongo.db.answers
+
+VALID_THEMES = ("literasi", "numerik", "sains")
 
 # ------------------ Fungsi Progress User ------------------ #
 def get_user_progress(user_id: str):
@@ -37,10 +44,37 @@ def update_user_progress(user_id: str, data: dict):
     return get_user_progress(user_id)
 
 # ------------------ Fungsi untuk Admin ------------------ #
-def get_all_progress():
-    """Ambil progress semua user (rekap untuk Admin Dashboard)."""
-    progresses = list(progress_col.find({}, {"_id": 0}))
-    return progresses
+def _public_progress(doc: dict) -> dict:
+    """_id diganti user_id (string) supaya bisa di-serialize."""
+    _id = doc.pop("_id", None)
+    doc.setdefault("user_id", str(_id))
+    return doc
+
+
+def get_progress_page(limit: int = 100, after: str = None):
+    """
+    Satu halaman progress, urut _id (keyset pagination).
+
+    Returns:
+        (list progress, next_cursor | None)
+    """
+    query = {}
+    if after:
+        query["_id"] = {"$gt": ObjectId(after)}
+
+    docs = list(progress_col.find(query).sort("_id", 1).limit(limit))
+    next_cursor = str(docs[-1]["_id"]) if len(docs) == limit else None
+    return [_public_progress(doc) for doc in docs], next_cursor
+
+
+def iter_all_progress(batch_size: int = 1000):
+    """Generator progress semua user langsung dari cursor Mongo (memori konstan)."""
+    cursor = progress_col.find({}).sort("_id", 1).batch_size(batch_size)
+    try:
+        for doc in cursor:
+            yield _public_progress(doc)
+    finally:
+        cursor.close()
 
 
 def admin_update_progress(user_id: str, data: dict):
@@ -56,67 +90,312 @@ def admin_update_progress(user_id: str, data: dict):
     return get_user_progress(user_id)
 
 
-def get_progress_stats():
-    """Hitung statistik global progress semua user."""
+# ------------------ Statistik (materialized) ------------------ #
+# Ringkasan per kelas + global disimpan di collection progress_stats oleh
+# refresh_progress_stats(). Dashboard cukup membaca 1 dokumen; umur data
+# dilaporkan lewat stale_seconds. Refresher berjalan di setiap worker, tapi
+# hanya pemegang lease (progress_stats_state) yang benar-benar menghitung.
+PROGRESS_STATS_REFRESH_INTERVAL = int(os.getenv("PROGRESS_STATS_REFRESH_INTERVAL", "60"))
+PROGRESS_STATS_LEASE_SECONDS = int(os.getenv("PROGRESS_STATS_LEASE_SECONDS", "300"))
+
+stats_col = mongo.db.progress_stats
+stats_state_col = mongo.db.progress_stats_state
+
+STATS_LEASE_KEY = "refresh"
+# token dibuat saat import (bisa sebelum fork gunicorn --preload), jadi
+# owner lease selalu disertai pid proses yang memegangnya
+_LEASE_TOKEN = uuid.uuid4().hex
+
+
+def _stats_group(group_id) -> dict:
+    return {
+        "_id": group_id,
+        "avg_literasi": {"$avg": "$literasi"},
+        "avg_numerik": {"$avg": "$numerik"},
+        "avg_sains": {"$avg": "$sains"},
+        "avg_total_lessons": {"$avg": "$total_lessons"},
+        "total_users": {"$sum": 1},
+    }
+
+
+def _stats_lease_owner() -> str:
+    return f"{os.getpid()}-{_LEASE_TOKEN}"
+
+
+def _acquire_stats_lease() -> bool:
+    now = time.time()
+    try:
+        stats_state_col.find_one_and_update(
+            {
+                "_id": STATS_LEASE_KEY,
+                "$or": [
+                    {"lease_until": {"$exists": False}},
+                    {"lease_until": {"$lt": now}},
+                    {"lease_owner": _stats_lease_owner()},
+                ],
+            },
+            {"$set": {"lease_until": now + PROGRESS_STATS_LEASE_SECONDS,
+                      "lease_owner": _stats_lease_owner()}},
+            upsert=True
+        )
+        return True
+    except DuplicateKeyError:
+        # lease dipegang worker lain
+        return False
+
+
+def _release_stats_lease() -> None:
+    stats_state_col.update_one(
+        {"_id": STATS_LEASE_KEY, "lease_owner": _stats_lease_owner()},
+        {"$set": {"lease_until": 0}}
+    )
+
+
+def refresh_progress_stats() -> datetime:
+    """
+    Hitung ulang progress_stats (per kelas + global) dalam satu agregasi.
+    Kelas diambil dari users lewat $lookup. Hasilnya hanya beberapa dokumen
+    (satu per kelas + global), ditulis dengan upsert; dokumen yang tidak
+    ada di hasil run ini (kelas tanpa user) dihapus.
+
+    Tidak memakai lease (dipakai juga oleh CLI rebuild_progress); refresher
+    periodik lewat refresh_progress_stats_if_due.
+    """
+    now = datetime.utcnow()
     pipeline = [
-        {"$group": {
-            "_id": None,
-            "avg_literasi": {"$avg": "$literasi"},
-            "avg_numerik": {"$avg": "$numerik"},
-            "avg_sains": {"$avg": "$sains"},
-            "total_users": {"$sum": 1}
-        }}
+        {"$lookup": {"from": "users", "localField": "_id", "foreignField": "_id", "as": "user"}},
+        {"$project": {
+            **{theme: 1 for theme in VALID_THEMES},
+            "total_lessons": 1,
+            "kelas": {"$ifNull": [{"$arrayElemAt": ["$user.kelas", 0]}, "unknown"]},
+        }},
+        {"$facet": {
+            "per_kelas": [
+                {"$group": _stats_group({"$concat": ["kelas:", {"$toString": "$kelas"}]})},
+                {"$set": {"scope": "kelas"}},
+            ],
+            "global": [
+                {"$group": _stats_group("global")},
+                {"$set": {"scope": "global"}},
+            ],
+        }},
+        {"$project": {"docs": {"$concatArrays": ["$per_kelas", "$global"]}}},
+        {"$unwind": "$docs"},
+        {"$replaceRoot": {"newRoot": "$docs"}},
+        {"$set": {"refreshed_at": now}},
     ]
-    stats = list(progress_col.aggregate(pipeline))
-    return stats[0] if stats else {}
+    docs = list(progress_col.aggregate(pipeline, allowDiskUse=True))
 
+    if docs:
+        stats_col.bulk_write([ReplaceOne({"_id": d["_id"]}, d, upsert=True) for d in docs])
+    # kelas yang tidak lagi punya user tidak ada di hasil run ini
+    stats_col.delete_many({"_id": {"$nin": [d["_id"] for d in docs]}})
+    return now
 
-def recalc_progress(user_id: str):
-    """Hitung ulang progress user dari semua activity_logs"""
-    logs = list(activity_col.find({"user_id": str(user_id)}, {"_id": 0}))
 
-    # progress default (tidak ada _id)
-    progress = {
+def _stats_due(max_age: int) -> bool:
+    current = stats_col.find_one({"_id": "global"}, {"refreshed_at": 1})
+    return not current or (datetime.utcnow() - current["refreshed_at"]).total_seconds() >= max_age
+
+
+def refresh_progress_stats_if_due(max_age: int = PROGRESS_STATS_REFRESH_INTERVAL) -> bool:
+    """
+    Refresh hanya jika ringkasan global lebih tua dari max_age dan lease
+    didapat, sehingga dari banyak worker hanya satu yang menghitung.
+    """
+    if not _stats_due(max_age):
+        return False
+    if not _acquire_stats_lease():
+        return False
+    try:
+        # cek ulang setelah lease: worker lain bisa saja baru selesai
+        if not _stats_due(max_age):
+            return False
+        refresh_progress_stats()
+        return True
+    finally:
+        _release_stats_lease()
+
+
+def start_stats_refresher(interval: int = PROGRESS_STATS_REFRESH_INTERVAL):
+    def _run():
+        while True:
+            try:
+                refresh_progress_stats_if_due(interval)
+            except Exception as e:
+                print("❌ refresh_progress_stats error:", e)
+            time.sleep(interval)
+
+    thread = threading.Thread(target=_run, name="progress-stats", daemon=True)
+    thread.start()
+    return thread
+
+
+def get_progress_stats(kelas: str = None):
+    """
+    Statistik progress (global atau per kelas) dari progress_stats, O(1).
+
+    Returns:
+        dict statistik + refreshed_at + stale_seconds; {} jika belum ada data
+    """
+    key = f"kelas:{kelas}" if kelas else "global"
+    stats = stats_col.find_one({"_id": key})
+    if stats is None and not stats_col.find_one({"_id": "global"}, {"_id": 1}):
+        # belum pernah di-refresh (mis. deploy pertama); jika worker lain
+        # sedang menghitung, kembalikan kosong dulu
+        refresh_progress_stats_if_due(0)
+        stats = stats_col.find_one({"_id": key})
+    if not stats:
+        return {}
+
+    stats.pop("_id", None)
+    stats["stale_seconds"] = round((datetime.utcnow() - stats["refreshed_at"]).total_seconds(), 1)
+    stats["refresh_interval_seconds"] = PROGRESS_STATS_REFRESH_INTERVAL
+    return stats
+
+
+def _activity_day_fields(user_id: str, today) -> dict:
+    """
+    Ekspresi $set (update pipeline) untuk streak + tanggal aktivitas.
+    Semua ekspresi dalam satu $set membaca nilai LAMA dokumen, jadi
+    streak dihitung dari last_activity_date sebelum di-overwrite.
+    """
+    today_str = today.isoformat()
+    yesterday_str = (today - timedelta(days=1)).isoformat()
+    streak = {"$ifNull": ["$streak_days", 0]}
+
+    return {
         "user_id": str(user_id),
-        "literasi": 0,
-        "numerik": 0,
-        "sains": 0,
-        "rating": 0,
-        "total_lessons": len(logs),
-        "streak_days": 0
+        "streak_days": {"$switch": {
+            "branches": [
+                # masih di hari yang sama
+                {"case": {"$eq": ["$last_activity_date", today_str]}, "then": {"$max": [streak, 1]}},
+                # belajar berturut-turut
+                {"case": {"$eq": ["$last_activity_date", yesterday_str]}, "then": {"$add": [streak, 1]}},
+            ],
+            # belum pernah / bolong → reset
+            "default": 1,
+        }},
+        "last_activity_date": today_str,
+        "rating": {"$ifNull": ["$rating", 0]},
+        "rating_count": {"$ifNull": ["$rating_count", 0]},
     }
 
-    if not logs:
-        # buat baru kalau belum ada
-        progress_col.update_one(
-            {"_id": ObjectId(user_id)},
-            {"$set": progress},
-            upsert=True
-        )
-        return progress
 
-    # hanya hitung kategori valid
-    valid_themes = {"literasi", "numerik", "sains"}
+def record_answer_progress(user_id: str, theme: str, score: int):
+    """
+    Update progress saat user menjawab 1 soal: skor theme, total_lessons,
+    streak dan last_activity_date dalam SATU update pipeline (upsert) di
+    server. Tidak ada find_one sebelumnya, sehingga jawaban bersamaan dari
+    user yang sama tidak saling menimpa.
+
+    Returns:
+        dokumen progress setelah update (tanpa _id)
+    """
+    today = datetime.now().date()
+    fields = _activity_day_fields(user_id, today)
+
+    for t in VALID_THEMES:
+        added = int(score) if t == theme else 0
+        fields[t] = {"$add": [{"$ifNull": ["$" + t, 0]}, added]}
+    fields["total_lessons"] = {"$add": [{"$ifNull": ["$total_lessons", 0]}, 1]}
+
+    return progress_col.find_one_and_update(
+        {"_id": ObjectId(user_id)},
+        [{"$set": fields}],
+        projection={"_id": 0},
+        upsert=True,
+        return_document=ReturnDocument.AFTER
+    )
 
-    for log in logs:
-        theme = log.get("theme")
-        score = int(log.get("score", 0))
-        if theme in valid_themes:
-            progress[theme] += score
 
-    # pastikan _id tidak ikut di-set
-    update_data = {k: v for k, v in progress.items() if k != "_id"}
+def record_activity_day(user_id: str):
+    """Update streak saja (mis. user mengobrol dengan chatbot), satu round trip."""
+    today = datetime.now().date()
+    fields = _activity_day_fields(user_id, today)
+    for t in VALID_THEMES:
+        fields[t] = {"$ifNull": ["$" + t, 0]}
+    fields["total_lessons"] = {"$ifNull": ["$total_lessons", 0]}
+
+    progress_col.update_one({"_id": ObjectId(user_id)}, [{"$set": fields}], upsert=True)
+
+
+# ------------------ Rebuild (offline) ------------------ #
+def _score_pipeline(match: dict):
+    """Jumlah skor per theme + total soal dijawab per user dari answers, dihitung di server."""
+    return [
+        {"$match": match},
+        {"$group": {
+            "_id": "$user_id",
+            **{
+                theme: {"$sum": {"$cond": [{"$eq": ["$theme", theme]}, {"$ifNull": ["$score", 0]}, 0]}}
+                for theme in VALID_THEMES
+            },
+            "total_lessons": {"$sum": 1},
+        }},
+    ]
+
+
+def _rebuilt_fields(row: dict) -> dict:
+    # streak & rating tidak bisa dihitung ulang dari answers; dibiarkan apa adanya
+    return {
+        "user_id": str(row["_id"]),
+        **{theme: int(row[theme]) for theme in VALID_THEMES},
+        "total_lessons": row["total_lessons"],
+    }
+
+
+def recalc_progress(user_id: str):
+    """
+    Hitung ulang progress 1 user dari answers (repair).
+    Tidak lagi dipanggil per jawaban; lihat record_answer_progress.
+    """
+    rows = list(answers_col.aggregate(_score_pipeline({"user_id": str(user_id)})))
+    progress = _rebuilt_fields(rows[0]) if rows else {
+        "user_id": str(user_id),
+        **{theme: 0 for theme in VALID_THEMES},
+        "total_lessons": 0,
+    }
 
-    # simpan ke collection progress
     progress_col.update_one(
         {"_id": ObjectId(user_id)},
-        {"$set": update_data},
+        {"$set": progress},
         upsert=True
     )
-
     return progress
 
 
+def rebuild_all_progress(batch_size: int = 500) -> int:
+    """
+    Rekonsiliasi progress SEMUA user dari answers dalam satu agregasi,
+    ditulis dengan bulk_write per batch. Untuk job offline / cron.
+
+    Returns:
+        jumlah user yang ditulis
+    """
+    ops = []
+    written = 0
+
+    for row in answers_col.aggregate(_score_pipeline({}), allowDiskUse=True):
+        if not ObjectId.is_valid(str(row["_id"])):
+            continue
+        ops.append(UpdateOne(
+            {"_id": ObjectId(str(row["_id"]))},
+            {"$set": _rebuilt_fields(row)},
+            upsert=True
+        ))
+        if len(ops) >= batch_size:
+            progress_col.bulk_write(ops, ordered=False)
+            written += len(ops)
+            ops = []
+
+    if ops:
+        progress_col.bulk_write(ops, ordered=False)
+        written += len(ops)
+
+    return written
+
+
 def update_feedback_score(user_id: str, new_score: int):
     """
     Update rata-rata rating (1–5) user setiap kali memberi feedback chatbot.
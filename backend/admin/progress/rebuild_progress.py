@@ -0,0 +1,51 @@
+# Job offline: bangun ulang progress dari collection answers
+# Progress harian di-update inkremental saat user menjawab soal
+# (record_answer_progress). Job ini untuk perbaikan / rekonsiliasi.
+# Sumbernya answers (ditulis sinkron per jawaban), bukan activity_logs yang
+# ditulis write-behind. Data lama: jalankan dulu python -m chatbot.answers --backfill
+#
+#   python -m admin.progress.rebuild_progress                 # semua user
+#   python -m admin.progress.rebuild_progress --user <user_id>
+#   python -m admin.progress.rebuild_progress --stats          # refresh progress_stats saja
+
+import argparse
+import os
+import time
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Rebuild progress user dari answers")
+    parser.add_argument("--user", help="hanya 1 user (default: semua user)")
+    parser.add_argument("--batch-size", type=int, default=500)
+    parser.add_argument("--stats", action="store_true", help="hanya refresh ringkasan progress_stats")
+    args = parser.parse_args(argv)
+
+    os.environ["QUESTION_POOL_WORKER"] = "0"
+    os.environ["PROGRESS_STATS_REFRESH_ON_START"] = "0"
+    from app import create_app
+    app = create_app()
+
+    with app.app_context():
+        # diimpor setelah app dibuat: progress_service memakai mongo.db saat import
+        from admin.progress.progress_service import (
+            rebuild_all_progress,
+            recalc_progress,
+            refresh_progress_stats
+        )
+
+        start = time.perf_counter()
+        if args.stats:
+            refreshed_at = refresh_progress_stats()
+            print(f"✅ progress_stats di-refresh ({refreshed_at.isoformat()})")
+        elif args.user:
+            progress = recalc_progress(args.user)
+            print(f"✅ Progress {args.user}: {progress}")
+        else:
+            written = rebuild_all_progress(batch_size=args.batch_size)
+            print(f"✅ {written} progress user dibangun ulang")
+            refresh_progress_stats()
+        print(f"   selesai dalam {time.perf_counter() - start:.1f} detik")
+
+
+if __name__ == "__main__":
+    main()
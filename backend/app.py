@@ -1,11 +1,14 @@
 from flask import Flask, jsonify, request, session
-from extensions import mongo
+from extensions import mongo, mongo_client_options
 from flask_cors import CORS
 from flask_jwt_extended import JWTManager
 from datetime import timedelta
+import importlib
 import logging
 import os
 import json
+import threading
+import time
 from dotenv import load_dotenv
 from bson.objectid import ObjectId
 from flask import send_from_directory
@@ -38,7 +41,8 @@ def create_app():
     # -----------------------------
     # 🔗 Initialize Extensions
     # -----------------------------
-    mongo.init_app(app)
+    # pool size, timeout, read/write concern + pool metrics (lihat extensions.py)
+    mongo.init_app(app, **mongo_client_options())
     jwt.init_app(app)
     
     # -----------------------------
@@ -76,13 +80,71 @@ def create_app():
     # -----------------------------
     # 📦 Register Blueprints
     # -----------------------------
-    from auth.routes import auth_bp
-    from admin.routes import admin_bp
-    from chatbot.routes import chatbot_bp
-    
-    app.register_blueprint(chatbot_bp, url_prefix="/chatbot")
-    app.register_blueprint(auth_bp, url_prefix='/auth')
-    app.register_blueprint(admin_bp, url_prefix='/admin')
+    # (nama, modul, atribut blueprint, url_prefix) — urutan import dipertahankan
+    blueprints = [
+        ("auth", "auth.routes", "auth_bp", "/auth"),
+        ("admin", "admin.routes", "admin_bp", "/admin"),
+        ("chatbot", "chatbot.routes", "chatbot_bp", "/chatbot"),
+    ]
+
+    startup_report = {"blueprints": {}, "models": {}}
+    app.extensions["startup_report"] = startup_report
+    app_start = time.perf_counter()
+
+    for name, module_path, bp_attr, url_prefix in blueprints:
+        t0 = time.perf_counter()
+        module = importlib.import_module(module_path)
+        t1 = time.perf_counter()
+        app.register_blueprint(getattr(module, bp_attr), url_prefix=url_prefix)
+        t2 = time.perf_counter()
+
+        startup_report["blueprints"][name] = {
+            "import_ms": round((t1 - t0) * 1000, 1),
+            "register_ms": round((t2 - t1) * 1000, 1),
+        }
+        app.logger.info(
+            f"📦 Blueprint {name}: import {startup_report['blueprints'][name]['import_ms']} ms, "
+            f"register {startup_report['blueprints'][name]['register_ms']} ms"
+        )
+
+    startup_report["blueprints_total_ms"] = round((time.perf_counter() - app_start) * 1000, 1)
+
+    # -----------------------------
+    # 🔥 Warm-up model chatbot (opsional)
+    # -----------------------------
+    # Model chatbot dimuat lazy. CHATBOT_WARMUP_ON_START=1 memuat di background
+    # saat boot supaya /chatbot/ready cepat 200 tanpa menahan startup worker.
+    # Tanpa flag ini, probe /chatbot/ready sendiri yang memicu warm-up.
+    def _warmup_models():
+        from chatbot.service import warmup
+        try:
+            startup_report["models"] = warmup()
+            app.logger.info(f"🔥 Chatbot models warm: {startup_report['models']}")
+        except Exception as e:
+            app.logger.error(f"❌ Chatbot warm-up failed: {str(e)}")
+
+    if os.getenv("CHATBOT_WARMUP_ON_START", "0") == "1":
+        threading.Thread(target=_warmup_models, name="chatbot-warmup", daemon=True).start()
+
+    # -----------------------------
+    # 🧺 Worker pool soal
+    # -----------------------------
+    # Mengisi soal baru di background supaya /chatbot/get_question tidak
+    # menunggu LLM. Aman dijalankan di banyak worker (lease per kombinasi).
+    if os.getenv("QUESTION_POOL_WORKER", "1") == "1":
+        from chatbot.question_pool import question_pool
+        question_pool.start()
+        app.logger.info("🧺 Question pool worker started")
+
+    # -----------------------------
+    # 📊 Refresh statistik progress
+    # -----------------------------
+    # progress_stats di-refresh periodik; thread jalan di tiap worker, tapi
+    # hanya pemegang lease Mongo yang menghitung, dan hanya jika ringkasan
+    # sudah lebih tua dari interval.
+    if os.getenv("PROGRESS_STATS_REFRESH_ON_START", "1") == "1":
+        from admin.progress.progress_service import start_stats_refresher
+        start_stats_refresher()
     
     # -----------------------------
     # 🏠 Default Route
@@ -154,6 +216,17 @@ def create_app():
         return send_from_directory(upload_dir, filename)
 
 
+    # -----------------------------
+    # ⏱️ Startup Report
+    # -----------------------------
+    @app.route('/api/startup-report')
+    def startup_report_view():
+        from chatbot.service import MODEL_LOAD_TIMES
+        return jsonify({
+            **startup_report,
+            "models": dict(MODEL_LOAD_TIMES),
+        })
+
     # -----------------------------
     # 🔍 Test Koneksi Database
     # -----------------------------
@@ -184,8 +257,9 @@ def create_app():
     @app.route('/api/db-init')
     def init_database():
         try:
+            from models.indexes import ensure_indexes
             from models.user import User
-            User.create_indexes()
+            index_report = ensure_indexes(mongo.db, log=app.logger.error)
             
             admin_email = 'admin@tutorbelajar.com'
             admin = User.get_by_email(admin_email)
@@ -205,7 +279,8 @@ def create_app():
                 'message': 'Database initialized successfully',
                 'admin_created': admin is None,
                 'total_users': user_count,
-                'admin_email': admin_email
+                'admin_email': admin_email,
+                'indexes': index_report
             })
         except Exception as e:
             app.logger.error(f'Database initialization error: {str(e)}')
@@ -235,6 +310,19 @@ def create_app():
             app.logger.info("✅ MongoDB connection established")
         except Exception as e:
             app.logger.error(f"❌ MongoDB connection failed: {str(e)}")
+
+        # index idempotent; DB_ENSURE_INDEXES_ON_START=0 jika dikelola lewat
+        # `python -m models.indexes` di pipeline deploy
+        if os.getenv("DB_ENSURE_INDEXES_ON_START", "1") == "1":
+            try:
+                from models.indexes import ensure_indexes
+                t0 = time.perf_counter()
+                index_report = ensure_indexes(mongo.db, log=app.logger.error)
+                startup_report["indexes_ms"] = round((time.perf_counter() - t0) * 1000, 1)
+                startup_report["index_errors"] = index_report["errors"]
+                app.logger.info(f"🗂️ MongoDB indexes ensured in {startup_report['indexes_ms']} ms")
+            except Exception as e:
+                app.logger.error(f"❌ Ensure indexes failed: {str(e)}")
     
     return app
 
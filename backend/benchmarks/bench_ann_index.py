@@ -0,0 +1,120 @@
+"""
+Benchmark offline recall vs latency: index ANN (HNSW / IVF-PQ) dibanding flat,
+memakai chunk buku milik kita sendiri (vectorstore hasil python -m chatbot.soal).
+
+Query diambil dari potongan teks chunk acak (kalimat pembuka), di-embed
+dengan model yang sama. Ground truth = top-k index flat.
+
+Jalankan dari folder backend:
+    python -m benchmarks.bench_ann_index --kelas 1 --queries 200 --k 3
+    python -m benchmarks.bench_ann_index --kelas 1 --ef-search 16 32 64 128 --nprobe 4 8 16 32
+"""
+
+import argparse
+import os
+import pickle
+import random
+import statistics
+import time
+
+import faiss
+import numpy as np
+
+from chatbot.service import EMBEDDING_MODEL
+from chatbot.soal import FLAT_SUBDIR
+from chatbot.vectorstore import VECTORSTORE_DIR, build_ann_index
+
+
+def _flat_path(out_dir, kelas):
+    nested = os.path.join(out_dir, kelas, FLAT_SUBDIR)
+    return nested if os.path.exists(os.path.join(nested, "index.faiss")) else os.path.join(out_dir, kelas)
+
+
+def _search_timed(index, queries, k):
+    latencies, results = [], []
+    for q in queries:
+        start = time.perf_counter()
+        _, ids = index.search(q.reshape(1, -1), k)
+        latencies.append((time.perf_counter() - start) * 1000)
+        results.append(ids[0])
+    latencies.sort()
+    return results, {
+        "p50_ms": round(latencies[len(latencies) // 2], 3),
+        "p95_ms": round(latencies[int(len(latencies) * 0.95) - 1], 3),
+        "mean_ms": round(statistics.mean(latencies), 3),
+    }
+
+
+def _recall(results, truth, k):
+    hits = sum(len(set(r[:k]) & set(t[:k])) for r, t in zip(results, truth))
+    return round(hits / (k * len(truth)), 4)
+
+
+def _size_mb(index):
+    return round(faiss.serialize_index(index).nbytes / 1024 / 1024, 2)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--out", default=VECTORSTORE_DIR)
+    parser.add_argument("--kelas", required=True)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--k", type=int, default=3)
+    parser.add_argument("--hnsw-m", type=int, default=32)
+    parser.add_argument("--ef-search", type=int, nargs="+", default=[16, 32, 64, 128])
+    parser.add_argument("--pq-m", type=int, default=48)
+    parser.add_argument("--nprobe", type=int, nargs="+", default=[4, 8, 16, 32])
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    from langchain_community.embeddings import HuggingFaceEmbeddings
+
+    path = _flat_path(args.out, args.kelas)
+    flat = faiss.read_index(os.path.join(path, "index.faiss"))
+    with open(os.path.join(path, "index.pkl"), "rb") as f:
+        docstore, index_to_docstore_id = pickle.load(f)
+
+    vectors = flat.reconstruct_n(0, flat.ntotal)
+    print(f"📚 Kelas {args.kelas}: {flat.ntotal} chunk, dim {flat.d}")
+
+    # 🔹 Query dari kalimat pembuka chunk acak
+    rng = random.Random(args.seed)
+    positions = rng.sample(range(flat.ntotal), min(args.queries, flat.ntotal))
+    texts = [docstore.search(index_to_docstore_id[i]).page_content[:200] for i in positions]
+    embeddings = HuggingFaceEmbeddings(model_name=EMBEDDING_MODEL)
+    queries = np.asarray(embeddings.embed_documents(texts), dtype="float32")
+
+    truth, flat_latency = _search_timed(flat, queries, args.k)
+    rows = [("flat", "-", 1.0, flat_latency, _size_mb(flat), 0.0)]
+
+    # 🔹 HNSW
+    start = time.perf_counter()
+    hnsw, _ = build_ann_index(vectors, "hnsw", {"m": args.hnsw_m})
+    hnsw_build = round(time.perf_counter() - start, 2)
+    for ef in args.ef_search:
+        hnsw.hnsw.efSearch = ef
+        results, latency = _search_timed(hnsw, queries, args.k)
+        rows.append(("hnsw", f"M={args.hnsw_m} efSearch={ef}", _recall(results, truth, args.k),
+                     latency, _size_mb(hnsw), hnsw_build))
+
+    # 🔹 IVF-PQ
+    start = time.perf_counter()
+    ivfpq, meta = build_ann_index(vectors, "ivfpq", {"pq_m": args.pq_m})
+    ivf_build = round(time.perf_counter() - start, 2)
+    if meta["type"] == "ivfpq":
+        ivf = faiss.extract_index_ivf(ivfpq)
+        for nprobe in args.nprobe:
+            ivf.nprobe = nprobe
+            results, latency = _search_timed(ivfpq, queries, args.k)
+            rows.append(("ivfpq", f"nlist={meta['params']['nlist']} m={meta['params']['pq_m']} nprobe={nprobe}",
+                         _recall(results, truth, args.k), latency, _size_mb(ivfpq), ivf_build))
+
+    print(f"\n{'type':<6} {'params':<36} {'recall@' + str(args.k):>9} {'p50 ms':>8} {'p95 ms':>8} "
+          f"{'size MB':>8} {'build s':>8}")
+    for index_type, params, recall, latency, size, build in rows:
+        print(f"{index_type:<6} {params:<36} {recall:>9} {latency['p50_ms']:>8} {latency['p95_ms']:>8} "
+              f"{size:>8} {build:>8}")
+
+
+if __name__ == "__main__":
+    main()
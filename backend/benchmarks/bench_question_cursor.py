@@ -0,0 +1,146 @@
+"""
+Benchmark: memilih "soal berikutnya yang belum dijawab" untuk user dengan
+riwayat jawaban panjang.
+
+Membandingkan cara lama (distinct semua soal_id yang pernah dijawab lalu
+find dengan $nin) dengan cursor per user (chatbot/question_cursor.py).
+Setiap iterasi mengambil `--count` soal (seperti /get_questions) lalu
+"menjawabnya" (insert activity_logs + answers), kecuali `--skip` soal pertama
+yang diberikan: soal itu dibiarkan tidak pernah dijawab (lubang) dan terus
+ditawarkan ulang. p50 awal vs akhir menunjukkan apakah biaya tumbuh seiring
+riwayat.
+
+Butuh MongoDB (database terpisah, dihapus di akhir):
+    python -m benchmarks.bench_question_cursor --answered 10000 --iterations 200
+    python -m benchmarks.bench_question_cursor --count 5 --skip 1
+"""
+
+import argparse
+import os
+import statistics
+import time
+import uuid
+
+from bson import ObjectId
+from pymongo import ASCENDING, MongoClient
+
+from chatbot.question_cursor import next_unseen_questions
+
+THEME, KELAS, DIFFICULTY = "sains", "3", "sedang"
+
+
+def _seed(db, answered, extra):
+    db.questions.create_index([("theme", ASCENDING), ("kelas", ASCENDING),
+                               ("difficulty", ASCENDING), ("_id", ASCENDING)])
+    db.activity_logs.create_index([("user_id", ASCENDING), ("soal_id", ASCENDING)])
+    db.activity_logs.create_index([("user_id", ASCENDING), ("theme", ASCENDING)])
+    db.answers.create_index([("user_id", ASCENDING), ("soal_id", ASCENDING)], unique=True)
+
+    questions = [{
+        "_id": ObjectId(),
+        "id": str(uuid.uuid4()),
+        "theme": THEME,
+        "kelas": KELAS,
+        "difficulty": DIFFICULTY,
+        "pertanyaan": f"Soal {i}",
+        "opsi": ["a", "b", "c", "d"],
+        "jawaban": "a",
+    } for i in range(answered + extra)]
+    db.questions.insert_many(questions)
+
+    user_id = str(ObjectId())
+    answers = [{
+        "user_id": user_id,
+        "theme": THEME,
+        "soal_id": q["id"],
+        "benar": True,
+    } for q in questions[:answered]]
+    db.activity_logs.insert_many([dict(a) for a in answers])
+    db.answers.insert_many(answers)
+    return user_id
+
+
+def _old_select(db, user_id, count):
+    answered_ids = db.activity_logs.distinct("soal_id", {"user_id": user_id, "theme": THEME})
+    return list(db.questions.find({
+        "theme": THEME,
+        "kelas": KELAS,
+        "difficulty": DIFFICULTY,
+        "id": {"$nin": answered_ids},
+    }).limit(count))
+
+
+def _new_select(db, user_id, count):
+    return next_unseen_questions(db, user_id, THEME, KELAS, DIFFICULTY, count=count)
+
+
+def _p50(samples):
+    ordered = sorted(samples)
+    return round(ordered[len(ordered) // 2], 2)
+
+
+def _run(client, name, select, answered, extra, iterations, count, skip):
+    db_name = f"bench_question_cursor_{name}"
+    client.drop_database(db_name)
+    db = client[db_name]
+    user_id = _seed(db, answered, extra)
+
+    # request pertama untuk cursor juga melewati riwayat lama sekali (catch-up)
+    start = time.perf_counter()
+    batch = select(db, user_id, count)
+    first_ms = (time.perf_counter() - start) * 1000
+
+    skipped = set()
+    samples = []
+    for _ in range(iterations):
+        for soal in batch:
+            if soal["id"] in skipped:
+                continue
+            if len(skipped) < skip:
+                skipped.add(soal["id"])
+                continue
+            answer = {"user_id": user_id, "theme": THEME, "soal_id": soal["id"], "benar": True}
+            db.activity_logs.insert_one(dict(answer))
+            db.answers.insert_one(answer)
+        start = time.perf_counter()
+        batch = select(db, user_id, count)
+        samples.append((time.perf_counter() - start) * 1000)
+        if len(batch) <= len(skipped):
+            break
+
+    client.drop_database(db_name)
+    tail = max(1, len(samples) // 5)
+    return {
+        "first_ms": round(first_ms, 2),
+        "mean_ms": round(statistics.mean(samples), 2),
+        "p50_ms": _p50(samples),
+        "p95_ms": round(sorted(samples)[max(0, int(len(samples) * 0.95) - 1)], 2),
+        "p50_first20%_ms": _p50(samples[:tail]),
+        "p50_last20%_ms": _p50(samples[-tail:]),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--mongo-uri", default=os.getenv("MONGODB_URI", "mongodb://localhost:27017"))
+    parser.add_argument("--answered", type=int, default=10000, help="soal yang sudah dijawab user")
+    parser.add_argument("--iterations", type=int, default=200)
+    parser.add_argument("--count", type=int, default=1, help="soal per request")
+    parser.add_argument("--skip", type=int, default=0, help="soal yang tidak pernah dijawab (count harus > skip)")
+    args = parser.parse_args()
+
+    client = MongoClient(args.mongo_uri)
+    extra = args.iterations * args.count + 10
+
+    before = _run(client, "nin", _old_select, args.answered, extra, args.iterations, args.count, args.skip)
+    after = _run(client, "cursor", _new_select, args.answered, extra, args.iterations, args.count, args.skip)
+
+    print(f"answered: {args.answered}, iterations: {args.iterations}, "
+          f"count: {args.count}, skip: {args.skip}")
+    print(f"before (distinct + $nin): {before}")
+    print(f"after  (question cursor): {after}")
+    print(f"speedup (p50): {before['p50_ms'] / max(after['p50_ms'], 0.001):.1f}x")
+
+
+if __name__ == "__main__":
+    main()
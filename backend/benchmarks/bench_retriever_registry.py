@@ -0,0 +1,115 @@
+"""
+Microbenchmark: overhead per request jalur RAG chat di luar panggilan LLM.
+
+Membandingkan cara lama (db.as_retriever + RetrievalQA.from_chain_type +
+qa.run di setiap request) dengan jalur yang sekarang dipakai ask_chatbot /
+stream_chatbot: RetrieverRegistry.get_retriever + retriever.invoke + prompt
+"stuff" QA_PROMPT_SELECTOR (lihat _build_llm_input di chatbot/service.py),
+lalu llm.invoke. LLM diganti FakeListChatModel supaya yang terukur hanya
+overhead konstruksi + retrieval.
+
+Jalur "after" diukur dua kali: tanpa RetrievalCache dan dengan
+RetrievalCache (default production, RETRIEVAL_CACHE_ENABLED=1) di mana
+pertanyaan berulang melewati pencarian FAISS.
+
+Jalankan dari folder backend:
+    python -m benchmarks.bench_retriever_registry --iterations 2000
+"""
+
+import argparse
+import statistics
+import time
+
+from langchain.chains import RetrievalQA
+from langchain.chains.question_answering.stuff_prompt import (
+    PROMPT_SELECTOR as QA_PROMPT_SELECTOR
+)
+from langchain_community.embeddings import DeterministicFakeEmbedding
+from langchain_community.vectorstores import FAISS
+from langchain_core.language_models import FakeListChatModel
+
+from chatbot.retrieval_cache import RetrievalCache
+from chatbot.retriever_registry import RetrieverRegistry
+from chatbot.service import SYSTEM_PROMPT
+
+
+class _StaticVectorStores:
+    """Pengganti VectorStoreManager: satu vectorstore, generation tetap."""
+
+    def __init__(self, db):
+        self.db = db
+
+    def get(self, kelas):
+        return self.db
+
+    def generation(self, kelas):
+        return 1
+
+    def add_listener(self, fn):
+        pass
+
+
+def _measure(fn, prompts, iterations):
+    samples = []
+    for i in range(iterations):
+        prompt = prompts[i % len(prompts)]
+        start = time.perf_counter()
+        fn(prompt)
+        samples.append((time.perf_counter() - start) * 1e6)
+    samples.sort()
+    return {
+        "mean_us": round(statistics.mean(samples), 1),
+        "p50_us": round(samples[len(samples) // 2], 1),
+        "p95_us": round(samples[int(len(samples) * 0.95) - 1], 1),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--iterations", type=int, default=2000)
+    parser.add_argument("--questions", type=int, default=50,
+                        help="jumlah pertanyaan berbeda yang diputar")
+    args = parser.parse_args()
+
+    texts = [f"Materi sains kelas 1 bagian {i}: makhluk hidup bernapas." for i in range(200)]
+    db = FAISS.from_texts(texts, DeterministicFakeEmbedding(size=384))
+    llm = FakeListChatModel(responses=["ok"])
+    prompts = [SYSTEM_PROMPT + "\n\n" + f"Apa ciri makhluk hidup nomor {i}?"
+               for i in range(args.questions)]
+
+    def rebuild_per_request(prompt):
+        retriever = db.as_retriever(search_kwargs={"k": 3})
+        qa = RetrievalQA.from_chain_type(llm=llm, retriever=retriever)
+        qa.invoke({"query": prompt})
+
+    def registry_path(registry):
+        def run(prompt):
+            retriever = registry.get_retriever("1")
+            docs = retriever.invoke(prompt)
+            context = "\n\n".join(doc.page_content for doc in docs)
+            llm_input = QA_PROMPT_SELECTOR.get_prompt(llm).format_messages(
+                context=context, question=prompt
+            )
+            llm.invoke(llm_input)
+        return run
+
+    plain = RetrieverRegistry(_StaticVectorStores(db))
+    cached = RetrieverRegistry(_StaticVectorStores(db), retrieval_cache=RetrievalCache())
+    for registry in (plain, cached):
+        registry.get_retriever("1")  # build pertama tidak dihitung
+
+    before = _measure(rebuild_per_request, prompts, args.iterations)
+    after = _measure(registry_path(plain), prompts, args.iterations)
+    after_cached = _measure(registry_path(cached), prompts, args.iterations)
+
+    print(f"iterations: {args.iterations}, distinct questions: {args.questions}")
+    print(f"before (RetrievalQA per request):      {before}")
+    print(f"after  (registry retriever):           {after}")
+    print(f"after  (registry + RetrievalCache):    {after_cached}")
+    print(f"speedup (mean): {before['mean_us'] / max(after['mean_us'], 0.001):.1f}x / "
+          f"{before['mean_us'] / max(after_cached['mean_us'], 0.001):.1f}x")
+    print(f"registry stats: {cached.stats()}")
+
+
+if __name__ == "__main__":
+    main()
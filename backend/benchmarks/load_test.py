@@ -0,0 +1,96 @@
+"""
+Load test sederhana untuk endpoint chatbot (tanpa dependensi tambahan).
+
+Jalankan backend dengan backend LLM palsu supaya tidak butuh jaringan /
+kuota Groq, lalu ukur saturasi worker dan antrean:
+
+    LLM_BACKEND=fake FAKE_LLM_LATENCY_MS=1500 FAKE_LLM_LATENCY_SIGMA=0.5 \\
+    PROMPT_CACHE_SQLITE=/tmp/prompt_cache.sqlite \\
+        gunicorn -w 4 --threads 1 "app:create_app()"
+
+(dengan sync worker, prompt identik hanya digabung antar worker lewat
+lease di PROMPT_CACHE_SQLITE; lihat llm/singleflight.py)
+
+    python -m benchmarks.load_test --url http://localhost:8000 --concurrency 32 --requests 500
+    python -m benchmarks.load_test --endpoint get_question --user-id <id> --theme sains
+"""
+
+import argparse
+import json
+import random
+import statistics
+import time
+import urllib.error
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+
+_MESSAGES = [
+    "Apa itu fotosintesis?",
+    "Kenapa langit berwarna biru?",
+    "Bagaimana cara menghitung luas persegi?",
+    "Apa bedanya hewan herbivora dan karnivora?",
+    "Kenapa es mencair di bawah sinar matahari?",
+]
+
+
+def _request(args, i):
+    if args.endpoint == "chat":
+        message = random.Random(i).choice(_MESSAGES) if args.repeat else f"{_MESSAGES[i % len(_MESSAGES)]} ({i})"
+        req = urllib.request.Request(
+            f"{args.url}/chatbot/chat",
+            data=json.dumps({"message": message}).encode("utf-8"),
+            headers={"Content-Type": "application/json"},
+            method="POST",
+        )
+    else:
+        req = urllib.request.Request(
+            f"{args.url}/chatbot/get_question?theme={args.theme}&user_id={args.user_id}"
+        )
+
+    start = time.perf_counter()
+    try:
+        with urllib.request.urlopen(req, timeout=args.timeout) as resp:
+            resp.read()
+            status = resp.status
+    except urllib.error.HTTPError as e:
+        status = e.code
+    except Exception:
+        status = 0
+    return status, (time.perf_counter() - start) * 1000
+
+
+def _pct(values, p):
+    return round(values[min(len(values) - 1, int(len(values) * p))], 1)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--url", default="http://localhost:5000")
+    parser.add_argument("--endpoint", choices=["chat", "get_question"], default="chat")
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--timeout", type=float, default=60)
+    parser.add_argument("--repeat", action="store_true", help="Pakai pesan berulang (uji cache)")
+    parser.add_argument("--user-id")
+    parser.add_argument("--theme", default="sains")
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=args.concurrency) as executor:
+        results = list(executor.map(lambda i: _request(args, i), range(args.requests)))
+    elapsed = time.perf_counter() - start
+
+    latencies = sorted(ms for _, ms in results)
+    statuses = {}
+    for status, _ in results:
+        statuses[status] = statuses.get(status, 0) + 1
+
+    print(f"requests: {args.requests}  concurrency: {args.concurrency}  elapsed: {elapsed:.1f}s")
+    print(f"throughput: {args.requests / elapsed:.2f} req/s")
+    print(f"latency ms: mean {statistics.mean(latencies):.1f}  p50 {_pct(latencies, 0.5)}  "
+          f"p95 {_pct(latencies, 0.95)}  p99 {_pct(latencies, 0.99)}  max {latencies[-1]:.1f}")
+    print(f"status: {statuses}")
+
+
+if __name__ == "__main__":
+    main()
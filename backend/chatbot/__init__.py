@@ -0,0 +1,3 @@
+from flask import Blueprint
+
+chatbot_bp = Blueprint("chatbot", __name__)
@@ -0,0 +1,95 @@
+# Collection answers: satu dokumen per (user_id, soal_id)
+# Index unique (lihat models/indexes.py) membuat insert sekaligus menjadi
+# cek jawaban dobel: tidak perlu find_one dulu dan double-submit yang
+# datang bersamaan tidak bisa lolos dua-duanya.
+# activity_logs tetap dipakai sebagai riwayat / log aktivitas.
+#
+# Isi answers dari riwayat lama di activity_logs (sekali saat migrasi):
+#   python -m chatbot.answers --backfill
+
+import argparse
+import os
+
+from pymongo.errors import BulkWriteError
+
+
+def insert_answer(db, user_id, theme, soal, jawaban_user, benar, score, created_at):
+    """
+    Simpan jawaban. Raise pymongo.errors.DuplicateKeyError jika user
+    sudah pernah menjawab soal ini.
+    """
+    doc = {
+        "user_id": str(user_id),
+        "soal_id": soal["id"],
+        "theme": theme,
+        "kelas": soal.get("kelas"),
+        "difficulty": soal.get("difficulty"),
+        "jawaban_user": jawaban_user,
+        "benar": benar,
+        "score": score,
+        "created_at": created_at,
+    }
+    db.answers.insert_one(doc)
+    return doc
+
+
+def backfill_answers(db, batch_size=1000) -> dict:
+    """Salin log jawaban lama dari activity_logs ke answers (idempotent)."""
+    cursor = db.activity_logs.find(
+        {"soal_id": {"$exists": True}},
+        {"_id": 0, "user_id": 1, "soal_id": 1, "theme": 1, "kelas": 1, "difficulty": 1,
+         "jawaban_user": 1, "benar": 1, "score": 1, "created_at": 1}
+    ).sort("created_at", 1)
+
+    report = {"inserted": 0, "duplicates": 0}
+
+    def _flush(batch):
+        try:
+            result = db.answers.insert_many(batch, ordered=False)
+            report["inserted"] += len(result.inserted_ids)
+        except BulkWriteError as e:
+            errors = e.details.get("writeErrors", [])
+            other = [err for err in errors if err.get("code") != 11000]
+            if other:
+                raise
+            report["inserted"] += e.details.get("nInserted", 0)
+            report["duplicates"] += len(errors)
+
+    batch = []
+    for doc in cursor:
+        doc["user_id"] = str(doc.get("user_id"))
+        batch.append(doc)
+        if len(batch) >= batch_size:
+            _flush(batch)
+            batch = []
+    if batch:
+        _flush(batch)
+
+    return report
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Kelola collection answers")
+    parser.add_argument("--backfill", action="store_true", help="salin jawaban lama dari activity_logs")
+    args = parser.parse_args(argv)
+
+    if not args.backfill:
+        parser.print_help()
+        return
+
+    os.environ["QUESTION_POOL_WORKER"] = "0"
+    from app import create_app
+    from extensions import mongo
+    app = create_app()
+
+    with app.app_context():
+        # index unique harus ada sebelum backfill supaya duplikat tertolak
+        from models.indexes import ensure_indexes
+        ensure_indexes(mongo.db)
+
+        report = backfill_answers(mongo.db)
+        print(f"✅ answers: {report['inserted']} disalin, {report['duplicates']} duplikat dilewati")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,163 @@
+# Micro-batching embedding query
+# Query dari request yang datang hampir bersamaan dikumpulkan beberapa
+# milidetik lalu di-embed sekaligus (sentence-transformers jauh lebih
+# efisien per batch daripada satu per satu).
+
+import os
+import queue
+import threading
+import time
+from bisect import bisect_left
+
+from langchain_core.embeddings import Embeddings
+
+# ======================
+# CONFIG
+# ======================
+EMBED_BATCH_MAX_SIZE = int(os.getenv("EMBED_BATCH_MAX_SIZE", "32"))
+EMBED_BATCH_MAX_WAIT_MS = float(os.getenv("EMBED_BATCH_MAX_WAIT_MS", "3"))
+
+
+class Histogram:
+    """Histogram sederhana dengan bucket batas atas (kumulatif ala Prometheus)."""
+
+    def __init__(self, buckets):
+        self.buckets = list(buckets)
+        self.counts = [0] * (len(self.buckets) + 1)  # + bucket "+Inf"
+        self.total = 0.0
+        self.count = 0
+
+    def observe(self, value) -> None:
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.total += value
+        self.count += 1
+
+    def snapshot(self) -> dict:
+        cumulative, running = {}, 0
+        for bound, c in zip(self.buckets + ["+Inf"], self.counts):
+            running += c
+            cumulative[str(bound)] = running
+        return {
+            "count": self.count,
+            "sum": round(self.total, 3),
+            "avg": round(self.total / self.count, 3) if self.count else 0.0,
+            "buckets": cumulative,
+        }
+
+
+class _Request:
+    __slots__ = ("text", "enqueued_at", "event", "result", "error")
+
+    def __init__(self, text):
+        self.text = text
+        self.enqueued_at = time.perf_counter()
+        self.event = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class EmbeddingBatcher:
+    """
+    Args:
+        embed_documents_fn: fungsi list[str] -> list[list[float]]
+        max_batch_size: jumlah query maksimum per batch
+        max_wait_ms: waktu tunggu maksimum query pertama sebelum batch dijalankan
+    """
+
+    def __init__(self, embed_documents_fn, max_batch_size=EMBED_BATCH_MAX_SIZE,
+                 max_wait_ms=EMBED_BATCH_MAX_WAIT_MS):
+        self._embed_documents = embed_documents_fn
+        self.max_batch_size = max(1, max_batch_size)
+        self.max_wait = max(0.0, max_wait_ms) / 1000
+
+        self._queue = queue.Queue()
+        self._thread = None
+        self._thread_lock = threading.Lock()
+
+        self._stats_lock = threading.Lock()
+        self.batch_sizes = Histogram([1, 2, 4, 8, 16, 32, 64, 128])
+        self.queue_wait_ms = Histogram([0.5, 1, 2, 5, 10, 25, 50, 100, 250])
+
+    def embed(self, text: str):
+        self._ensure_worker()
+        req = _Request(text)
+        self._queue.put(req)
+        req.event.wait()
+        if req.error is not None:
+            raise req.error
+        return req.result
+
+    def stats(self) -> dict:
+        with self._stats_lock:
+            return {
+                "max_batch_size": self.max_batch_size,
+                "max_wait_ms": self.max_wait * 1000,
+                "pending": self._queue.qsize(),
+                "batch_size": self.batch_sizes.snapshot(),
+                "queue_wait_ms": self.queue_wait_ms.snapshot(),
+            }
+
+    # ---------- Internal ----------
+    def _ensure_worker(self) -> None:
+        if self._thread is not None:
+            return
+        with self._thread_lock:
+            if self._thread is None:
+                self._thread = threading.Thread(
+                    target=self._run, name="embedding-batcher", daemon=True
+                )
+                self._thread.start()
+
+    def _collect(self):
+        first = self._queue.get()
+        batch = [first]
+        deadline = first.enqueued_at + self.max_wait
+
+        while len(batch) < self.max_batch_size:
+            remaining = deadline - time.perf_counter()
+            try:
+                if remaining <= 0:
+                    batch.append(self._queue.get_nowait())
+                else:
+                    batch.append(self._queue.get(timeout=remaining))
+            except queue.Empty:
+                break
+        return batch
+
+    def _run(self) -> None:
+        while True:
+            batch = self._collect()
+            started = time.perf_counter()
+
+            with self._stats_lock:
+                self.batch_sizes.observe(len(batch))
+                for req in batch:
+                    self.queue_wait_ms.observe((started - req.enqueued_at) * 1000)
+
+            try:
+                vectors = self._embed_documents([req.text for req in batch])
+                for req, vec in zip(batch, vectors):
+                    req.result = vec
+            except Exception as e:
+                for req in batch:
+                    req.error = e
+            finally:
+                for req in batch:
+                    req.event.set()
+
+
+class BatchedEmbeddings(Embeddings):
+    """
+    Embeddings LangChain yang embed_query-nya lewat EmbeddingBatcher.
+    embed_documents (ingestion) langsung ke model dasar karena sudah batch.
+    """
+
+    def __init__(self, base: Embeddings, batcher: EmbeddingBatcher = None):
+        self.base = base
+        self.batcher = batcher or EmbeddingBatcher(base.embed_documents)
+
+    def embed_query(self, text: str):
+        return self.batcher.embed(text)
+
+    def embed_documents(self, texts):
+        return self.base.embed_documents(texts)
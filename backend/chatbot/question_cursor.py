@@ -0,0 +1,114 @@
+# Cursor per user untuk "soal berikutnya yang belum dijawab"
+# Soal diurutkan stabil per (theme, kelas, difficulty) berdasarkan _id
+# (ObjectId naik sesuai waktu insert, soal baru selalu di belakang).
+# Collection question_cursors menyimpan:
+#   position — _id terakhir yang sudah diperiksa; soal sebelum position
+#              sudah dijawab ATAU sudah diberikan (ada di pending)
+#   pending  — _id soal yang sudah diberikan tapi belum dijawab (maks
+#              QUESTION_CURSOR_PENDING_MAX), ditawarkan lagi lebih dulu
+# sehingga pencarian tidak perlu menarik seluruh riwayat jawaban
+# (distinct + $nin) di setiap request, dan soal yang dilewati user tidak
+# menahan cursor di belakang.
+#
+# Per request: 1 find_one cursor + cek pending (maks PENDING_MAX id) +
+# beberapa batch kecil soal setelah position + cek jawaban dengan $in
+# terbatas (maks QUESTION_CURSOR_BATCH id). Biaya tidak tumbuh dengan
+# panjang riwayat.
+
+import os
+
+QUESTION_CURSOR_BATCH = int(os.getenv("QUESTION_CURSOR_BATCH", "50"))
+QUESTION_CURSOR_PENDING_MAX = int(os.getenv("QUESTION_CURSOR_PENDING_MAX", "50"))
+
+QUESTION_FIELDS = {"_id": 1, "id": 1, "theme": 1, "pertanyaan": 1, "opsi": 1, "served_at": 1}
+
+
+def cursor_key(user_id, theme, kelas, difficulty) -> str:
+    return f"{user_id}|{theme}|{kelas}|{difficulty}"
+
+
+def answered_among(db, user_id, soal_ids) -> set:
+    """soal_id dari daftar (terbatas) yang sudah dijawab user."""
+    if not soal_ids:
+        return set()
+    return set(db.answers.distinct(
+        "soal_id",
+        {"user_id": str(user_id), "soal_id": {"$in": list(soal_ids)}}
+    ))
+
+
+def _pending_questions(db, user_id, pending):
+    """Soal pending yang masih ada di bank dan belum dijawab, urut _id."""
+    if not pending:
+        return []
+    questions = list(db.questions.find({"_id": {"$in": pending}}, QUESTION_FIELDS).sort("_id", 1))
+    answered = answered_among(db, user_id, [q["id"] for q in questions])
+    return [q for q in questions if q["id"] not in answered]
+
+
+def next_unseen_questions(db, user_id, theme, kelas, difficulty, count=1, batch=QUESTION_CURSOR_BATCH):
+    """
+    Ambil sampai `count` soal yang belum dijawab user, urut _id.
+
+    Soal yang dikembalikan dianggap diberikan: cursor maju melewatinya dan
+    _id-nya dicatat di pending. Soal yang sudah diberikan tapi belum dijawab
+    tetap muncul lagi lebih dulu (sama seperti perilaku lama) sampai dijawab;
+    jika pending melebihi QUESTION_CURSOR_PENDING_MAX, yang paling lama dibuang.
+    """
+    key = cursor_key(user_id, theme, kelas, difficulty)
+    cursor = db.question_cursors.find_one({"_id": key}, {"position": 1, "pending": 1})
+    old_position = cursor.get("position") if cursor else None
+    pending = _pending_questions(db, user_id, cursor.get("pending", []) if cursor else [])
+
+    found = pending[:count]
+    position = old_position
+    base = {"theme": theme, "kelas": kelas, "difficulty": difficulty}
+
+    while len(found) < count:
+        query = dict(base)
+        if position is not None:
+            query["_id"] = {"$gt": position}
+
+        candidates = list(db.questions.find(query, QUESTION_FIELDS).sort("_id", 1).limit(batch))
+        if not candidates:
+            break
+
+        answered = answered_among(db, user_id, [c["id"] for c in candidates])
+        for soal in candidates:
+            # setiap soal yang diperiksa sudah selesai: dijawab (dilewati)
+            # atau diberikan sekarang (masuk pending)
+            position = soal["_id"]
+            if soal["id"] in answered:
+                continue
+            found.append(soal)
+            if len(found) >= count:
+                break
+
+    new_pending = sorted({q["_id"] for q in pending} | {q["_id"] for q in found})
+    new_pending = new_pending[-QUESTION_CURSOR_PENDING_MAX:]
+    stored_pending = cursor.get("pending", []) if cursor else []
+
+    if position != old_position or new_pending != stored_pending:
+        update = {
+            "$set": {"position": position, "pending": new_pending},
+            "$setOnInsert": {
+                "user_id": str(user_id),
+                "theme": theme,
+                "kelas": kelas,
+                "difficulty": difficulty,
+            },
+        }
+        if cursor is None:
+            db.question_cursors.update_one({"_id": key}, update, upsert=True)
+        else:
+            # request paralel user yang sama: hanya satu yang menang, yang
+            # lain mengulang pemeriksaan di request berikutnya
+            update.pop("$setOnInsert")
+            db.question_cursors.update_one({"_id": key, "position": old_position}, update)
+
+    return found
+
+
+def next_unseen_question(db, user_id, theme, kelas, difficulty):
+    found = next_unseen_questions(db, user_id, theme, kelas, difficulty, count=1)
+    return found[0] if found else None
@@ -0,0 +1,363 @@
+# Pool soal yang sudah di-generate sebelumnya
+# Worker background menjaga agar tiap (theme, kelas, difficulty) punya
+# minimal QUESTION_POOL_LOW_WATERMARK soal yang belum pernah disajikan
+# (served_at = None). Jika di bawah ambang, pool diisi sampai QUESTION_POOL_TARGET.
+#
+# Status per kombinasi disimpan di collection question_pool_state supaya
+# semua worker gunicorn melihat angka yang sama dan hanya satu proses yang
+# mengisi ulang satu kombinasi pada satu waktu (lease).
+#
+# Jalankan manual / dari cron:
+#   python -m chatbot.question_pool --once
+
+import argparse
+import os
+import threading
+import time
+import uuid
+from datetime import datetime
+
+from pymongo.errors import DuplicateKeyError
+
+from extensions import mongo
+from .question_service import QUESTION_BATCH_SIZE, generate_questions, get_difficulty_by_kelas
+
+# ======================
+# CONFIG
+# ======================
+QUESTION_POOL_THEMES = ["literasi", "numerik", "sains"]
+QUESTION_POOL_KELAS = [
+    k.strip() for k in os.getenv("QUESTION_POOL_KELAS", "1,2,3,4,5,6").split(",") if k.strip()
+]
+QUESTION_POOL_LOW_WATERMARK = int(os.getenv("QUESTION_POOL_LOW_WATERMARK", "5"))
+QUESTION_POOL_TARGET = int(os.getenv("QUESTION_POOL_TARGET", "15"))
+QUESTION_POOL_INTERVAL = float(os.getenv("QUESTION_POOL_INTERVAL", "30"))
+QUESTION_POOL_LEASE_SECONDS = float(os.getenv("QUESTION_POOL_LEASE_SECONDS", "300"))
+# batch gagal (tidak ada soal valid) sebelum kombinasi dilewati pada siklus ini
+QUESTION_POOL_MAX_FAILURES = int(os.getenv("QUESTION_POOL_MAX_FAILURES", "3"))
+
+
+def pool_key(theme, kelas, difficulty) -> str:
+    return f"{theme}|{kelas}|{difficulty}"
+
+
+class QuestionPool:
+    def __init__(self, themes=None, kelas_list=None, low_watermark=QUESTION_POOL_LOW_WATERMARK,
+                 target=QUESTION_POOL_TARGET, interval=QUESTION_POOL_INTERVAL,
+                 lease_seconds=QUESTION_POOL_LEASE_SECONDS):
+        self.themes = themes or QUESTION_POOL_THEMES
+        self.kelas_list = kelas_list or QUESTION_POOL_KELAS
+        self.low_watermark = low_watermark
+        self.target = max(target, low_watermark)
+        self.interval = interval
+        self.lease_seconds = lease_seconds
+
+        self._token = uuid.uuid4().hex
+        self._wake = threading.Event()
+        self._thread = None
+        self._stop = threading.Event()
+        # refill on-demand saat worker tidak aktif: satu thread, antrean per kombinasi
+        self._pending = set()
+        self._pending_lock = threading.Lock()
+        self._ondemand_thread = None
+
+    @property
+    def _owner(self) -> str:
+        # satu token untuk semua worker hasil fork; pid yang membedakan
+        return f"{os.getpid()}-{self._token}"
+
+    # ---------- Collections ----------
+    @property
+    def _questions(self):
+        return mongo.db.questions
+
+    @property
+    def _state(self):
+        return mongo.db.question_pool_state
+
+    def combos(self):
+        for theme in self.themes:
+            for kelas in self.kelas_list:
+                yield theme, kelas, get_difficulty_by_kelas(kelas)
+
+    # ---------- Pool depth ----------
+    def depth(self, theme, kelas, difficulty) -> int:
+        return self._questions.count_documents({
+            "theme": theme,
+            "kelas": kelas,
+            "difficulty": difficulty,
+            "served_at": None,
+        })
+
+    # ---------- Request path ----------
+    def mark_served(self, soal) -> None:
+        """Soal keluar dari pool saat pertama kali disajikan."""
+        if soal.get("served_at") is None:
+            self._questions.update_one(
+                {"_id": soal["_id"], "served_at": None},
+                {"$set": {"served_at": datetime.utcnow()}}
+            )
+
+    def mark_served_many(self, soal_list) -> None:
+        ids = [soal["_id"] for soal in soal_list if soal.get("served_at") is None]
+        if ids:
+            self._questions.update_many(
+                {"_id": {"$in": ids}, "served_at": None},
+                {"$set": {"served_at": datetime.utcnow()}}
+            )
+
+    def notify_empty(self, theme, kelas, difficulty) -> None:
+        """
+        Dipanggil request yang tidak menemukan soal. Tidak memanggil LLM di
+        thread request: hanya mencatat lalu membangunkan worker (atau
+        mengantrekan refill on-demand jika worker tidak aktif).
+        """
+        now = datetime.utcnow()
+        try:
+            self._state.update_one(
+                {"_id": pool_key(theme, kelas, difficulty)},
+                {
+                    "$inc": {"empty_hits": 1},
+                    "$min": {"below_since": now},
+                    "$setOnInsert": {"theme": theme, "kelas": kelas, "difficulty": difficulty},
+                },
+                upsert=True
+            )
+        except Exception as e:
+            print("❌ question_pool notify_empty error:", e)
+
+        if self.running:
+            self._wake.set()
+        else:
+            self._enqueue_refill((theme, kelas, difficulty))
+
+    def _enqueue_refill(self, combo) -> None:
+        """
+        Kombinasi yang sama hanya diantrekan sekali, dan hanya ada satu
+        thread on-demand per proses, berapa pun banyaknya request kosong.
+        """
+        with self._pending_lock:
+            if combo in self._pending:
+                return
+            self._pending.add(combo)
+            if self._ondemand_thread is None or not self._ondemand_thread.is_alive():
+                self._ondemand_thread = threading.Thread(
+                    target=self._drain_pending, name="question-pool-refill", daemon=True
+                )
+                self._ondemand_thread.start()
+
+    def _drain_pending(self) -> None:
+        while True:
+            with self._pending_lock:
+                if not self._pending:
+                    self._ondemand_thread = None
+                    return
+                combo = next(iter(self._pending))
+            self.refill(*combo)
+            with self._pending_lock:
+                self._pending.discard(combo)
+
+    # ---------- Refill ----------
+    def _acquire(self, key) -> bool:
+        now = time.time()
+        try:
+            self._state.find_one_and_update(
+                {
+                    "_id": key,
+                    "$or": [
+                        {"lease_until": {"$exists": False}},
+                        {"lease_until": {"$lt": now}},
+                        {"lease_owner": self._owner},
+                    ],
+                },
+                {"$set": {"lease_until": now + self.lease_seconds, "lease_owner": self._owner}},
+                upsert=True
+            )
+            return True
+        except DuplicateKeyError:
+            # dokumen ada tapi lease dipegang proses lain
+            return False
+
+    def _release(self, key) -> None:
+        self._state.update_one(
+            {"_id": key, "lease_owner": self._owner},
+            {"$set": {"lease_until": 0}}
+        )
+
+    def _extend(self, key) -> bool:
+        """Perpanjang lease milik proses ini. False jika lease sudah diambil proses lain."""
+        result = self._state.update_one(
+            {"_id": key, "lease_owner": self._owner},
+            {"$set": {"lease_until": time.time() + self.lease_seconds}}
+        )
+        return result.matched_count > 0
+
+    def _refill_leased(self, key, theme, kelas, difficulty):
+        """Bagian refill yang berjalan selama memegang lease. Returns (generated, depth)."""
+        # cek ulang setelah lease: proses lain bisa saja baru selesai mengisi
+        depth = self.depth(theme, kelas, difficulty)
+        if depth >= self.low_watermark:
+            return 0, depth
+
+        state = self._state.find_one({"_id": key}) or {}
+        below_since = state.get("below_since") or datetime.utcnow()
+        self._state.update_one({"_id": key}, {"$set": {"below_since": below_since}})
+
+        generated = 0
+        failures = 0
+        tokens = 0
+        while depth < self.target and failures < QUESTION_POOL_MAX_FAILURES:
+            report = generate_questions(
+                theme, kelas, difficulty, min(QUESTION_BATCH_SIZE, self.target - depth)
+            )
+            tokens += report.get("input_tokens", 0) + report.get("output_tokens", 0)
+            if report["inserted"]:
+                generated += report["inserted"]
+                depth += report["inserted"]
+            else:
+                failures += 1
+            # satu batch bisa memakan waktu lama (retry LLM); tanpa perpanjangan
+            # lease bisa kedaluwarsa dan proses lain ikut mengisi kombinasi ini
+            if not self._extend(key):
+                break
+
+        now = datetime.utcnow()
+        update = {
+            "$set": {
+                "theme": theme,
+                "kelas": kelas,
+                "difficulty": difficulty,
+                "depth": self.depth(theme, kelas, difficulty),
+                "checked_at": now,
+            },
+            "$inc": {"generated_total": generated, "failures_total": failures, "tokens_total": tokens},
+        }
+        if depth >= self.low_watermark:
+            # refill lag = lama kombinasi ini berada di bawah low watermark
+            update["$set"]["last_refill_at"] = now
+            update["$set"]["last_refill_lag_ms"] = round(
+                (now - below_since).total_seconds() * 1000, 1
+            )
+            update["$unset"] = {"below_since": ""}
+        self._state.update_one({"_id": key}, update)
+        return generated, depth
+
+    def refill(self, theme, kelas, difficulty) -> int:
+        """Isi pool satu kombinasi jika di bawah low watermark. Returns jumlah soal baru."""
+        key = pool_key(theme, kelas, difficulty)
+        try:
+            depth = self.depth(theme, kelas, difficulty)
+            if depth >= self.low_watermark:
+                self._state.update_one(
+                    {"_id": key},
+                    {"$set": {"depth": depth, "checked_at": datetime.utcnow()}},
+                    upsert=True
+                )
+                return 0
+
+            if not self._acquire(key):
+                return 0
+
+            try:
+                generated, depth = self._refill_leased(key, theme, kelas, difficulty)
+            finally:
+                self._release(key)
+
+            if generated:
+                print(f"✅ question_pool {key}: +{generated} soal (depth {depth})")
+            return generated
+
+        except Exception as e:
+            print(f"❌ question_pool refill {key} error:", e)
+            return 0
+
+    def refill_all(self) -> int:
+        return sum(self.refill(*combo) for combo in self.combos())
+
+    # ---------- Worker ----------
+    @property
+    def running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self) -> None:
+        if self.running:
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="question-pool", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        self._wake.set()
+
+    def _run(self) -> None:
+        while not self._stop.is_set():
+            self.refill_all()
+            self._wake.wait(self.interval)
+            self._wake.clear()
+
+    # ---------- Metrics ----------
+    def stats(self) -> dict:
+        states = {doc["_id"]: doc for doc in self._state.find({})}
+        now = datetime.utcnow()
+
+        combos = {}
+        for theme, kelas, difficulty in self.combos():
+            key = pool_key(theme, kelas, difficulty)
+            state = states.get(key, {})
+            below_since = state.get("below_since")
+            combos[key] = {
+                "depth": self.depth(theme, kelas, difficulty),
+                "empty_hits": state.get("empty_hits", 0),
+                "generated_total": state.get("generated_total", 0),
+                "failures_total": state.get("failures_total", 0),
+                "tokens_per_question": round(state.get("tokens_total", 0) / state["generated_total"], 1)
+                if state.get("generated_total") else None,
+                "last_refill_lag_ms": state.get("last_refill_lag_ms"),
+                # kombinasi yang sedang menunggu refill: lag berjalan
+                "current_lag_ms": round((now - below_since).total_seconds() * 1000, 1)
+                if below_since else None,
+                "last_refill_at": state.get("last_refill_at"),
+            }
+
+        return {
+            "worker_running": self.running,
+            "low_watermark": self.low_watermark,
+            "target": self.target,
+            "interval": self.interval,
+            "combos": combos,
+        }
+
+
+question_pool = QuestionPool()
+
+
+# ======================
+# CLI
+# ======================
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Isi pool soal yang sudah di-generate")
+    parser.add_argument("--once", action="store_true", help="satu siklus refill lalu keluar")
+    args = parser.parse_args(argv)
+
+    # app dibuat tanpa worker background; proses ini sendiri yang mengisi pool
+    os.environ["QUESTION_POOL_WORKER"] = "0"
+    from app import create_app
+    app = create_app()
+
+    with app.app_context():
+        if args.once:
+            total = question_pool.refill_all()
+            print(f"✅ {total} soal baru di-generate")
+            return
+
+        question_pool.start()
+        try:
+            while question_pool.running:
+                time.sleep(1)
+        except KeyboardInterrupt:
+            question_pool.stop()
+
+
+if __name__ == "__main__":
+    main()
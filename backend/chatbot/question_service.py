@@ -0,0 +1,307 @@
+# Generate soal pilihan ganda dengan LLM
+# Dipakai oleh worker pool soal (chatbot/question_pool.py), bukan oleh
+# request siswa: /chatbot/get_question hanya membaca dari MongoDB.
+#
+# Satu panggilan LLM menghasilkan N soal sekaligus (JSON terstruktur),
+# sehingga overhead prompt + latensi dibagi ke seluruh batch. Tiap soal
+# divalidasi sendiri-sendiri; yang tidak valid dibuang, sisanya insert_many.
+#
+# Generate manual + laporan biaya per soal:
+#   python -m chatbot.question_service --theme sains --kelas 3 --count 30 --batch-size 10
+
+import argparse
+import json
+import os
+import re
+import time
+import uuid
+from datetime import datetime
+
+from extensions import mongo
+from llm.backends import get_chat_model
+from llm.resilience import llm_guard
+from .service import LLM_MODEL
+
+# ======================
+# CONFIG
+# ======================
+QUESTION_BATCH_SIZE = int(os.getenv("QUESTION_BATCH_SIZE", "10"))
+QUESTION_BATCH_MAX_SIZE = 20
+QUESTION_BATCH_TEMPERATURE = float(os.getenv("QUESTION_BATCH_TEMPERATURE", "0.7"))
+# ±200 token per soal + cadangan
+QUESTION_BATCH_MAX_TOKENS = int(os.getenv("QUESTION_BATCH_MAX_TOKENS", "4500"))
+# harga opsional (USD per 1 juta token) untuk laporan biaya; 0 = hanya token
+LLM_PRICE_INPUT_PER_MTOK = float(os.getenv("LLM_PRICE_INPUT_PER_MTOK", "0"))
+LLM_PRICE_OUTPUT_PER_MTOK = float(os.getenv("LLM_PRICE_OUTPUT_PER_MTOK", "0"))
+
+_question_llm = None
+
+
+def get_question_llm():
+    global _question_llm
+    if _question_llm is None:
+        _question_llm = get_chat_model(
+            LLM_MODEL, QUESTION_BATCH_TEMPERATURE, max_tokens=QUESTION_BATCH_MAX_TOKENS
+        ).bind(response_format={"type": "json_object"})
+    return _question_llm
+
+
+def get_difficulty_by_kelas(kelas):
+    """
+    Menentukan tingkat kesulitan soal berdasarkan kelas SD
+    """
+    try:
+        kelas = int(kelas)
+    except (TypeError, ValueError):
+        return "mudah"
+
+    if kelas <= 2:
+        return "mudah"
+    elif kelas <= 4:
+        return "sedang"
+    else:
+        return "sulit"
+
+
+# ======================
+# PROMPT & VALIDASI
+# ======================
+def build_batch_prompt(theme, kelas, difficulty, count):
+    return (
+        f"Buatkan {count} soal {theme} yang BERBEDA-BEDA untuk siswa SD kelas {kelas} "
+        f"dengan tingkat kesulitan {difficulty}. "
+        f"Gunakan bahasa anak-anak. Setiap soal punya 4 opsi dan "
+        f"\"jawaban\" harus sama persis dengan salah satu opsi.\n\n"
+        f"Format JSON MURNI:\n"
+        f"{{\"soal\": [\n"
+        f"  {{\n"
+        f"    \"pertanyaan\": \"\",\n"
+        f"    \"opsi\": [\"\", \"\", \"\", \"\"],\n"
+        f"    \"jawaban\": \"\",\n"
+        f"    \"penjelasan\": \"\"\n"
+        f"  }}\n"
+        f"]}}\n"
+        f"JANGAN tambahkan teks lain."
+    )
+
+
+def parse_question_batch(text):
+    """Ambil list soal dari output LLM ({"soal": [...]}, [...], atau satu objek)."""
+    text = text or ""
+    try:
+        data = json.loads(text)
+    except ValueError:
+        match = re.search(r"[\[{].*[\]}]", text, re.DOTALL)
+        if not match:
+            return []
+        try:
+            data = json.loads(match.group(0))
+        except ValueError:
+            return []
+
+    if isinstance(data, dict):
+        data = data.get("soal", [data])
+    return data if isinstance(data, list) else []
+
+
+def validate_question(soal):
+    """
+    Returns:
+        (soal ter-normalisasi | None, alasan ditolak | None)
+    """
+    if not isinstance(soal, dict):
+        return None, "bukan objek"
+
+    pertanyaan = str(soal.get("pertanyaan") or "").strip()
+    if not pertanyaan:
+        return None, "pertanyaan kosong"
+
+    opsi = soal.get("opsi")
+    if not isinstance(opsi, list) or len(opsi) != 4:
+        return None, "opsi harus 4"
+    opsi = [str(o).strip() for o in opsi]
+    if any(not o for o in opsi) or len({o.lower() for o in opsi}) != 4:
+        return None, "opsi kosong / kembar"
+
+    jawaban = soal.get("jawaban")
+    if isinstance(jawaban, int) and not isinstance(jawaban, bool):
+        if not 0 <= jawaban < 4:
+            return None, "index jawaban tidak valid"
+        jawaban = opsi[jawaban]
+    jawaban = str(jawaban or "").strip()
+    if jawaban.lower() not in {o.lower() for o in opsi}:
+        return None, "jawaban tidak ada di opsi"
+
+    return {
+        "pertanyaan": pertanyaan,
+        "opsi": opsi,
+        "jawaban": jawaban,
+        "penjelasan": str(soal.get("penjelasan") or "").strip(),
+    }, None
+
+
+def new_question_doc(soal, theme, kelas, difficulty):
+    soal = dict(soal)
+    soal.update({
+        "id": str(uuid.uuid4()),
+        "theme": theme,
+        "kelas": kelas,
+        "difficulty": difficulty,
+        "created_at": datetime.utcnow(),
+        # None = belum pernah disajikan ke siswa (masuk hitungan pool)
+        "served_at": None,
+    })
+    return soal
+
+
+def _usage(response):
+    usage = getattr(response, "usage_metadata", None) or {}
+    if not usage:
+        token_usage = (getattr(response, "response_metadata", None) or {}).get("token_usage", {})
+        usage = {
+            "input_tokens": token_usage.get("prompt_tokens", 0),
+            "output_tokens": token_usage.get("completion_tokens", 0),
+        }
+    input_tokens = usage.get("input_tokens", 0) or 0
+    output_tokens = usage.get("output_tokens", 0) or 0
+    return input_tokens, output_tokens
+
+
+def _cost_usd(input_tokens, output_tokens):
+    if not (LLM_PRICE_INPUT_PER_MTOK or LLM_PRICE_OUTPUT_PER_MTOK):
+        return None
+    return (input_tokens * LLM_PRICE_INPUT_PER_MTOK + output_tokens * LLM_PRICE_OUTPUT_PER_MTOK) / 1e6
+
+
+# ======================
+# GENERATE
+# ======================
+def generate_questions(theme, kelas, difficulty, count=QUESTION_BATCH_SIZE):
+    """
+    Minta `count` soal dalam satu panggilan LLM, validasi per soal,
+    lalu simpan yang valid ke collection questions (insert_many).
+
+    Returns:
+        laporan dict: inserted, rejected (+ alasan), token & latensi total
+        dan per soal yang tersimpan
+    """
+    count = max(1, min(int(count), QUESTION_BATCH_MAX_SIZE))
+    prompt = build_batch_prompt(theme, kelas, difficulty, count)
+
+    report = {
+        "theme": theme,
+        "kelas": kelas,
+        "difficulty": difficulty,
+        "requested": count,
+        "inserted": 0,
+        "rejected": {},
+    }
+
+    start = time.perf_counter()
+    try:
+        # tanpa prompt cache: prompt identik harus menghasilkan soal baru
+        response = llm_guard.call("question", lambda: get_question_llm().invoke(prompt))
+    except Exception as e:
+        print("❌ generate_questions LLM error:", e)
+        report["error"] = str(e)
+        return report
+    latency_ms = (time.perf_counter() - start) * 1000
+
+    items = parse_question_batch(response.content)
+
+    docs = []
+    seen = set()
+    for item in items[:count]:
+        soal, reason = validate_question(item)
+        if soal is None:
+            report["rejected"][reason] = report["rejected"].get(reason, 0) + 1
+            continue
+        normalized = soal["pertanyaan"].lower()
+        if normalized in seen:
+            report["rejected"]["kembar dalam batch"] = report["rejected"].get("kembar dalam batch", 0) + 1
+            continue
+        seen.add(normalized)
+        docs.append(new_question_doc(soal, theme, kelas, difficulty))
+
+    if docs:
+        # buang soal yang teksnya sudah ada di bank untuk kombinasi yang sama
+        existing = {
+            q["pertanyaan"].lower() for q in mongo.db.questions.find(
+                {"theme": theme, "kelas": kelas, "difficulty": difficulty,
+                 "pertanyaan": {"$in": [d["pertanyaan"] for d in docs]}},
+                {"pertanyaan": 1}
+            )
+        }
+        if existing:
+            before = len(docs)
+            docs = [d for d in docs if d["pertanyaan"].lower() not in existing]
+            report["rejected"]["sudah ada di bank"] = before - len(docs)
+
+    if docs:
+        mongo.db.questions.insert_many(docs, ordered=False)
+
+    input_tokens, output_tokens = _usage(response)
+    inserted = len(docs)
+    cost = _cost_usd(input_tokens, output_tokens)
+
+    report.update({
+        "returned": len(items),
+        "inserted": inserted,
+        "latency_ms": round(latency_ms, 1),
+        "input_tokens": input_tokens,
+        "output_tokens": output_tokens,
+        "cost_usd": cost,
+        # biaya dibagi ke soal yang benar-benar tersimpan
+        "per_question": {
+            "latency_ms": round(latency_ms / inserted, 1),
+            "tokens": round((input_tokens + output_tokens) / inserted, 1),
+            "cost_usd": cost / inserted if cost is not None else None,
+        } if inserted else None,
+    })
+    return report
+
+
+# ======================
+# CLI
+# ======================
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Generate soal secara batch ke collection questions")
+    parser.add_argument("--theme", required=True, choices=["literasi", "numerik", "sains"])
+    parser.add_argument("--kelas", required=True)
+    parser.add_argument("--count", type=int, default=QUESTION_BATCH_SIZE, help="total soal yang diminta")
+    parser.add_argument("--batch-size", type=int, default=QUESTION_BATCH_SIZE,
+                        help=f"soal per panggilan LLM (maks {QUESTION_BATCH_MAX_SIZE})")
+    args = parser.parse_args(argv)
+
+    os.environ["QUESTION_POOL_WORKER"] = "0"
+    from app import create_app
+    app = create_app()
+
+    difficulty = get_difficulty_by_kelas(args.kelas)
+    totals = {"inserted": 0, "latency_ms": 0.0, "tokens": 0, "cost_usd": 0.0, "calls": 0}
+
+    with app.app_context():
+        remaining = args.count
+        while remaining > 0:
+            report = generate_questions(args.theme, args.kelas, difficulty, min(args.batch_size, remaining))
+            print(json.dumps(report, ensure_ascii=False, default=str))
+
+            totals["calls"] += 1
+            if "error" in report:
+                break
+            totals["inserted"] += report["inserted"]
+            totals["latency_ms"] += report["latency_ms"]
+            totals["tokens"] += report["input_tokens"] + report["output_tokens"]
+            totals["cost_usd"] += report["cost_usd"] or 0.0
+            remaining -= report["requested"]
+
+    inserted = totals["inserted"]
+    print(f"✅ {inserted} soal tersimpan dari {totals['calls']} panggilan LLM")
+    if inserted:
+        print(f"   per soal: {totals['latency_ms'] / inserted:.0f} ms, "
+              f"{totals['tokens'] / inserted:.0f} token"
+              + (f", ${totals['cost_usd'] / inserted:.6f}" if totals["cost_usd"] else ""))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,81 @@
+# Cache hasil retrieval (top-k id dokumen) per kelas
+# Walaupun jawaban LLM tidak bisa dipakai ulang, top-k chunk untuk topik
+# yang sama selalu sama. Key = kelas + generation vectorstore + embedding
+# query yang sudah dibulatkan, jadi rebuild vectorstore otomatis membuang cache.
+
+import hashlib
+import os
+import threading
+import time
+from collections import OrderedDict
+
+import numpy as np
+
+# ======================
+# CONFIG
+# ======================
+RETRIEVAL_CACHE_DECIMALS = int(os.getenv("RETRIEVAL_CACHE_DECIMALS", "2"))
+RETRIEVAL_CACHE_MAX_ENTRIES = int(os.getenv("RETRIEVAL_CACHE_MAX_ENTRIES", "2000"))
+RETRIEVAL_CACHE_TTL = int(os.getenv("RETRIEVAL_CACHE_TTL", "86400"))
+
+
+class RetrievalCache:
+    def __init__(self, decimals=RETRIEVAL_CACHE_DECIMALS, max_entries=RETRIEVAL_CACHE_MAX_ENTRIES,
+                 ttl=RETRIEVAL_CACHE_TTL):
+        self.decimals = decimals
+        self.max_entries = max_entries
+        self.ttl = ttl
+
+        self._lock = threading.Lock()
+        # { (kelas, generation, bucket): (doc_ids, expires_at) }
+        self._entries = OrderedDict()
+        self._generations = {}
+
+        self.hits = 0
+        self.misses = 0
+
+    def bucket(self, vector) -> str:
+        """Embedding dinormalisasi lalu dibulatkan → hash bucket."""
+        vec = np.asarray(vector, dtype="float32")
+        norm = np.linalg.norm(vec)
+        if norm > 0:
+            vec = vec / norm
+        rounded = np.round(vec, self.decimals) + 0.0  # +0.0 menyatukan -0.0 dan 0.0
+        return hashlib.sha1(rounded.astype("float32").tobytes()).hexdigest()
+
+    def get(self, kelas: str, generation: int, bucket: str):
+        key = (kelas, generation, bucket)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[1] >= time.time():
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry[0]
+            if entry is not None:
+                del self._entries[key]
+            self.misses += 1
+            return None
+
+    def put(self, kelas: str, generation: int, bucket: str, doc_ids: list) -> None:
+        with self._lock:
+            if self._generations.get(kelas) != generation:
+                # vectorstore kelas ini berganti: buang entri generation lama
+                for key in [k for k in self._entries if k[0] == kelas and k[1] != generation]:
+                    del self._entries[key]
+                self._generations[kelas] = generation
+
+            self._entries[(kelas, generation, bucket)] = (list(doc_ids), time.time() + self.ttl)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def stats(self) -> dict:
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / total, 4) if total else 0.0,
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "decimals": self.decimals,
+            }
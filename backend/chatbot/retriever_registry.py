@@ -0,0 +1,89 @@
+# Registry retriever per kelas
+# Retriever dibangun sekali per kelas dan dipakai bersama oleh semua
+# request/thread (lihat _build_llm_input di service.py). Retriever dibangun
+# ulang hanya jika vectorstore kelas tersebut berganti (reload, eviksi,
+# rebuild). Entry dibuang saat VectorStoreManager melepas vectorstore kelas,
+# supaya index FAISS yang sudah dieviksi tidak tetap hidup lewat retriever
+# di sini.
+
+import threading
+
+RETRIEVER_K = 3
+
+
+class _RetrieverEntry:
+    def __init__(self, generation, retriever):
+        self.generation = generation
+        self.retriever = retriever
+
+
+class RetrieverRegistry:
+    """
+    Args:
+        vectorstores: VectorStoreManager
+        retrieval_cache: RetrievalCache opsional; jika ada, retriever memakai
+            CachedFaissRetriever alih-alih db.as_retriever
+    """
+
+    def __init__(self, vectorstores, k=RETRIEVER_K, retrieval_cache=None):
+        self._vectorstores = vectorstores
+        self.k = k
+        self._retrieval_cache = retrieval_cache
+
+        self._lock = threading.Lock()
+        self._entries = {}
+
+        self.builds = 0
+        self.reuses = 0
+
+        vectorstores.add_listener(self.invalidate)
+
+    def _build(self, kelas, db, generation):
+        if self._retrieval_cache is not None:
+            from .retrievers import CachedFaissRetriever
+            return CachedFaissRetriever(
+                db=db, kelas=kelas, generation=generation,
+                cache=self._retrieval_cache, k=self.k,
+            )
+        return db.as_retriever(search_kwargs={"k": self.k})
+
+    def get_retriever(self, kelas):
+        """Retriever untuk kelas, atau None jika tidak ada vectorstore."""
+        db = self._vectorstores.get(kelas)
+        if db is None:
+            return None
+
+        generation = self._vectorstores.generation(kelas)
+        kelas = str(kelas)
+
+        with self._lock:
+            entry = self._entries.get(kelas)
+            if entry is not None and entry.generation == generation:
+                self.reuses += 1
+                return entry.retriever
+
+        retriever = self._build(kelas, db, generation)
+
+        with self._lock:
+            # vectorstore bisa saja dieviksi selama retriever dibangun; entry
+            # basi tidak disimpan (listener sudah lewat dan tidak akan membuangnya)
+            if self._vectorstores.generation(kelas) == generation:
+                self._entries[kelas] = _RetrieverEntry(generation, retriever)
+            self.builds += 1
+
+        return retriever
+
+    def invalidate(self, kelas=None) -> None:
+        with self._lock:
+            if kelas is None:
+                self._entries.clear()
+            else:
+                self._entries.pop(str(kelas), None)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "builds": self.builds,
+                "reuses": self.reuses,
+                "kelas": sorted(self._entries),
+            }
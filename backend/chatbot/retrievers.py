@@ -0,0 +1,42 @@
+# Retriever LangChain kustom untuk chatbot
+# Dipisah dari retrieval_cache.py supaya import langchain_core hanya terjadi
+# saat retriever pertama dibangun (lihat lazy loading di service.py).
+
+from typing import Any, List
+
+import numpy as np
+from langchain_core.callbacks import CallbackManagerForRetrieverRun
+from langchain_core.documents import Document
+from langchain_core.retrievers import BaseRetriever
+
+
+class CachedFaissRetriever(BaseRetriever):
+    """
+    Retriever FAISS yang menyimpan top-k id dokumen di RetrievalCache.
+    Saat hit, pencarian FAISS dilewati; dokumen diambil langsung dari docstore.
+    """
+
+    db: Any
+    kelas: str
+    generation: int
+    cache: Any
+    k: int = 3
+
+    def _get_relevant_documents(
+        self, query: str, *, run_manager: CallbackManagerForRetrieverRun
+    ) -> List[Document]:
+        vector = self.db._embed_query(query)
+        bucket = self.cache.bucket(vector)
+
+        doc_ids = self.cache.get(self.kelas, self.generation, bucket)
+        if doc_ids is None:
+            _, positions = self.db.index.search(np.asarray([vector], dtype="float32"), self.k)
+            doc_ids = [self.db.index_to_docstore_id[int(i)] for i in positions[0] if i != -1]
+            self.cache.put(self.kelas, self.generation, bucket, doc_ids)
+
+        docs = []
+        for doc_id in doc_ids:
+            doc = self.db.docstore.search(doc_id)
+            if isinstance(doc, Document):
+                docs.append(doc)
+        return docs
@@ -1,13 +1,18 @@
 import base64
 import os
-import re
 import uuid
 from bson import ObjectId
-from flask import Blueprint, json, request, jsonify
+from pymongo.errors import DuplicateKeyError
+from flask import Blueprint, Response, json, request, jsonify, stream_with_context
 from extensions import mongo
 from datetime import datetime, timedelta
-from admin.progress.progress_service import recalc_progress
-from .service import ask_chatbot
+from admin.activity.activity_logger import activity_logger
+from admin.progress.progress_service import record_activity_day, record_answer_progress
+from .service import ask_chatbot, stream_chatbot, start_warmup, warmup
+from .answers import insert_answer
+from .question_cursor import next_unseen_question, next_unseen_questions
+from .question_pool import question_pool
+from .question_service import get_difficulty_by_kelas
 from chatbot import chatbot_bp
 
 
@@ -18,73 +23,40 @@ def update_streak(user_id: ObjectId):
     """
     Update jumlah hari belajar berurutan (streak_days)
     setiap kali user berinteraksi / menjawab soal.
+    Dihitung di server dalam satu update (lihat record_activity_day).
     """
     try:
-        progress_col = mongo.db.progress
-        today = datetime.now().date()
-
-        progress = progress_col.find_one({"_id": ObjectId(user_id)})
-
-        if not progress:
-            # jika belum ada progress, buat baru
-            new_data = {
-                "_id": ObjectId(user_id),
-                "literasi": 0,
-                "numerik": 0,
-                "sains": 0,
-                "rating": 0,
-                "rating_count": 0,
-                "total_lessons": 0,
-                "streak_days": 1,
-                "last_activity_date": today.isoformat()
-            }
-            progress_col.insert_one(new_data)
-            return
-
-        last_activity = progress.get("last_activity_date")
-        streak = progress.get("streak_days", 0)
-
-        if last_activity:
-            last_date = datetime.strptime(last_activity, "%Y-%m-%d").date()
-            delta = (today - last_date).days
-
-            if delta == 1:
-                streak += 1  # belajar berturut-turut
-            elif delta > 1:
-                streak = 1  # reset streak karena bolong
-            else:
-                streak = streak  # masih di hari yang sama
-        else:
-            streak = 1
-
-        progress_col.update_one(
-            {"_id": ObjectId(user_id)},
-            {
-                "$set": {
-                    "streak_days": streak,
-                    "last_activity_date": today.isoformat()
-                }
-            },
-        )
-
+        record_activity_day(user_id)
     except Exception as e:
         print("❌ update_streak error:", e)
 
-def get_difficulty_by_kelas(kelas):
+
+# ------------------ Readiness & warm-up ------------------
+@chatbot_bp.route("/ready", methods=["GET"])
+def ready():
     """
-    Menentukan tingkat kesulitan soal berdasarkan kelas SD
+    Readiness probe: 200 jika model sudah dimuat di worker ini. Jika belum,
+    probe memicu warm-up di background dan menjawab 503 sampai selesai.
     """
+    state = start_warmup()
+    if state["status"] == "ready":
+        return jsonify({"status": "ready"}), 200
+
+    body = {"status": "loading"}
+    if state["error"]:
+        body["last_error"] = state["error"]
+    return jsonify(body), 503
+
+
+@chatbot_bp.route("/warmup", methods=["POST"])
+def warmup_models():
+    """Muat LLM client + embeddings sekarang (idempotent)."""
     try:
-        kelas = int(kelas)
-    except (TypeError, ValueError):
-        return "mudah"
-
-    if kelas <= 2:
-        return "mudah"
-    elif kelas <= 4:
-        return "sedang"
-    else:
-        return "sulit"
+        timings = warmup()
+        return jsonify({"status": "ready", "load_ms": timings}), 200
+    except Exception as e:
+        print("❌ warmup error:", e)
+        return jsonify({"status": "error", "error": str(e)}), 500
 
 
 # ------------------ Chat umum ------------------
@@ -93,17 +65,72 @@ def chat():
     data = request.get_json()
     message = data.get("message", "")
     user_id = data.get("user_id")
+    kelas = data.get("kelas")
+    theme = data.get("theme")
 
     if not message:
         return jsonify({"error": "Message is required"}), 400
 
-    answer = ask_chatbot(message)
+    # 🔹 Scope semantic cache = (kelas, theme). Kelas scope diambil dari
+    # profil jika tidak dikirim; tanpa scope lengkap semantic cache tidak
+    # dipakai supaya pertanyaan dari kelas / tema berbeda tidak berbagi jawaban.
+    # Kelas profil hanya untuk scope cache: RAG tetap hanya jika client
+    # mengirim kelas (perilaku chat sebelumnya).
+    if theme not in ALLOWED_THEMES:
+        theme = None
+    cache_kelas = kelas
+    if theme and not cache_kelas and user_id and ObjectId.is_valid(user_id):
+        user = mongo.db.users.find_one({"_id": ObjectId(user_id)}, {"kelas": 1})
+        cache_kelas = (user or {}).get("kelas")
+    use_semantic_cache = bool(cache_kelas and theme)
+
+    # 🔹 Mode streaming (SSE) untuk client baru; client lama tetap dapat JSON
+    wants_stream = data.get("stream") or "text/event-stream" in request.headers.get("Accept", "")
+    if wants_stream:
+        return Response(
+            stream_with_context(_stream_chat(message, user_id, kelas, theme, use_semantic_cache, cache_kelas)),
+            mimetype="text/event-stream",
+            headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+        )
+
+    answer = ask_chatbot(message, kelas=kelas, theme=theme, use_semantic_cache=use_semantic_cache,
+                         cache_kelas=cache_kelas)
 
     if user_id:
         update_streak(user_id)
 
     return jsonify({"answer": answer})
 
+
+def _sse(event: str, payload: dict) -> str:
+    return f"event: {event}\ndata: {json.dumps(payload)}\n\n"
+
+
+def _stream_chat(message, user_id, kelas, theme, use_semantic_cache, cache_kelas):
+    """
+    Kirim token sebagai Server-Sent Events:
+    - event "token": {"token": "..."} per potongan jawaban
+    - event "done":  {"answer": "..."} jawaban lengkap
+    - event "error": {"error": "..."}
+    Streak di-update setelah stream selesai, bukan sebelum token pertama.
+    """
+    parts = []
+    try:
+        for token in stream_chatbot(message, kelas=kelas, theme=theme,
+                                    use_semantic_cache=use_semantic_cache, cache_kelas=cache_kelas):
+            parts.append(token)
+            yield _sse("token", {"token": token})
+
+        yield _sse("done", {"answer": "".join(parts)})
+
+    except Exception as e:
+        print("❌ Error stream chatbot:", e)
+        yield _sse("error", {"error": f"❌ Error chatbot: {str(e)}"})
+
+    finally:
+        if user_id:
+            update_streak(user_id)
+
 # ------------------ Ambil Soal ------------------
 @chatbot_bp.route("/get_question", methods=["GET"])
 def get_question():
@@ -125,21 +152,13 @@ def get_question():
     kelas = user.get("kelas", "1")
     difficulty = get_difficulty_by_kelas(kelas)
 
-    # 🔹 Ambil soal yang BELUM dijawab user
-    answered_ids = mongo.db.activity_logs.distinct(
-        "soal_id",
-        {"user_id": str(user_id), "theme": theme}
-    )
-
-    soal = mongo.db.questions.find_one({
-        "theme": theme,
-        "kelas": kelas,
-        "difficulty": difficulty,
-        "id": {"$nin": answered_ids}
-    })
+    # 🔹 Ambil soal yang BELUM dijawab user (cursor per user, bukan $nin
+    # seluruh riwayat jawaban — biaya tetap walau riwayat makin panjang)
+    soal = next_unseen_question(mongo.db, user_id, theme, kelas, difficulty)
 
     # 🔹 Kalau masih ada soal di DB
     if soal:
+        question_pool.mark_served(soal)
         return jsonify({
             "id": soal["id"],
             "theme": soal["theme"],
@@ -147,46 +166,76 @@ def get_question():
             "opsi": soal["opsi"]
         })
 
-    # ===============================
-    # 🔥 GENERATE BARU DARI AI
-    # ===============================
-    prompt = (
-        f"Buatkan 1 soal {theme} untuk siswa SD kelas {kelas} "
-        f"dengan tingkat kesulitan {difficulty}. "
-        f"Gunakan bahasa anak-anak.\n\n"
-        f"Format JSON MURNI:\n"
-        f"{{"
-        f"  \"pertanyaan\": \"\",\n"
-        f"  \"opsi\": [\"\", \"\", \"\", \"\"],\n"
-        f"  \"jawaban\": \"\",\n"
-        f"  \"penjelasan\": \"\"\n"
-        f"}}\n"
-        f"JANGAN tambahkan teks lain."
+    # 🔹 Bank soal habis: soal baru di-generate worker pool di background,
+    # request siswa tidak pernah menunggu LLM
+    question_pool.notify_empty(theme, kelas, difficulty)
+
+    response = jsonify({
+        "error": "Soal baru sedang disiapkan, coba lagi sebentar",
+        "retry_after": 5
+    })
+    response.headers["Retry-After"] = "5"
+    return response, 503
+
+# ------------------ Ambil Beberapa Soal Sekaligus ------------------
+MAX_PREFETCH_QUESTIONS = 20
+
+@chatbot_bp.route("/get_questions", methods=["GET"])
+def get_questions():
+    """
+    Versi batch dari /get_question: kembalikan sampai `count` soal yang
+    belum dijawab dalam satu request, supaya frontend bisa menyimpan antrean
+    lokal dan menampilkan soal berikutnya tanpa menunggu jaringan.
+    """
+    theme = request.args.get("theme")
+    user_id = request.args.get("user_id")
+
+    if not theme or not user_id:
+        return jsonify({"error": "theme dan user_id wajib dikirim"}), 400
+
+    try:
+        count = int(request.args.get("count", 5))
+    except ValueError:
+        return jsonify({"error": "count harus angka"}), 400
+    count = max(1, min(count, MAX_PREFETCH_QUESTIONS))
+
+    # 🔹 Lookup user & difficulty cukup sekali untuk seluruh batch
+    user = mongo.db.users.find_one(
+        {"_id": ObjectId(user_id)},
+        {"kelas": 1}
     )
 
-    soal_text = ask_chatbot(prompt)
+    if not user:
+        return jsonify({"error": "User tidak ditemukan"}), 404
 
-    match = re.search(r"\{.*\}", soal_text, re.DOTALL)
-    if not match:
-        return jsonify({"error": "AI gagal membuat soal"}), 500
+    kelas = user.get("kelas", "1")
+    difficulty = get_difficulty_by_kelas(kelas)
 
-    soal_dict = json.loads(match.group(0))
+    soal_list = next_unseen_questions(mongo.db, user_id, theme, kelas, difficulty, count=count)
 
-    soal_dict.update({
-        "id": str(uuid.uuid4()),
-        "theme": theme,
-        "kelas": kelas,
-        "difficulty": difficulty,
-        "created_at": datetime.utcnow()
-    })
+    if len(soal_list) < count:
+        # bank hampir habis untuk user ini: minta worker pool mengisi ulang
+        question_pool.notify_empty(theme, kelas, difficulty)
 
-    mongo.db.questions.insert_one(soal_dict)
+    if not soal_list:
+        response = jsonify({
+            "error": "Soal baru sedang disiapkan, coba lagi sebentar",
+            "retry_after": 5
+        })
+        response.headers["Retry-After"] = "5"
+        return response, 503
+
+    question_pool.mark_served_many(soal_list)
 
     return jsonify({
-        "id": soal_dict["id"],
-        "theme": soal_dict["theme"],
-        "pertanyaan": soal_dict["pertanyaan"],
-        "opsi": soal_dict["opsi"]
+        "questions": [{
+            "id": soal["id"],
+            "theme": soal["theme"],
+            "pertanyaan": soal["pertanyaan"],
+            "opsi": soal["opsi"]
+        } for soal in soal_list],
+        "count": len(soal_list),
+        "exhausted": len(soal_list) < count
     })
 
 # ------------------ Simpan Jawaban Soal ------------------
@@ -202,15 +251,6 @@ def save_answer():
     if not all([user_id, theme, soal_id, jawaban_user]):
         return jsonify({"error": "Data tidak lengkap"}), 400
 
-    # 🔹 Cegah jawaban dobel
-    already_answered = mongo.db.activity_logs.find_one({
-        "user_id": str(user_id),
-        "soal_id": soal_id
-    })
-
-    if already_answered:
-        return jsonify({"error": "Soal sudah pernah dijawab"}), 409
-
     # 🔹 Ambil soal
     soal = mongo.db.questions.find_one({"id": soal_id})
     if not soal:
@@ -234,8 +274,17 @@ def save_answer():
     benar = jawaban_user_clean == jawaban_benar_text
     score = 1 if benar else 0
 
-    # 🔹 Simpan log aktivitas
-    mongo.db.activity_logs.insert_one({
+    created_at = datetime.utcnow()
+
+    # 🔹 Simpan jawaban; index unique (user_id, soal_id) sekaligus mencegah
+    # jawaban dobel, termasuk double-submit yang datang bersamaan
+    try:
+        insert_answer(mongo.db, user_id, theme, soal, jawaban_user, benar, score, created_at)
+    except DuplicateKeyError:
+        return jsonify({"error": "Soal sudah pernah dijawab"}), 409
+
+    # 🔹 Simpan log aktivitas (write-behind, tidak menahan response)
+    activity_logger.log("activity_logs", {
         "user_id": str(user_id),
         "theme": theme,
         "soal_id": soal_id,
@@ -246,12 +295,12 @@ def save_answer():
         "jawaban_benar": jawaban_benar_text,
         "benar": benar,
         "score": score,
-        "created_at": datetime.utcnow()
+        "created_at": created_at
     })
 
-    # 🔹 Update progress & streak (opsional tapi bagus)
-    progress = recalc_progress(user_id)
-    update_streak(user_id)
+    # 🔹 Update progress & streak: satu update pipeline di server
+    # (rekonsiliasi penuh dari activity_logs: admin/progress/rebuild_progress.py)
+    progress = record_answer_progress(user_id, theme, score)
 
     return jsonify({
         "message": "Jawaban diproses",
@@ -274,8 +323,8 @@ def chatbot_feedback():
     if not user_id or rating is None:
         return jsonify({"error": "user_id dan rating wajib dikirim"}), 400
 
-    # Simpan feedback ke MongoDB
-    mongo.db.activity_logs.insert_one({
+    # Simpan feedback ke MongoDB (write-behind)
+    activity_logger.log("activity_logs", {
         "user_id": user_id,
         "theme": theme,
         "feedback": f"rating_{rating}",
@@ -285,7 +334,7 @@ def chatbot_feedback():
     })
 
     # Optional: update nilai rata-rata user (kalau kamu punya sistem poin)
-    from backend.admin.progress.progress_service import update_feedback_score
+    from admin.progress.progress_service import update_feedback_score
     new_rating = update_feedback_score(user_id, rating)
 
     return jsonify({"message": "Feedback tersimpan", "new_rating": new_rating})
@@ -321,7 +370,7 @@ def analyze_image():
             return jsonify({"answer": "Gambar tidak memiliki teks yang bisa dibaca."})
 
         prompt = f"Analisis teks berikut dari gambar dan berikan jawaban singkat untuk anak SD:\n\n{text}"
-        answer = ask_chatbot(prompt)
+        answer = ask_chatbot(prompt, cache_site="analyze_image")
 
         return jsonify({"answer": answer})
 
@@ -0,0 +1,221 @@
+# Semantic cache untuk jawaban chatbot
+# Pertanyaan yang mirip (beda kata, makna sama) dijawab dari cache
+# tanpa memanggil LLM. Lookup memakai index FAISS kecil per (kelas, theme).
+# Pertanyaan yang berisi angka tidak di-cache secara semantik: "12 + 5" dan
+# "12 + 6" hampir identik secara embedding tetapi jawabannya berbeda.
+
+import os
+import re
+import threading
+import time
+from collections import OrderedDict
+
+import faiss
+import numpy as np
+
+# ======================
+# CONFIG
+# ======================
+SEMANTIC_CACHE_THRESHOLD = float(os.getenv("SEMANTIC_CACHE_THRESHOLD", "0.92"))
+SEMANTIC_CACHE_TTL = int(os.getenv("SEMANTIC_CACHE_TTL", "86400"))
+SEMANTIC_CACHE_MAX_ENTRIES = int(os.getenv("SEMANTIC_CACHE_MAX_ENTRIES", "500"))
+# jumlah scope (kelas, theme) maksimum; scope paling lama tidak dipakai dibuang
+SEMANTIC_CACHE_MAX_SCOPES = int(os.getenv("SEMANTIC_CACHE_MAX_SCOPES", "64"))
+# pertanyaan pendek memakai ambang yang lebih ketat
+SEMANTIC_CACHE_SHORT_WORDS = int(os.getenv("SEMANTIC_CACHE_SHORT_WORDS", "5"))
+SEMANTIC_CACHE_SHORT_THRESHOLD = float(os.getenv("SEMANTIC_CACHE_SHORT_THRESHOLD", "0.97"))
+
+_DIGITS = re.compile(r"\d")
+
+
+class _Scope:
+    """Index FAISS + entri cache untuk satu pasangan (kelas, theme)."""
+
+    def __init__(self, dim: int):
+        # Inner product atas vektor ter-normalisasi = cosine similarity
+        self.index = faiss.IndexIDMap2(faiss.IndexFlatIP(dim))
+        # { entry_id: (message, answer, expires_at) }, urutan = LRU
+        self.entries = OrderedDict()
+
+    def remove(self, entry_id: int) -> None:
+        self.entries.pop(entry_id, None)
+        self.index.remove_ids(np.array([entry_id], dtype="int64"))
+
+
+class SemanticCache:
+    """
+    Cache jawaban berbasis kemiripan embedding.
+
+    Args:
+        embed_fn: fungsi text -> list[float] (mis. embeddings.embed_query)
+        threshold: cosine similarity minimum agar dianggap hit
+        ttl: umur entri dalam detik
+        max_entries: jumlah entri maksimum per scope (LRU)
+        max_scopes: jumlah scope maksimum (LRU)
+    """
+
+    def __init__(self, embed_fn, threshold=SEMANTIC_CACHE_THRESHOLD,
+                 ttl=SEMANTIC_CACHE_TTL, max_entries=SEMANTIC_CACHE_MAX_ENTRIES,
+                 max_scopes=SEMANTIC_CACHE_MAX_SCOPES):
+        self._embed_fn = embed_fn
+        self.threshold = threshold
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.max_scopes = max_scopes
+
+        self._lock = threading.Lock()
+        # { (kelas, theme): _Scope }, urutan = LRU
+        self._scopes = OrderedDict()
+        self._next_id = 0
+
+        self.hits = 0
+        self.misses = 0
+        self.skipped = 0
+        self.errors = 0
+        self.evictions = 0
+        self.scope_evictions = 0
+        self.expirations = 0
+
+    # ---------- Helpers ----------
+    def _embed(self, message: str) -> np.ndarray:
+        vec = np.asarray(self._embed_fn(message.strip()), dtype="float32").reshape(1, -1)
+        faiss.normalize_L2(vec)
+        return vec
+
+    @staticmethod
+    def _scope_key(kelas, theme):
+        return (str(kelas or "umum"), str(theme or "umum"))
+
+    @staticmethod
+    def cacheable(message: str) -> bool:
+        """Pertanyaan berisi angka selalu ke LLM (lihat catatan di atas)."""
+        return bool(message and message.strip()) and not _DIGITS.search(message)
+
+    def _threshold_for(self, message: str) -> float:
+        if len(message.split()) < SEMANTIC_CACHE_SHORT_WORDS:
+            return max(self.threshold, SEMANTIC_CACHE_SHORT_THRESHOLD)
+        return self.threshold
+
+    # ---------- API ----------
+    def lookup(self, message: str, kelas=None, theme=None):
+        """
+        Cari jawaban untuk pertanyaan yang mirip.
+
+        Returns:
+            (answer | None, vector) — vector dipakai ulang saat store().
+            Error embedding dianggap miss (None, None), bukan exception.
+        """
+        if not self.cacheable(message):
+            with self._lock:
+                self.skipped += 1
+            return None, None
+
+        try:
+            vec = self._embed(message)
+        except Exception as e:
+            with self._lock:
+                self.errors += 1
+            print("❌ semantic_cache embed error:", e)
+            return None, None
+
+        now = time.time()
+        threshold = self._threshold_for(message)
+
+        with self._lock:
+            key = self._scope_key(kelas, theme)
+            scope = self._scopes.get(key)
+            if scope is None or not scope.entries:
+                self.misses += 1
+                return None, vec
+            self._scopes.move_to_end(key)
+
+            k = min(4, len(scope.entries))
+            scores, ids = scope.index.search(vec, k)
+
+            for score, entry_id in zip(scores[0], ids[0]):
+                if entry_id == -1 or score < threshold:
+                    break
+
+                entry = scope.entries.get(int(entry_id))
+                if entry is None:
+                    continue
+
+                if entry[2] < now:
+                    scope.remove(int(entry_id))
+                    self.expirations += 1
+                    continue
+
+                scope.entries.move_to_end(int(entry_id))
+                self.hits += 1
+                return entry[1], vec
+
+            self.misses += 1
+            return None, vec
+
+    def store(self, message: str, answer: str, kelas=None, theme=None, vec=None) -> None:
+        """Simpan jawaban baru ke scope (kelas, theme). Error hanya dicatat."""
+        if not self.cacheable(message):
+            return
+
+        if vec is None:
+            try:
+                vec = self._embed(message)
+            except Exception as e:
+                with self._lock:
+                    self.errors += 1
+                print("❌ semantic_cache embed error:", e)
+                return
+
+        with self._lock:
+            key = self._scope_key(kelas, theme)
+            scope = self._scopes.get(key)
+            if scope is None:
+                scope = _Scope(vec.shape[1])
+                self._scopes[key] = scope
+                while len(self._scopes) > self.max_scopes:
+                    self._scopes.popitem(last=False)
+                    self.scope_evictions += 1
+            self._scopes.move_to_end(key)
+
+            # buang entri kedaluwarsa dulu, baru LRU
+            now = time.time()
+            expired = [eid for eid, e in scope.entries.items() if e[2] < now]
+            for eid in expired:
+                scope.remove(eid)
+            self.expirations += len(expired)
+
+            while len(scope.entries) >= self.max_entries:
+                oldest_id = next(iter(scope.entries))
+                scope.remove(oldest_id)
+                self.evictions += 1
+
+            entry_id = self._next_id
+            self._next_id += 1
+
+            scope.index.add_with_ids(vec, np.array([entry_id], dtype="int64"))
+            scope.entries[entry_id] = (message, answer, now + self.ttl)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._scopes.clear()
+
+    def stats(self) -> dict:
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / total, 4) if total else 0.0,
+                "skipped": self.skipped,
+                "errors": self.errors,
+                "evictions": self.evictions,
+                "scope_evictions": self.scope_evictions,
+                "max_scopes": self.max_scopes,
+                "expirations": self.expirations,
+                "threshold": self.threshold,
+                "ttl": self.ttl,
+                "max_entries_per_scope": self.max_entries,
+                "scopes": {
+                    f"{k[0]}:{k[1]}": len(s.entries) for k, s in self._scopes.items()
+                },
+            }
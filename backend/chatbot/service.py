@@ -1,51 +1,141 @@
 import os
-from langchain_groq import ChatGroq
-from langchain.chains import RetrievalQA
-from langchain_community.embeddings import HuggingFaceEmbeddings
-from langchain_community.vectorstores import FAISS
+import threading
+import time
+from llm.backends import get_chat_model, model_id
+from llm.prompt_cache import make_key, prompt_cache
+from llm.resilience import LLMUnavailable, llm_guard
+from llm.singleflight import singleflight
+from .retriever_registry import RetrieverRegistry
+from .retrieval_cache import RetrievalCache
+from .semantic_cache import SemanticCache
+from .vectorstore import VectorStoreManager
 
 # ======================
-# ENV
+# LLM & EMBEDDINGS (lazy)
 # ======================
-GROQ_API_KEY = os.getenv("GROQ_API_KEY")
+# Model tidak dibuat saat import: worker yang hanya melayani admin tidak
+# perlu membayar biaya load sentence-transformers. Pakai get_llm() /
+# get_embeddings(), atau warmup() dari readiness probe.
+LLM_MODEL = "llama-3.3-70b-versatile"
+LLM_TEMPERATURE = 0.3
+EMBEDDING_MODEL = "sentence-transformers/all-MiniLM-L6-v2"
+# embed_query dari request bersamaan digabung jadi satu batch (0 = matikan)
+EMBED_BATCHING = os.getenv("EMBED_BATCHING", "1") == "1"
+
+_llm = None
+_embeddings = None
+_model_lock = threading.Lock()
+
+# { "llm": ms, "embeddings": ms } — waktu inisialisasi tiap model
+MODEL_LOAD_TIMES = {}
+
+
+def get_llm():
+    global _llm
+    if _llm is None:
+        with _model_lock:
+            if _llm is None:
+                start = time.perf_counter()
+                # backend dipilih lewat LLM_BACKEND (groq / fake), lihat llm/backends.py
+                _llm = get_chat_model(LLM_MODEL, LLM_TEMPERATURE, max_tokens=400)
+                MODEL_LOAD_TIMES["llm"] = round((time.perf_counter() - start) * 1000, 1)
+    return _llm
+
+
+def get_embeddings():
+    global _embeddings
+    if _embeddings is None:
+        with _model_lock:
+            if _embeddings is None:
+                start = time.perf_counter()
+                from langchain_community.embeddings import HuggingFaceEmbeddings
+                _embeddings = HuggingFaceEmbeddings(model_name=EMBEDDING_MODEL)
+                if EMBED_BATCHING:
+                    from .embedding_batcher import BatchedEmbeddings
+                    _embeddings = BatchedEmbeddings(_embeddings)
+                MODEL_LOAD_TIMES["embeddings"] = round((time.perf_counter() - start) * 1000, 1)
+    return _embeddings
+
+
+def embedding_batch_stats() -> dict:
+    batcher = getattr(_embeddings, "batcher", None)
+    return batcher.stats() if batcher else {"enabled": EMBED_BATCHING, "loaded": False}
+
+
+def is_ready() -> bool:
+    return _llm is not None and _embeddings is not None
+
+
+def warmup() -> dict:
+    """
+    Muat LLM client + embeddings dan jalankan satu embedding dummy
+    supaya request pertama tidak menanggung biaya load. Idempotent.
+    """
+    get_llm()
+    start = time.perf_counter()
+    get_embeddings().embed_query("warmup")
+    MODEL_LOAD_TIMES.setdefault("first_embedding", round((time.perf_counter() - start) * 1000, 1))
+    return dict(MODEL_LOAD_TIMES)
+
+
+_warmup_thread = None
+_warmup_error = None
+# lock terpisah dari _model_lock: probe tidak boleh ikut menunggu model dimuat
+_warmup_lock = threading.Lock()
+
+
+def start_warmup() -> dict:
+    """
+    Jalankan warmup() di background jika belum siap dan belum berjalan.
+    Dipanggil readiness probe: worker yang belum pernah menerima request
+    tetap memuat model sendiri, tanpa menunggu CHATBOT_WARMUP_ON_START.
+
+    Returns:
+        {"status": "ready" | "loading", "error": pesan warm-up terakhir yang gagal}
+    """
+    global _warmup_thread
+    if is_ready():
+        return {"status": "ready", "error": None}
+
+    with _warmup_lock:
+        if _warmup_thread is None or not _warmup_thread.is_alive():
+            _warmup_thread = threading.Thread(target=_run_warmup, name="chatbot-warmup", daemon=True)
+            _warmup_thread.start()
+    return {"status": "loading", "error": _warmup_error}
+
+
+def _run_warmup() -> None:
+    global _warmup_error
+    try:
+        warmup()
+        _warmup_error = None
+    except Exception as e:
+        # probe berikutnya mencoba lagi
+        _warmup_error = str(e)
+        print("❌ warmup error:", e)
 
-# ======================
-# LLM
-# ======================
-llm = ChatGroq(
-    groq_api_key=GROQ_API_KEY,
-    model="llama-3.3-70b-versatile",
-    temperature=0.3,
-    max_tokens=400,
-)
 
 # ======================
-# EMBEDDINGS
+# SEMANTIC CACHE
 # ======================
-embeddings = HuggingFaceEmbeddings(
-    model_name="sentence-transformers/all-MiniLM-L6-v2"
-)
+semantic_cache = SemanticCache(embed_fn=lambda text: get_embeddings().embed_query(text))
 
 # ======================
-# CACHE FAISS
+# VECTORSTORE PER KELAS
 # ======================
-VECTOR_CACHE = {}
+vectorstores = VectorStoreManager(embeddings_fn=get_embeddings)
+
 
 def load_vectorstore_for_class(kelas):
-    if kelas in VECTOR_CACHE:
-        return VECTOR_CACHE[kelas]
-
-    path = f"vectorstore/{kelas}"
-    if os.path.exists(path):
-        db = FAISS.load_local(
-            path,
-            embeddings,
-            allow_dangerous_deserialization=True
-        )
-        VECTOR_CACHE[kelas] = db
-        return db
+    return vectorstores.get(kelas)
+
+
+# top-k id dokumen per (kelas, embedding query dibulatkan)
+RETRIEVAL_CACHE_ENABLED = os.getenv("RETRIEVAL_CACHE_ENABLED", "1") == "1"
+retrieval_cache = RetrievalCache() if RETRIEVAL_CACHE_ENABLED else None
 
-    return None
+# retriever per kelas, dibangun ulang hanya jika vectorstore berganti
+retrievers = RetrieverRegistry(vectorstores, retrieval_cache=retrieval_cache)
 
 # ======================
 # PROMPT
@@ -58,29 +148,158 @@ Jawaban harus:
 - Berdasarkan materi buku
 """
 
+# ======================
+# CACHE HELPERS
+# ======================
+def _cache_lookup(message, kelas, theme, use_semantic_cache, use_prompt_cache, cache_site,
+                  cache_kelas=None):
+    """
+    Cek cache exact-match lalu semantic.
+
+    Returns:
+        (cached_answer | None, prompt_cache_key | None, query_vector | None)
+    """
+    prompt = SYSTEM_PROMPT + "\n\n" + message
+
+    key = None
+    if use_prompt_cache:
+        key = make_key(model_id(LLM_MODEL), LLM_TEMPERATURE, prompt, kelas or "",
+                       strip_prefix=SYSTEM_PROMPT)
+        cached = prompt_cache.get(cache_site, key)
+        if cached is not None:
+            return cached, key, None
+
+    vec = None
+    if use_semantic_cache:
+        cached, vec = semantic_cache.lookup(message, cache_kelas or kelas, theme)
+        if cached is not None:
+            if key:
+                prompt_cache.set(cache_site, key, cached)
+            return cached, key, vec
+
+    return None, key, vec
+
+
+def _cache_store(message, answer, kelas, theme, key, vec, use_semantic_cache, cache_site,
+                 cache_kelas=None):
+    if key:
+        prompt_cache.set(cache_site, key, answer)
+    if use_semantic_cache:
+        semantic_cache.store(message, answer, cache_kelas or kelas, theme, vec=vec)
+
+
 # ======================
 # CHATBOT
 # ======================
-def ask_chatbot(message: str, kelas: str = None) -> str:
+def _build_llm_input(llm, message, kelas):
+    """
+    Prompt untuk model: dengan konteks RAG (prompt "stuff" yang sama dengan
+    RetrievalQA) jika vectorstore kelas tersedia, atau prompt biasa.
+    """
+    prompt = SYSTEM_PROMPT + "\n\n" + message
+    if not kelas:
+        return prompt
+
+    retriever = retrievers.get_retriever(kelas)
+    if not retriever:
+        return prompt
+
+    from langchain.chains.question_answering.stuff_prompt import (
+        PROMPT_SELECTOR as QA_PROMPT_SELECTOR
+    )
+    docs = retriever.invoke(prompt)
+    context = "\n\n".join(doc.page_content for doc in docs)
+    return QA_PROMPT_SELECTOR.get_prompt(llm).format_messages(
+        context=context, question=prompt
+    )
+
+
+def ask_chatbot(message: str, kelas: str = None, theme: str = None,
+                use_semantic_cache: bool = False, use_prompt_cache: bool = True,
+                cache_site: str = "chat", cache_kelas: str = None) -> str:
+    """
+    Kirim pertanyaan ke LLM (dengan RAG jika vectorstore kelas tersedia).
+
+    use_semantic_cache hanya untuk pertanyaan bebas dari siswa (/chatbot/chat);
+    prompt generate soal tidak boleh di-cache secara semantik karena prompt
+    antar kelas sangat mirip tetapi jawabannya harus berbeda.
+    cache_kelas (opsional) hanya menentukan scope semantic cache, tanpa
+    mengaktifkan RAG seperti kelas.
+    use_prompt_cache memakai cache exact-match (prompt identik setelah normalisasi);
+    prompt identik yang sedang diproses bersamaan juga digabung (single-flight).
+    Panggilan LLM dibatasi deadline + circuit breaker per cache_site (llm/resilience.py).
+    """
     try:
-        prompt = SYSTEM_PROMPT + "\n\n" + message
-
-        if kelas:
-            db = load_vectorstore_for_class(kelas)
-            if db:
-                retriever = db.as_retriever(search_kwargs={"k": 3})
-                qa = RetrievalQA.from_chain_type(
-                    llm=llm,
-                    retriever=retriever
-                )
-                return qa.run(prompt)
-
-        # fallback LLM biasa
-        response = llm.invoke(prompt)
-        return response.content
+        cached, key, vec = _cache_lookup(
+            message, kelas, theme, use_semantic_cache, use_prompt_cache, cache_site, cache_kelas
+        )
+        if cached is not None:
+            return cached
+
+        def _stale():
+            return prompt_cache.get_stale(cache_site, key) if key else None
+
+        def _generate():
+            # vectorstore, embeddings, dan retrieval disiapkan di luar deadline
+            # LLM: cold start / disk lambat tidak boleh membuka circuit breaker
+            llm = get_llm()
+            llm_input = _build_llm_input(llm, message, kelas)
+
+            def _call_llm():
+                answer = llm.invoke(llm_input).content
+
+                # disimpan di sini (bukan di pemanggil) supaya jawaban yang
+                # datang setelah deadline tetap masuk cache untuk request berikutnya
+                _cache_store(message, answer, kelas, theme, key, vec, use_semantic_cache, cache_site,
+                             cache_kelas)
+                return answer
+
+            # deadline + circuit breaker hanya untuk panggilan model;
+            # jika LLM gagal, pakai jawaban cache lama
+            return llm_guard.call_or_stale(cache_site, _call_llm, _stale)
+
+        # prompt yang sengaja tidak di-cache (mis. generate soal) juga tidak digabung
+        if key is None:
+            return _generate()
+        return singleflight.do(cache_site, key, _generate)
 
     except Exception as e:
         return f"❌ Error chatbot: {str(e)}"
-    
 
 
+def stream_chatbot(message: str, kelas: str = None, theme: str = None,
+                   use_semantic_cache: bool = False, use_prompt_cache: bool = True,
+                   cache_site: str = "chat", cache_kelas: str = None):
+    """
+    Versi streaming dari ask_chatbot: generator yang menghasilkan potongan
+    jawaban (token) segera setelah dikirim model.
+
+    Prompt dibangun dengan _build_llm_input yang sama seperti ask_chatbot.
+    Exception tidak ditelan di sini; route yang memutuskan bagaimana error dikirim ke client.
+    """
+    cached, key, vec = _cache_lookup(
+        message, kelas, theme, use_semantic_cache, use_prompt_cache, cache_site, cache_kelas
+    )
+    if cached is not None:
+        yield cached
+        return
+
+    llm = get_llm()
+    llm_input = _build_llm_input(llm, message, kelas)
+
+    parts = []
+    try:
+        for chunk in llm_guard.stream(cache_site, lambda: llm.stream(llm_input)):
+            if chunk.content:
+                parts.append(chunk.content)
+                yield chunk.content
+    except LLMUnavailable:
+        # breaker terbuka / timeout sebelum token pertama: sajikan jawaban cache lama jika ada
+        stale = prompt_cache.get_stale(cache_site, key) if key else None
+        if stale is None or parts:
+            raise
+        yield stale
+        return
+
+    _cache_store(message, "".join(parts), kelas, theme, key, vec, use_semantic_cache, cache_site,
+                 cache_kelas)
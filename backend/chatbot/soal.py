@@ -1,79 +1,389 @@
+"""
+Ingestion materi buku → vectorstore FAISS per kelas.
+
+Struktur folder materi (kelas dibaca dari nama folder "kelas<N>" di mana pun
+di path-nya, mis. materi/sains/kelas1/*.pdf atau materi/kelas2/literasi/*.pdf).
 
+Hasil ditulis ke <out>/<kelas>/ dengan layout yang dibaca
+load_vectorstore_for_class (index.faiss + index.pkl), plus manifest.json
+berisi hash isi tiap PDF. Run berikutnya hanya memproses PDF yang baru /
+berubah dan membuang chunk dari PDF yang dihapus.
 
-# 1️⃣ Import library
-from langchain_community.document_loaders import PyPDFLoader
-from langchain.text_splitter import RecursiveCharacterTextSplitter
-from langchain_community.embeddings import HuggingFaceEmbeddings
-from langchain_community.vectorstores import FAISS
-
-# 2️⃣ Daftar file PDF per kelas
-pdf_path = {
-    "kelas1": [
-        "/content/drive/MyDrive/SEMESTER 7/MAGANG/chatbot/materi/sains/kelas1/Kelas I Tema 7 BS press.pdf",
-        "/content/drive/MyDrive/SEMESTER 7/MAGANG/chatbot/materi/sains/kelas1/Kelas I Tema 8 BG press.pdf",
-        "/content/drive/MyDrive/SEMESTER 7/MAGANG/chatbot/materi/sains/kelas1/Kelas I Tema 8 BS press.pdf",
-    ],
-    "kelas2": [
-        "/content/drive/MyDrive/SEMESTER 7/MAGANG/chatbot/materi/sains/kelas2/Kelas 2 Tema 4 BS press.pdf",
-        "/content/drive/MyDrive/SEMESTER 7/MAGANG/chatbot/materi/sains/kelas2/Kelas 2 Tema 6 BG press.pdf",
-        "/content/drive/MyDrive/SEMESTER 7/MAGANG/chatbot/materi/sains/kelas2/Kelas 2 Tema 6 BS press.pdf"
-    ],
-}
-
-# 3️⃣ Gabungkan semua dokumen dari semua file PDF
-docs = []
-
-for kelas, paths in pdf_path.items():
-    print(f"📘 Memuat file untuk {kelas}...")
-    for path in paths:
-        loader = PyPDFLoader(path)
-        data = loader.load()
-        docs.extend(data)
-        print(f"   ✅ {path.split('/')[-1]} berhasil dimuat ({len(data)} halaman)")
-
-print(f"\nTotal dokumen berhasil dimuat: {len(docs)}")
-
-# 4️⃣ Pecah teks menjadi potongan kecil agar bisa diproses model
-splitter = RecursiveCharacterTextSplitter(chunk_size=1000, chunk_overlap=150)
-texts = splitter.split_documents(docs)
-print(f"Total potongan teks: {len(texts)}")
-
-# 5️⃣ Buat embedding (representasi numerik dari teks)
-embeddings = HuggingFaceEmbeddings(model_name="sentence-transformers/all-MiniLM-L6-v2")
-
-# 6️⃣ Simpan semua teks ke database FAISS
-db = FAISS.from_documents(texts, embeddings)
-print("✅ Database FAISS berhasil dibuat!")
+Tipe index (--index-type):
+- flat  : default, exhaustive search
+- hnsw  : ANN berbasis graph (--hnsw-m, --hnsw-ef-construction, --hnsw-ef-search)
+- ivfpq : ANN terkompresi (--ivf-nlist, --pq-m, --pq-nbits, --nprobe)
+Untuk hnsw/ivfpq, index flat tetap disimpan di <out>/<kelas>/flat/ sebagai
+sumber incremental; index ANN dibangun ulang dari vektornya tanpa re-embed.
+
+Jalankan dari folder backend:
+    python -m chatbot.soal --materi materi --out vectorstore
+    python -m chatbot.soal --kelas 1 --kelas 2 --workers 4
+    python -m chatbot.soal --force          # rebuild penuh
+"""
 
+import argparse
+import hashlib
+import json
 import os
-from langchain_groq import ChatGroq
-from langchain.chains import RetrievalQA
+import re
+import shutil
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
 
-os.environ["GROQ_API_KEY"] = "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"
+from .service import EMBEDDING_MODEL
+from .vectorstore import (
+    DEFAULT_INDEX_PARAMS,
+    INDEX_META_FILE,
+    INDEX_TYPES,
+    VECTORSTORE_DIR,
+    build_ann_index,
+    read_index_meta,
+)
 
-llm = ChatGroq(model="llama-3.3-70b-versatile")
-retriever = db.as_retriever(search_kwargs={"k": 3})
-qa = RetrievalQA.from_chain_type(llm=llm, retriever=retriever)
+MANIFEST_FILE = "manifest.json"
+FLAT_SUBDIR = "flat"
+_KELAS_DIR = re.compile(r"^kelas[\s_-]*(\d+)$", re.IGNORECASE)
 
-prompt = """
-Kamu adalah guru SD yang membuat soal untuk murid kelas 1 berdasarkan materi sains dari buku pelajaran.
 
-Gunakan isi materi berikut (hasil dari file PDF) untuk membuat 1 soal pilihan ganda dalam format berikut:
+# =========================
+# 1. DISCOVER PDF PER KELAS
+# =========================
+def discover_pdfs(materi_dir: str) -> dict:
+    """Returns { kelas: [path_pdf, ...] } dengan path relatif terhadap materi_dir."""
+    result = {}
+    for root, _dirs, files in os.walk(materi_dir):
+        rel_root = os.path.relpath(root, materi_dir)
+        kelas = None
+        for part in rel_root.split(os.sep):
+            match = _KELAS_DIR.match(part)
+            if match:
+                kelas = str(int(match.group(1)))
 
-Soal:
-A.
-B.
-C.
-D.
-✅ Jawaban Benar:
-💡 Penjelasan:
+        if kelas is None:
+            continue
+
+        for name in sorted(files):
+            if name.lower().endswith(".pdf"):
+                result.setdefault(kelas, []).append(os.path.normpath(os.path.join(rel_root, name)))
+    return result
+
+
+def file_sha256(path: str) -> str:
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1024 * 1024), b""):
+            h.update(block)
+    return h.hexdigest()
+
+
+# =========================
+# 2. LOAD + SPLIT (PROCESS POOL)
+# =========================
+def _load_and_split(path: str, rel_path: str, chunk_size: int, chunk_overlap: int):
+    """Dijalankan di proses worker: PDF → list Document ter-chunk."""
+    from langchain_community.document_loaders import PyPDFLoader
+    from langchain.text_splitter import RecursiveCharacterTextSplitter
+
+    pages = PyPDFLoader(path).load()
+    for page in pages:
+        page.metadata["source"] = rel_path
+
+    splitter = RecursiveCharacterTextSplitter(chunk_size=chunk_size, chunk_overlap=chunk_overlap)
+    return splitter.split_documents(pages), len(pages)
+
+
+# =========================
+# 3. MANIFEST & SAVE
+# =========================
+def _read_manifest(out_path: str) -> dict:
+    try:
+        with open(os.path.join(out_path, MANIFEST_FILE), "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (FileNotFoundError, json.JSONDecodeError):
+        return {}
+
+
+def _write_manifest(out_path: str, manifest: dict) -> None:
+    tmp_file = os.path.join(out_path, MANIFEST_FILE + ".tmp")
+    with open(tmp_file, "w", encoding="utf-8") as f:
+        json.dump(manifest, f, ensure_ascii=False, indent=2)
+    os.replace(tmp_file, os.path.join(out_path, MANIFEST_FILE))
+
+
+def _files_meta_changed(old_files: dict, stats: dict) -> bool:
+    """True jika ada PDF yang hanya berubah mtime (isi sama) sejak manifest ditulis."""
+    return any(
+        old_files.get(rel, {}).get("mtime_ns") != st["mtime_ns"] for rel, st in stats.items()
+    )
+
+
+def _save(db, out_path: str, manifest: dict) -> None:
+    """
+    Simpan ke folder sementara lalu ganti file satu per satu. index.faiss
+    diganti terakhir karena mtime-nya yang memicu reload di VectorStoreManager.
+    """
+    tmp_path = out_path.rstrip(os.sep) + ".tmp"
+    shutil.rmtree(tmp_path, ignore_errors=True)
+    db.save_local(tmp_path)
+
+    with open(os.path.join(tmp_path, MANIFEST_FILE), "w", encoding="utf-8") as f:
+        json.dump(manifest, f, ensure_ascii=False, indent=2)
+
+    os.makedirs(out_path, exist_ok=True)
+    for name in (MANIFEST_FILE, "index.pkl", "index.faiss"):
+        os.replace(os.path.join(tmp_path, name), os.path.join(out_path, name))
+    shutil.rmtree(tmp_path, ignore_errors=True)
+
+
+# =========================
+# 4. INDEX ANN
+# =========================
+def _place_master(out_path: str, index_type: str) -> str:
+    """
+    Pindahkan index flat (sumber incremental) ke lokasi yang sesuai tipe index:
+    flat → <out>/<kelas>/, ANN → <out>/<kelas>/flat/.
+    """
+    nested = os.path.join(out_path, FLAT_SUBDIR)
+
+    if index_type == "flat":
+        if os.path.exists(os.path.join(nested, MANIFEST_FILE)):
+            for name in (MANIFEST_FILE, "index.pkl", "index.faiss"):
+                os.replace(os.path.join(nested, name), os.path.join(out_path, name))
+            shutil.rmtree(nested, ignore_errors=True)
+            if os.path.exists(os.path.join(out_path, INDEX_META_FILE)):
+                os.remove(os.path.join(out_path, INDEX_META_FILE))
+        return out_path
+
+    if (not os.path.exists(os.path.join(nested, MANIFEST_FILE))
+            and os.path.exists(os.path.join(out_path, MANIFEST_FILE))
+            and read_index_meta(out_path).get("type") == "flat"):
+        os.makedirs(nested, exist_ok=True)
+        for name in ("index.pkl", "index.faiss"):
+            shutil.copy2(os.path.join(out_path, name), os.path.join(nested, name))
+        os.replace(os.path.join(out_path, MANIFEST_FILE), os.path.join(nested, MANIFEST_FILE))
+    return nested
+
+
+def _build_ann(master_path: str, out_path: str, index_type: str, params: dict, rebuild: bool) -> dict:
+    """Bangun index ANN dari vektor index flat, tanpa embed ulang."""
+    import faiss
+
+    wanted = {"type": index_type, "params": params}
+    current = read_index_meta(out_path)
+    if not rebuild and os.path.exists(os.path.join(out_path, "index.faiss")) \
+            and current.get("requested") == wanted:
+        return current
+
+    flat = faiss.read_index(os.path.join(master_path, "index.faiss"))
+    vectors = flat.reconstruct_n(0, flat.ntotal)
+
+    start = time.perf_counter()
+    index, meta = build_ann_index(vectors, index_type, params)
+    meta["requested"] = wanted
+    meta["build_seconds"] = round(time.perf_counter() - start, 2)
+
+    # urutan vektor sama dengan flat, jadi docstore + mapping bisa dipakai apa adanya
+    faiss.write_index(index, os.path.join(out_path, "index.faiss.tmp"))
+    shutil.copy2(os.path.join(master_path, "index.pkl"), os.path.join(out_path, "index.pkl.tmp"))
+    with open(os.path.join(out_path, INDEX_META_FILE), "w", encoding="utf-8") as f:
+        json.dump(meta, f, indent=2)
+    os.replace(os.path.join(out_path, "index.pkl.tmp"), os.path.join(out_path, "index.pkl"))
+    os.replace(os.path.join(out_path, "index.faiss.tmp"), os.path.join(out_path, "index.faiss"))
+
+    print(f"   🧭 Index {meta['type']} dibangun ({flat.ntotal} vektor, {meta['build_seconds']} detik)")
+    return meta
+
+
+# =========================
+# 5. BUILD PER KELAS
+# =========================
+def build_kelas(kelas: str, pdfs: list, materi_dir: str, out_dir: str, embeddings,
+                executor, chunk_size=1000, chunk_overlap=150, force=False,
+                index_type="flat", index_params=None) -> dict:
+    from langchain_community.vectorstores import FAISS
+
+    start = time.perf_counter()
+    out_path = os.path.join(out_dir, kelas)
+    os.makedirs(out_path, exist_ok=True)
+    master_path = _place_master(out_path, index_type)
+    index_params = index_params or {}
+    settings = {
+        "embedding_model": EMBEDDING_MODEL,
+        "chunk_size": chunk_size,
+        "chunk_overlap": chunk_overlap,
+    }
+
+    manifest = _read_manifest(master_path)
+    has_store = os.path.exists(os.path.join(master_path, "index.faiss"))
+    if force or not has_store or manifest.get("settings") != settings:
+        manifest = {}
+    old_files = manifest.get("files", {})
+
+    # hash ulang hanya jika ukuran / mtime berubah
+    hashes, stats = {}, {}
+    for rel in pdfs:
+        st = os.stat(os.path.join(materi_dir, rel))
+        stats[rel] = {"size": st.st_size, "mtime_ns": st.st_mtime_ns}
+        old = old_files.get(rel, {})
+        if old.get("size") == st.st_size and old.get("mtime_ns") == st.st_mtime_ns:
+            hashes[rel] = old["sha256"]
+        else:
+            hashes[rel] = file_sha256(os.path.join(materi_dir, rel))
+
+    changed = [rel for rel in pdfs if old_files.get(rel, {}).get("sha256") != hashes[rel]]
+    removed = [rel for rel in old_files if rel not in hashes]
+    unchanged = len(pdfs) - len(changed)
+
+    print(f"📘 Kelas {kelas}: {len(pdfs)} PDF ({len(changed)} baru/berubah, {len(removed)} dihapus)")
+
+    if not changed and not removed:
+        if manifest and _files_meta_changed(old_files, stats):
+            _write_manifest(master_path, {"settings": settings, "files": {
+                rel: {**old_files[rel], **stats[rel]} for rel in pdfs
+            }})
+        print("   ⏭️  Tidak ada perubahan materi")
+        if index_type != "flat" and has_store:
+            _build_ann(master_path, out_path, index_type, index_params, rebuild=False)
+        return {"kelas": kelas, "changed": 0, "removed": 0, "chunks_added": 0, "skipped": unchanged}
+
+    # 🔹 Load + split PDF yang berubah secara paralel
+    futures = {
+        executor.submit(_load_and_split, os.path.join(materi_dir, rel), rel, chunk_size, chunk_overlap): rel
+        for rel in changed
+    }
+    new_docs, new_ids = [], []
+    files = {rel: {**old_files[rel], **stats[rel]} for rel in pdfs if rel not in changed}
+    for future in as_completed(futures):
+        rel = futures[future]
+        chunks, n_pages = future.result()
+        # id stabil per (isi, path): PDF identik di dua folder tidak bentrok
+        prefix = hashlib.sha1(f"{rel}:{hashes[rel]}".encode("utf-8")).hexdigest()[:16]
+        ids = [f"{prefix}:{i}" for i in range(len(chunks))]
+        new_docs.extend(chunks)
+        new_ids.extend(ids)
+        files[rel] = {"sha256": hashes[rel], **stats[rel], "pages": n_pages, "ids": ids}
+        print(f"   ✅ {os.path.basename(rel)} dimuat ({n_pages} halaman, {len(chunks)} potongan)")
+
+    # 🔹 Buang chunk lama dari PDF yang berubah / dihapus
+    stale_ids = []
+    for rel in changed + removed:
+        stale_ids.extend(old_files.get(rel, {}).get("ids", []))
+
+    db = None
+    if manifest and has_store:
+        db = FAISS.load_local(master_path, embeddings, allow_dangerous_deserialization=True)
+        if stale_ids:
+            db.delete(stale_ids)
+
+    # 🔹 Embed hanya chunk baru
+    if new_docs:
+        if db is None:
+            db = FAISS.from_documents(new_docs, embeddings, ids=new_ids)
+        else:
+            db.add_documents(new_docs, ids=new_ids)
+
+    if db is None or not db.index_to_docstore_id:
+        shutil.rmtree(out_path, ignore_errors=True)
+        print(f"   🗑️  Vectorstore kelas {kelas} kosong, dihapus")
+    else:
+        _save(db, master_path, {"settings": settings, "files": files})
+        if index_type != "flat":
+            _build_ann(master_path, out_path, index_type, index_params, rebuild=True)
+
+    elapsed = round(time.perf_counter() - start, 2)
+    print(f"   💾 Kelas {kelas} selesai dalam {elapsed} detik ({len(new_docs)} potongan baru)")
+
+    return {
+        "kelas": kelas,
+        "changed": len(changed),
+        "removed": len(removed),
+        "chunks_added": len(new_docs),
+        "skipped": unchanged,
+        "seconds": elapsed,
+    }
+
+
+# =========================
+# 6. CLI
+# =========================
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Bangun vectorstore FAISS per kelas dari PDF materi (incremental).",
+    )
+    parser.add_argument("--materi", default="materi", help="Folder materi PDF")
+    parser.add_argument("--out", default=VECTORSTORE_DIR, help="Folder output vectorstore")
+    parser.add_argument("--kelas", action="append", help="Hanya proses kelas ini (boleh berulang)")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1, help="Jumlah proses loader PDF")
+    parser.add_argument("--chunk-size", type=int, default=1000)
+    parser.add_argument("--chunk-overlap", type=int, default=150)
+    parser.add_argument("--force", action="store_true", help="Abaikan manifest, rebuild penuh")
+    parser.add_argument("--index-type", choices=INDEX_TYPES, default="flat")
+    parser.add_argument("--hnsw-m", type=int, default=DEFAULT_INDEX_PARAMS["hnsw"]["m"])
+    parser.add_argument("--hnsw-ef-construction", type=int, default=DEFAULT_INDEX_PARAMS["hnsw"]["ef_construction"])
+    parser.add_argument("--hnsw-ef-search", type=int, default=DEFAULT_INDEX_PARAMS["hnsw"]["ef_search"])
+    parser.add_argument("--ivf-nlist", type=int, default=DEFAULT_INDEX_PARAMS["ivfpq"]["nlist"], help="0 = otomatis")
+    parser.add_argument("--pq-m", type=int, default=DEFAULT_INDEX_PARAMS["ivfpq"]["pq_m"])
+    parser.add_argument("--pq-nbits", type=int, default=DEFAULT_INDEX_PARAMS["ivfpq"]["pq_nbits"])
+    parser.add_argument("--nprobe", type=int, default=DEFAULT_INDEX_PARAMS["ivfpq"]["nprobe"])
+    args = parser.parse_args(argv)
+
+    index_params = {
+        "flat": {},
+        "hnsw": {
+            "m": args.hnsw_m,
+            "ef_construction": args.hnsw_ef_construction,
+            "ef_search": args.hnsw_ef_search,
+        },
+        "ivfpq": {
+            "nlist": args.ivf_nlist,
+            "pq_m": args.pq_m,
+            "pq_nbits": args.pq_nbits,
+            "nprobe": args.nprobe,
+        },
+    }[args.index_type]
+
+    from langchain_community.embeddings import HuggingFaceEmbeddings
+
+    pdfs_by_kelas = discover_pdfs(args.materi)
+
+    # kelas yang sudah punya vectorstore tapi semua PDF-nya dihapus
+    if os.path.isdir(args.out):
+        for name in os.listdir(args.out):
+            if name.isdigit() and (
+                os.path.exists(os.path.join(args.out, name, MANIFEST_FILE))
+                or os.path.exists(os.path.join(args.out, name, FLAT_SUBDIR, MANIFEST_FILE))
+            ):
+                pdfs_by_kelas.setdefault(name, [])
+    if args.kelas:
+        pdfs_by_kelas = {k: v for k, v in pdfs_by_kelas.items() if k in set(args.kelas)}
+
+    if not pdfs_by_kelas:
+        print(f"⚠️ Tidak ada PDF di folder kelas<N> dalam {args.materi}")
+        return []
+
+    embeddings = HuggingFaceEmbeddings(model_name=EMBEDDING_MODEL)
+    results = []
+
+    with ProcessPoolExecutor(max_workers=max(1, args.workers)) as executor:
+        for kelas in sorted(pdfs_by_kelas, key=int):
+            results.append(build_kelas(
+                kelas,
+                pdfs_by_kelas[kelas],
+                args.materi,
+                args.out,
+                embeddings,
+                executor,
+                chunk_size=args.chunk_size,
+                chunk_overlap=args.chunk_overlap,
+                force=args.force,
+                index_type=args.index_type,
+                index_params=index_params,
+            ))
+
+    print("\n✅ Ingestion selesai")
+    return results
 
-Ketentuan:
-- Gunakan bahasa Indonesia yang sederhana, sesuai untuk anak kelas 1 SD.
-- Soal harus tentang sains dasar, seperti makhluk hidup, benda di sekitar, perubahan cuaca, air, udara, atau bumi.
-- Pastikan jawaban dan penjelasan benar-benar sesuai isi materi dalam buku yang dianalisis.
-"""
 
-hasil = qa.run(prompt)
-print("📚 Hasil Soal Sains:\n")
-print(hasil)
\ No newline at end of file
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,342 @@
+# Manager vectorstore FAISS per kelas
+# - Index dibuka memory-mapped: page index dibagi antar worker lewat
+#   page cache OS, bukan di-deserialize penuh di tiap worker.
+# - Memori privat (docstore + index yang tidak bisa di-mmap) dibatasi
+#   budget, dengan eviksi LRU.
+
+import json
+import math
+import os
+import pickle
+import threading
+import time
+from collections import OrderedDict
+
+# ======================
+# CONFIG
+# ======================
+VECTORSTORE_DIR = os.getenv("VECTORSTORE_DIR", "vectorstore")
+VECTORSTORE_MEMORY_MB = int(os.getenv("VECTORSTORE_MEMORY_MB", "512"))
+VECTORSTORE_MMAP = os.getenv("VECTORSTORE_MMAP", "1") == "1"
+# override parameter pencarian ANN saat load (kosong = pakai index_meta.json)
+VECTORSTORE_EF_SEARCH = os.getenv("VECTORSTORE_EF_SEARCH", "")
+VECTORSTORE_NPROBE = os.getenv("VECTORSTORE_NPROBE", "")
+
+# ======================
+# TIPE INDEX
+# ======================
+# flat  : exhaustive search, float32 penuh (default LangChain)
+# hnsw  : graph ANN, cepat, memori ~ flat + graph
+# ivfpq : inverted list + product quantization, memori jauh lebih kecil
+INDEX_TYPES = ("flat", "hnsw", "ivfpq")
+INDEX_META_FILE = "index_meta.json"
+DEFAULT_INDEX_PARAMS = {
+    "flat": {},
+    "hnsw": {"m": 32, "ef_construction": 200, "ef_search": 64},
+    "ivfpq": {"nlist": 0, "pq_m": 48, "pq_nbits": 8, "nprobe": 16},  # nlist 0 = otomatis
+}
+
+
+def read_index_meta(path: str) -> dict:
+    try:
+        with open(os.path.join(path, INDEX_META_FILE), "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (FileNotFoundError, json.JSONDecodeError):
+        return {"type": "flat", "params": {}}
+
+
+def build_ann_index(vectors, index_type: str, params: dict = None):
+    """
+    Bangun index FAISS (metric L2, sama dengan default LangChain) dari vektor.
+
+    Returns:
+        (index, meta) — meta = {"type", "params"} efektif. Jika data terlalu
+        sedikit untuk melatih IVF-PQ, jatuh ke flat.
+    """
+    import faiss
+    import numpy as np
+
+    vectors = np.ascontiguousarray(vectors, dtype="float32")
+    n, d = vectors.shape
+    params = {**DEFAULT_INDEX_PARAMS.get(index_type, {}), **(params or {})}
+
+    if index_type == "hnsw":
+        index = faiss.IndexHNSWFlat(d, int(params["m"]))
+        index.hnsw.efConstruction = int(params["ef_construction"])
+        index.add(vectors)
+
+    elif index_type == "ivfpq":
+        nlist = int(params["nlist"]) or int(4 * math.sqrt(n))
+        nlist = max(1, min(nlist, n // 39))
+        nbits = int(params["pq_nbits"])
+        # pq_m harus membagi dimensi
+        pq_m = max(m for m in range(1, int(params["pq_m"]) + 1) if d % m == 0)
+
+        if n < max(2 ** nbits, 39 * nlist):
+            print(f"⚠️ {n} vektor terlalu sedikit untuk IVF-PQ, pakai flat")
+            return build_ann_index(vectors, "flat")
+
+        quantizer = faiss.IndexFlatL2(d)
+        index = faiss.IndexIVFPQ(quantizer, d, nlist, pq_m, nbits)
+        index.train(vectors)
+        index.add(vectors)
+        params = {**params, "nlist": nlist, "pq_m": pq_m}
+
+    else:
+        index_type, params = "flat", {}
+        index = faiss.IndexFlatL2(d)
+        index.add(vectors)
+
+    apply_search_params(index, {"type": index_type, "params": params})
+    return index, {"type": index_type, "params": params}
+
+
+def apply_search_params(index, meta: dict) -> None:
+    """Set efSearch (HNSW) / nprobe (IVF) dari meta, bisa di-override lewat env."""
+    import faiss
+
+    index_type = meta.get("type", "flat")
+    params = meta.get("params", {})
+
+    if index_type == "hnsw":
+        index.hnsw.efSearch = int(VECTORSTORE_EF_SEARCH or params.get("ef_search", 64))
+    elif index_type == "ivfpq":
+        faiss.extract_index_ivf(index).nprobe = int(VECTORSTORE_NPROBE or params.get("nprobe", 16))
+
+
+def _mapped_bytes(faiss, index) -> int:
+    """
+    Perkiraan byte index yang benar-benar memory-mapped setelah read_index.
+
+    read_index dengan flag mmap tidak error untuk tipe / versi faiss yang
+    tidak mendukungnya; index tetap dibaca penuh ke RAM. Jadi dicek dari
+    objeknya: inverted list IVF harus OnDiskInvertedLists, dan code flat
+    (IndexFlat / storage HNSW, IO_FLAG_MMAP_IFC) tidak dimiliki index.
+    Jika tidak bisa dipastikan, dianggap resident (0).
+    """
+    try:
+        ivf = faiss.try_extract_index_ivf(index)
+        if ivf is not None:
+            invlists = faiss.downcast_InvertedLists(ivf.invlists)
+            if isinstance(invlists, faiss.OnDiskInvertedLists):
+                return int(invlists.totsize)
+            return 0
+
+        if not hasattr(faiss, "IO_FLAG_MMAP_IFC"):
+            return 0
+        flat = faiss.downcast_index(index)
+        storage = getattr(flat, "storage", None)
+        if storage is not None:
+            flat = faiss.downcast_index(storage)
+        codes = getattr(flat, "codes", None)
+        # MaybeOwnedVector (faiss >= 1.9): is_owned False = menunjuk ke mmap
+        if codes is None or getattr(codes, "is_owned", True):
+            return 0
+        return int(flat.ntotal) * int(flat.code_size)
+    except Exception:
+        return 0
+
+
+class _Entry:
+    def __init__(self, db, resident_bytes, mapped_bytes, load_ms, mmap, index_mtime, index_type):
+        self.db = db
+        self.index_mtime = index_mtime
+        self.index_type = index_type
+        self.resident_bytes = resident_bytes
+        self.mapped_bytes = mapped_bytes
+        self.load_ms = load_ms
+        self.mmap = mmap
+        self.loaded_at = time.time()
+        self.hits = 0
+
+
+class VectorStoreManager:
+    """
+    Cache vectorstore per kelas dengan budget memori.
+
+    Args:
+        embeddings_fn: fungsi tanpa argumen yang mengembalikan objek embeddings
+        base_dir: folder berisi vectorstore/<kelas>/index.faiss + index.pkl
+        memory_budget_mb: batas memori privat semua vectorstore di worker ini
+        use_mmap: buka index.faiss memory-mapped jika tipe index mendukung
+    """
+
+    def __init__(self, embeddings_fn, base_dir=VECTORSTORE_DIR,
+                 memory_budget_mb=VECTORSTORE_MEMORY_MB, use_mmap=VECTORSTORE_MMAP):
+        self._embeddings_fn = embeddings_fn
+        self.base_dir = base_dir
+        self.budget_bytes = memory_budget_mb * 1024 * 1024
+        self.use_mmap = use_mmap
+
+        self._lock = threading.Lock()
+        self._load_lock = threading.Lock()
+        self._entries = OrderedDict()
+        # naik setiap kali vectorstore kelas dimuat ulang / di-invalidate;
+        # dipakai cache turunan (chain, retrieval) untuk tahu kapan harus dibuang
+        self._generations = {}
+        # dipanggil dengan kelas setiap kali vectorstore-nya dilepas
+        # (eviksi, invalidate, reload) supaya cache turunan ikut membuang referensi
+        self._listeners = []
+
+        self.loads = 0
+        self.evictions = 0
+
+    # ---------- API ----------
+    def path_for(self, kelas) -> str:
+        return os.path.join(self.base_dir, str(kelas))
+
+    def _index_mtime(self, kelas: str):
+        try:
+            return os.stat(os.path.join(self.path_for(kelas), "index.faiss")).st_mtime_ns
+        except FileNotFoundError:
+            return None
+
+    def get(self, kelas):
+        """
+        Ambil vectorstore kelas (load jika belum ada). None jika tidak ada di disk.
+        Jika index.faiss di disk berubah (rebuild ingestion), vectorstore dimuat ulang.
+        """
+        kelas = str(kelas)
+        mtime = self._index_mtime(kelas)
+
+        with self._lock:
+            entry = self._entries.get(kelas)
+            if entry is not None and entry.index_mtime == mtime:
+                self._entries.move_to_end(kelas)
+                entry.hits += 1
+                return entry.db
+
+        if mtime is None:
+            if entry is not None:
+                self.invalidate(kelas)
+            return None
+
+        with self._load_lock:
+            # cek lagi: bisa jadi thread lain sudah memuat
+            with self._lock:
+                entry = self._entries.get(kelas)
+                if entry is not None and entry.index_mtime == mtime:
+                    return entry.db
+
+            entry = self._load(self.path_for(kelas), mtime)
+
+            with self._lock:
+                self._entries[kelas] = entry
+                self._generations[kelas] = self._generations.get(kelas, 0) + 1
+                self.loads += 1
+                released = [kelas] + self._evict_over_budget(keep=kelas)
+
+        self._notify(released)
+        return entry.db
+
+    def invalidate(self, kelas=None) -> None:
+        """Buang vectorstore kelas (atau semua) dari memori, mis. setelah rebuild."""
+        with self._lock:
+            kelas_list = [str(kelas)] if kelas is not None else list(self._entries)
+            for k in kelas_list:
+                self._entries.pop(k, None)
+                self._generations[k] = self._generations.get(k, 0) + 1
+        self._notify(kelas_list)
+
+    def add_listener(self, fn) -> None:
+        """fn(kelas) dipanggil setelah vectorstore kelas dilepas dari manager."""
+        self._listeners.append(fn)
+
+    def generation(self, kelas) -> int:
+        with self._lock:
+            return self._generations.get(str(kelas), 0)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "budget_mb": round(self.budget_bytes / 1024 / 1024, 1),
+                "resident_mb": round(self._resident_bytes() / 1024 / 1024, 2),
+                "loads": self.loads,
+                "evictions": self.evictions,
+                "kelas": {
+                    k: {
+                        "resident_mb": round(e.resident_bytes / 1024 / 1024, 2),
+                        "mapped_mb": round(e.mapped_bytes / 1024 / 1024, 2),
+                        "mmap": e.mmap,
+                        "index_type": e.index_type,
+                        "load_ms": e.load_ms,
+                        "hits": e.hits,
+                        "loaded_at": e.loaded_at,
+                    }
+                    for k, e in self._entries.items()
+                },
+            }
+
+    # ---------- Internal ----------
+    def _load(self, path: str, index_mtime) -> _Entry:
+        import faiss
+        from langchain_community.vectorstores import FAISS
+
+        start = time.perf_counter()
+        index_file = os.path.join(path, "index.faiss")
+        docstore_file = os.path.join(path, "index.pkl")
+
+        index = None
+        if self.use_mmap:
+            flags = faiss.IO_FLAG_MMAP | getattr(faiss, "IO_FLAG_MMAP_IFC", 0)
+            try:
+                index = faiss.read_index(index_file, flags)
+            except RuntimeError:
+                index = None  # tipe index tidak mendukung mmap
+        if index is None:
+            index = faiss.read_index(index_file)
+
+        meta = read_index_meta(path)
+        apply_search_params(index, meta)
+
+        # Layout sama dengan FAISS.save_local; file ini dibuat sendiri oleh
+        # pipeline ingestion (setara allow_dangerous_deserialization=True).
+        with open(docstore_file, "rb") as f:
+            docstore, index_to_docstore_id = pickle.load(f)
+
+        db = FAISS(
+            embedding_function=self._embeddings_fn(),
+            index=index,
+            docstore=docstore,
+            index_to_docstore_id=index_to_docstore_id,
+        )
+
+        index_size = os.path.getsize(index_file)
+        docstore_size = os.path.getsize(docstore_file)
+        mapped = min(_mapped_bytes(faiss, index), index_size) if self.use_mmap else 0
+        load_ms = round((time.perf_counter() - start) * 1000, 1)
+
+        return _Entry(
+            db=db,
+            resident_bytes=docstore_size + index_size - mapped,
+            mapped_bytes=mapped,
+            load_ms=load_ms,
+            mmap=mapped > 0,
+            index_mtime=index_mtime,
+            index_type=meta.get("type", "flat"),
+        )
+
+    def _notify(self, kelas_list) -> None:
+        # di luar self._lock: listener boleh memanggil balik manager
+        for kelas in kelas_list:
+            for fn in self._listeners:
+                try:
+                    fn(kelas)
+                except Exception as e:
+                    print("❌ vectorstore listener error:", e)
+
+    def _resident_bytes(self) -> int:
+        return sum(e.resident_bytes for e in self._entries.values())
+
+    def _evict_over_budget(self, keep: str) -> list:
+        evicted = []
+        while self._resident_bytes() > self.budget_bytes and len(self._entries) > 1:
+            oldest = next(iter(self._entries))
+            if oldest == keep:
+                self._entries.move_to_end(oldest)
+                continue
+            self._entries.pop(oldest)
+            self._generations[oldest] = self._generations.get(oldest, 0) + 1
+            self.evictions += 1
+            evicted.append(oldest)
+        return evicted
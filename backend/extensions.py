@@ -1,3 +1,148 @@
+import os
+import threading
+import time
+from collections import defaultdict, deque
+
 from flask_pymongo import PyMongo
+from pymongo import monitoring
 
+# Satu-satunya koneksi MongoDB aplikasi. Semua modul memakai mongo.db;
+# jangan membuat MongoClient sendiri (satu pool per worker).
 mongo = PyMongo()
+
+
+# ======================
+# POOL CONFIG
+# ======================
+def mongo_client_options() -> dict:
+    """Opsi MongoClient dari env, diteruskan lewat mongo.init_app(app, **options)."""
+    options = {
+        "maxPoolSize": int(os.getenv("MONGO_MAX_POOL_SIZE", "50")),
+        "minPoolSize": int(os.getenv("MONGO_MIN_POOL_SIZE", "0")),
+        "maxIdleTimeMS": int(os.getenv("MONGO_MAX_IDLE_TIME_MS", "300000")),
+        # batas tunggu checkout koneksi saat pool penuh
+        "waitQueueTimeoutMS": int(os.getenv("MONGO_WAIT_QUEUE_TIMEOUT_MS", "5000")),
+        "serverSelectionTimeoutMS": int(os.getenv("MONGO_SERVER_SELECTION_TIMEOUT_MS", "5000")),
+        "connectTimeoutMS": int(os.getenv("MONGO_CONNECT_TIMEOUT_MS", "5000")),
+        "socketTimeoutMS": int(os.getenv("MONGO_SOCKET_TIMEOUT_MS", "30000")),
+        "event_listeners": [pool_metrics],
+    }
+
+    # read/write concern opsional; kosong = default server / URI
+    write_concern = os.getenv("MONGO_WRITE_CONCERN", "")
+    if write_concern:
+        options["w"] = int(write_concern) if write_concern.isdigit() else write_concern
+    read_concern = os.getenv("MONGO_READ_CONCERN", "")
+    if read_concern:
+        options["readConcernLevel"] = read_concern
+    read_preference = os.getenv("MONGO_READ_PREFERENCE", "")
+    if read_preference:
+        options["readPreference"] = read_preference
+
+    return options
+
+
+# ======================
+# POOL METRICS
+# ======================
+class PoolMetrics(monitoring.ConnectionPoolListener):
+    """
+    Statistik connection pool per server dari event monitoring pymongo:
+    koneksi terbuka / sedang dipakai, waktu tunggu checkout, checkout gagal.
+    """
+
+    def __init__(self, window=1000):
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self._servers = defaultdict(lambda: {
+            "open": 0,
+            "in_use": 0,
+            "max_in_use": 0,
+            "checkouts": 0,
+            "checkout_failures": defaultdict(int),
+            "cleared": 0,
+        })
+        self._waits = defaultdict(lambda: deque(maxlen=window))
+
+    # ---------- Event hooks ----------
+    def pool_created(self, event):
+        pass
+
+    def pool_ready(self, event):
+        pass
+
+    def pool_cleared(self, event):
+        with self._lock:
+            self._servers[self._key(event)]["cleared"] += 1
+
+    def pool_closed(self, event):
+        pass
+
+    def connection_created(self, event):
+        with self._lock:
+            self._servers[self._key(event)]["open"] += 1
+
+    def connection_ready(self, event):
+        pass
+
+    def connection_closed(self, event):
+        with self._lock:
+            self._servers[self._key(event)]["open"] -= 1
+
+    def connection_check_out_started(self, event):
+        # checkout berjalan sinkron di thread pemanggil
+        self._local.started = time.perf_counter()
+
+    def connection_check_out_failed(self, event):
+        with self._lock:
+            self._servers[self._key(event)]["checkout_failures"][str(event.reason)] += 1
+
+    def connection_checked_out(self, event):
+        wait_ms = self._wait_ms(event)
+        key = self._key(event)
+        with self._lock:
+            server = self._servers[key]
+            server["checkouts"] += 1
+            server["in_use"] += 1
+            server["max_in_use"] = max(server["max_in_use"], server["in_use"])
+            if wait_ms is not None:
+                self._waits[key].append(wait_ms)
+
+    def connection_checked_in(self, event):
+        with self._lock:
+            self._servers[self._key(event)]["in_use"] -= 1
+
+    # ---------- Helpers ----------
+    @staticmethod
+    def _key(event) -> str:
+        host, port = event.address
+        return f"{host}:{port}"
+
+    def _wait_ms(self, event):
+        duration = getattr(event, "duration", None)  # pymongo >= 4.7
+        if duration is not None:
+            return duration * 1000
+        started = getattr(self._local, "started", None)
+        if started is None:
+            return None
+        self._local.started = None
+        return (time.perf_counter() - started) * 1000
+
+    def stats(self) -> dict:
+        with self._lock:
+            servers = {}
+            for key, server in self._servers.items():
+                waits = sorted(self._waits[key])
+                servers[key] = {
+                    **server,
+                    "checkout_failures": dict(server["checkout_failures"]),
+                    "checkout_wait_ms": {
+                        "p50": round(waits[len(waits) // 2], 3),
+                        "p95": round(waits[max(0, int(len(waits) * 0.95) - 1)], 3),
+                        "max": round(waits[-1], 3),
+                    } if waits else None,
+                }
+            return {"servers": servers}
+
+
+pool_metrics = PoolMetrics()
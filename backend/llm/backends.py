@@ -0,0 +1,55 @@
+# Backend LLM yang bisa diganti lewat konfigurasi
+# Semua call site (chatbot, generate soal, ringkasan modul) meminta chat
+# model dari sini, bukan membuat ChatGroq / Groq client sendiri.
+#
+# Interface backend: factory(model, temperature, max_tokens) -> chat model
+# LangChain (BaseChatModel), sehingga invoke/stream/RetrievalQA tetap jalan.
+#
+#   LLM_BACKEND=groq  (default) → ChatGroq, butuh GROQ_API_KEY
+#   LLM_BACKEND=fake            → FakeChatModel lokal, tanpa jaringan (lihat llm/fake.py)
+
+import os
+
+LLM_BACKEND = os.getenv("LLM_BACKEND", "groq")
+
+
+def _groq_factory(model: str, temperature: float, max_tokens: int):
+    from langchain_groq import ChatGroq
+    from .resilience import LLM_MAX_RETRIES, LLM_TIMEOUT_SECONDS
+    return ChatGroq(
+        groq_api_key=os.getenv("GROQ_API_KEY"),
+        model=model,
+        temperature=temperature,
+        max_tokens=max_tokens,
+        # batas di level HTTP; deadline per-call ada di llm/resilience.py
+        timeout=LLM_TIMEOUT_SECONDS,
+        max_retries=LLM_MAX_RETRIES,
+    )
+
+
+def _fake_factory(model: str, temperature: float, max_tokens: int):
+    from .fake import FakeChatModel
+    return FakeChatModel(model_name=model, max_tokens=max_tokens)
+
+
+_BACKENDS = {
+    "groq": _groq_factory,
+    "fake": _fake_factory,
+}
+
+
+def register_backend(name: str, factory) -> None:
+    """Daftarkan backend baru, mis. server OpenAI-compatible lokal."""
+    _BACKENDS[name] = factory
+
+
+def get_chat_model(model: str, temperature: float, max_tokens: int, backend: str = None):
+    backend = backend or LLM_BACKEND
+    if backend not in _BACKENDS:
+        raise ValueError(f"LLM_BACKEND tidak dikenal: {backend} (pilihan: {', '.join(_BACKENDS)})")
+    return _BACKENDS[backend](model, temperature, max_tokens)
+
+
+def model_id(model: str, backend: str = None) -> str:
+    """Identitas model untuk key cache: jawaban backend fake tidak boleh tercampur dengan Groq."""
+    return f"{backend or LLM_BACKEND}:{model}"
@@ -0,0 +1,227 @@
+# Backend LLM palsu untuk load test & benchmark offline
+# - Deterministik: output + latensi ditentukan hash prompt (+ FAKE_LLM_SEED),
+#   kecuali prompt batch soal: tiap panggilan diberi nomor urut supaya
+#   refill pool berulang dengan prompt identik tetap menghasilkan soal baru
+# - Latensi mengikuti distribusi log-normal (median & sigma bisa diatur)
+# - Mode JSON: prompt generate soal ("Format JSON") dijawab JSON soal yang valid;
+#   prompt batch ({"soal": [...]}, "Buatkan N soal") dijawab N soal sekaligus
+# - Respons kalengan opsional dari file JSON: [{"match": "...", "response": "..."}]
+
+import hashlib
+import itertools
+import json
+import math
+import os
+import random
+import re
+import time
+import uuid
+from typing import Any, Iterator, List, Optional
+
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import AIMessage, AIMessageChunk, BaseMessage
+from langchain_core.outputs import ChatGeneration, ChatGenerationChunk, ChatResult
+
+# ======================
+# CONFIG
+# ======================
+FAKE_LLM_LATENCY_MS = float(os.getenv("FAKE_LLM_LATENCY_MS", "1500"))      # median
+FAKE_LLM_LATENCY_SIGMA = float(os.getenv("FAKE_LLM_LATENCY_SIGMA", "0.5"))  # sebaran log-normal
+FAKE_LLM_LATENCY_MAX_MS = float(os.getenv("FAKE_LLM_LATENCY_MAX_MS", "30000"))
+FAKE_LLM_TTFT_RATIO = float(os.getenv("FAKE_LLM_TTFT_RATIO", "0.2"))       # porsi latensi sebelum token pertama
+FAKE_LLM_SEED = int(os.getenv("FAKE_LLM_SEED", "0"))
+FAKE_LLM_RESPONSES_FILE = os.getenv("FAKE_LLM_RESPONSES_FILE", "")
+
+_WORDS = (
+    "anak anak belajar dengan senang karena materi ini sangat menarik dan mudah dipahami "
+    "kita bisa melihat contohnya di sekitar rumah atau sekolah setiap hari lalu mencoba "
+    "sendiri bersama teman dan guru supaya lebih paham"
+).split()
+
+# (pertanyaan, jawaban benar, pengecoh)
+_QUESTION_TEMPLATES = {
+    "literasi": [
+        ("Apa lawan kata dari 'besar'?", "kecil", ["tinggi", "luas", "panjang"]),
+        ("Kalimat manakah yang menggunakan huruf kapital dengan benar?",
+         "Budi pergi ke Jakarta.", ["budi pergi ke jakarta.", "Budi Pergi Ke jakarta.", "budi Pergi ke Jakarta."]),
+    ],
+    "sains": [
+        ("Bagian tumbuhan yang berfungsi menyerap air adalah ...", "akar", ["daun", "bunga", "buah"]),
+        ("Hewan yang hidup di air dan bernapas dengan insang adalah ...", "ikan", ["kucing", "burung", "sapi"]),
+        ("Matahari terbit dari arah ...", "timur", ["barat", "utara", "selatan"]),
+    ],
+}
+
+
+def _load_canned():
+    if not FAKE_LLM_RESPONSES_FILE:
+        return []
+    try:
+        with open(FAKE_LLM_RESPONSES_FILE, "r", encoding="utf-8") as f:
+            canned = json.load(f)
+    except Exception as e:
+        print(f"⚠️ FAKE_LLM_RESPONSES_FILE tidak bisa dibaca: {e}")
+        return []
+
+    # "match" kosong cocok dengan semua prompt dan menutupi entri sesudahnya
+    valid = [item for item in canned if isinstance(item, dict) and item.get("match")]
+    if len(valid) != len(canned):
+        print(f"⚠️ FAKE_LLM_RESPONSES_FILE: {len(canned) - len(valid)} entri tanpa \"match\" dilewati")
+    return valid
+
+
+_CANNED = _load_canned()
+
+# nomor urut panggilan batch; nonce per proses supaya soal dari worker /
+# restart berbeda tidak bertabrakan dengan yang sudah ada di bank
+_BATCH_NONCE = uuid.uuid4().hex[:6]
+_batch_calls = itertools.count(1)
+
+
+def _is_batch_prompt(prompt: str) -> bool:
+    return "format json" in prompt.lower() and '{"soal": [' in prompt
+
+
+def _fake_question(prompt: str, rng: random.Random) -> dict:
+    text = prompt.lower()
+    theme = next((t for t in ("numerik", "literasi", "sains") if t in text), "sains")
+
+    if theme == "numerik":
+        a, b = rng.randint(2, 50), rng.randint(2, 50)
+        answer = a + b
+        options = {answer, answer + 1, answer - 1, answer + 10}
+        opsi = [str(o) for o in sorted(options)]
+        return {
+            "pertanyaan": f"Berapakah {a} + {b}?",
+            "opsi": opsi,
+            "jawaban": str(answer),
+            "penjelasan": f"{a} ditambah {b} sama dengan {answer}.",
+        }
+
+    pertanyaan, correct, distractors = rng.choice(_QUESTION_TEMPLATES[theme])
+    opsi = [correct] + distractors
+    rng.shuffle(opsi)
+    return {
+        "pertanyaan": pertanyaan,
+        "opsi": opsi,
+        "jawaban": correct,
+        "penjelasan": f"Jawaban yang benar adalah {correct}.",
+    }
+
+
+def _fake_question_batch(prompt: str, rng: random.Random, call_no: int = 0) -> dict:
+    match = re.search(r"buatkan (\d+) soal", prompt.lower())
+    count = int(match.group(1)) if match else 1
+
+    items = []
+    for i in range(count):
+        soal = _fake_question(prompt, rng)
+        # template terbatas: beri penanda variasi supaya teks soal unik
+        soal["pertanyaan"] += f" (variasi {_BATCH_NONCE}-{call_no}-{i + 1})"
+        items.append(soal)
+    return {"soal": items}
+
+
+def fake_completion(prompt: str, rng: random.Random, max_tokens: int = 400, call_no: int = 0) -> str:
+    """Teks jawaban palsu untuk prompt (tanpa jeda)."""
+    for item in _CANNED:
+        if item["match"] in prompt:
+            return item.get("response", "")
+
+    if _is_batch_prompt(prompt):
+        return json.dumps(_fake_question_batch(prompt, rng, call_no), ensure_ascii=False)
+    if "format json" in prompt.lower():
+        return json.dumps(_fake_question(prompt, rng), ensure_ascii=False)
+
+    n_words = min(max_tokens, rng.randint(40, 120))
+    words = [rng.choice(_WORDS) for _ in range(n_words)]
+    return "Jawaban: " + " ".join(words).capitalize() + "."
+
+
+class FakeChatModel(BaseChatModel):
+    """Chat model LangChain tanpa jaringan dengan latensi realistis."""
+
+    model_name: str = "fake"
+    max_tokens: int = 400
+    latency_ms: float = FAKE_LLM_LATENCY_MS
+    latency_sigma: float = FAKE_LLM_LATENCY_SIGMA
+    latency_max_ms: float = FAKE_LLM_LATENCY_MAX_MS
+    ttft_ratio: float = FAKE_LLM_TTFT_RATIO
+    seed: int = FAKE_LLM_SEED
+
+    @property
+    def _llm_type(self) -> str:
+        return "fake-chat"
+
+    # ---------- Helpers ----------
+    def _rng(self, prompt: str, call_no: int = 0) -> random.Random:
+        digest = hashlib.sha256(f"{self.seed}:{call_no}:{prompt}".encode("utf-8")).hexdigest()
+        return random.Random(int(digest[:16], 16))
+
+    def _call_rng(self, prompt: str):
+        """(rng, call_no); call_no hanya naik untuk prompt batch soal."""
+        call_no = next(_batch_calls) if _is_batch_prompt(prompt) else 0
+        return self._rng(prompt, call_no), call_no
+
+    def _latency_seconds(self, rng: random.Random) -> float:
+        sample = self.latency_ms * math.exp(self.latency_sigma * rng.gauss(0, 1))
+        return min(sample, self.latency_max_ms) / 1000
+
+    @staticmethod
+    def _prompt_text(messages: List[BaseMessage]) -> str:
+        return "\n".join(str(m.content) for m in messages)
+
+    def _usage(self, prompt: str, text: str) -> dict:
+        # perkiraan kasar: 1 token ≈ 4 karakter
+        input_tokens = max(1, len(prompt) // 4)
+        output_tokens = max(1, len(text) // 4)
+        return {
+            "input_tokens": input_tokens,
+            "output_tokens": output_tokens,
+            "total_tokens": input_tokens + output_tokens,
+        }
+
+    # ---------- LangChain hooks ----------
+    def _generate(self, messages: List[BaseMessage], stop: Optional[List[str]] = None,
+                  run_manager: Any = None, **kwargs: Any) -> ChatResult:
+        prompt = self._prompt_text(messages)
+        rng, call_no = self._call_rng(prompt)
+        latency = self._latency_seconds(rng)
+        text = fake_completion(prompt, rng, self.max_tokens, call_no)
+
+        time.sleep(latency)
+
+        usage = self._usage(prompt, text)
+        message = AIMessage(
+            content=text,
+            usage_metadata=usage,
+            response_metadata={
+                "model_name": self.model_name,
+                "token_usage": {
+                    "prompt_tokens": usage["input_tokens"],
+                    "completion_tokens": usage["output_tokens"],
+                    "total_tokens": usage["total_tokens"],
+                },
+                "latency_ms": round(latency * 1000, 1),
+            },
+        )
+        return ChatResult(generations=[ChatGeneration(message=message)])
+
+    def _stream(self, messages: List[BaseMessage], stop: Optional[List[str]] = None,
+                run_manager: Any = None, **kwargs: Any) -> Iterator[ChatGenerationChunk]:
+        prompt = self._prompt_text(messages)
+        rng, call_no = self._call_rng(prompt)
+        latency = self._latency_seconds(rng)
+        text = fake_completion(prompt, rng, self.max_tokens, call_no)
+
+        tokens = re.findall(r"\S+\s*", text) or [text]
+        time.sleep(latency * self.ttft_ratio)
+        per_token = latency * (1 - self.ttft_ratio) / max(1, len(tokens))
+
+        for i, token in enumerate(tokens):
+            if i:
+                time.sleep(per_token)
+            chunk = ChatGenerationChunk(message=AIMessageChunk(content=token))
+            if run_manager:
+                run_manager.on_llm_new_token(token, chunk=chunk)
+            yield chunk
@@ -0,0 +1,294 @@
+# Exact-match prompt cache untuk semua pemanggilan LLM
+# Tier 1: LRU in-process (per worker)
+# Tier 2: sqlite di disk (opsional, dipakai bersama oleh semua worker gunicorn)
+
+import hashlib
+import os
+import re
+import sqlite3
+import threading
+import time
+from collections import OrderedDict, defaultdict
+
+# ======================
+# CONFIG
+# ======================
+PROMPT_CACHE_MAX_ENTRIES = int(os.getenv("PROMPT_CACHE_MAX_ENTRIES", "1000"))
+PROMPT_CACHE_TTL = int(os.getenv("PROMPT_CACHE_TTL", "86400"))
+# kosong = tier sqlite dimatikan
+PROMPT_CACHE_SQLITE = os.getenv("PROMPT_CACHE_SQLITE", "")
+PROMPT_CACHE_SQLITE_MAX_ROWS = int(os.getenv("PROMPT_CACHE_SQLITE_MAX_ROWS", "50000"))
+# entri kedaluwarsa masih disimpan selama ini (detik) sebagai jawaban darurat
+# saat LLM tidak tersedia (lihat get_stale / llm/resilience.py)
+PROMPT_CACHE_STALE_TTL = int(os.getenv("PROMPT_CACHE_STALE_TTL", "604800"))
+
+_WHITESPACE = re.compile(r"\s+")
+
+
+def normalize_prompt(prompt: str, strip_prefix: str = None) -> str:
+    """Buang prefix tetap (mis. SYSTEM_PROMPT), rapikan spasi, huruf kecil."""
+    text = prompt or ""
+    if strip_prefix and text.startswith(strip_prefix):
+        text = text[len(strip_prefix):]
+    return _WHITESPACE.sub(" ", text).strip().lower()
+
+
+def make_key(model: str, temperature: float, prompt: str, *extra, strip_prefix: str = None) -> str:
+    """Hash sha256 dari model + temperature + prompt ter-normalisasi (+ konteks tambahan)."""
+    parts = [model, f"{float(temperature):.3f}", normalize_prompt(prompt, strip_prefix)]
+    parts.extend(str(e) for e in extra)
+    return hashlib.sha256("\x1f".join(parts).encode("utf-8")).hexdigest()
+
+
+class _SqliteTier:
+    """
+    Tier disk. Satu koneksi per thread per proses, WAL supaya aman dibaca
+    banyak proses. Koneksi (dan tabel) dibuka saat pertama dipakai, bukan
+    saat import: dengan gunicorn --preload, worker hasil fork tidak boleh
+    memakai koneksi sqlite milik master.
+    """
+
+    def __init__(self, path: str, max_rows: int, stale_ttl: int = PROMPT_CACHE_STALE_TTL):
+        self.path = path
+        self.max_rows = max_rows
+        self.stale_ttl = stale_ttl
+        self._local = threading.local()
+        self._writes = 0
+
+    def _conn(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None or self._local.pid != os.getpid():
+            os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+            conn = sqlite3.connect(self.path, timeout=5, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS prompt_cache ("
+                " key TEXT PRIMARY KEY, value TEXT NOT NULL,"
+                " expires_at REAL NOT NULL, created_at REAL NOT NULL)"
+            )
+            # lease "sedang dikerjakan" untuk single-flight lintas proses (llm/singleflight.py)
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS prompt_leases ("
+                " key TEXT PRIMARY KEY, owner TEXT NOT NULL, expires_at REAL NOT NULL)"
+            )
+            self._local.conn = conn
+            self._local.pid = os.getpid()
+        return conn
+
+    def get(self, key: str):
+        row = self._conn().execute(
+            "SELECT value, expires_at FROM prompt_cache WHERE key = ?", (key,)
+        ).fetchone()
+        if not row:
+            return None, None
+        return row[0], row[1]
+
+    def set(self, key: str, value: str, expires_at: float) -> None:
+        conn = self._conn()
+        conn.execute(
+            "INSERT OR REPLACE INTO prompt_cache (key, value, expires_at, created_at)"
+            " VALUES (?, ?, ?, ?)",
+            (key, value, expires_at, time.time()),
+        )
+        self._writes += 1
+        if self._writes % 100 == 0:
+            self._prune(conn)
+
+    def acquire_lease(self, key: str, owner: str, ttl: float) -> bool:
+        now = time.time()
+        conn = self._conn()
+        # baris baru, atau ambil alih lease yang sudah kedaluwarsa
+        conn.execute(
+            "INSERT INTO prompt_leases (key, owner, expires_at) VALUES (?, ?, ?)"
+            " ON CONFLICT(key) DO UPDATE SET owner = excluded.owner, expires_at = excluded.expires_at"
+            " WHERE prompt_leases.expires_at < ?",
+            (key, owner, now + ttl, now),
+        )
+        row = conn.execute("SELECT owner FROM prompt_leases WHERE key = ?", (key,)).fetchone()
+        return bool(row) and row[0] == owner
+
+    def release_lease(self, key: str, owner: str) -> None:
+        self._conn().execute("DELETE FROM prompt_leases WHERE key = ? AND owner = ?", (key, owner))
+
+    def _prune(self, conn) -> None:
+        conn.execute("DELETE FROM prompt_leases WHERE expires_at < ?", (time.time(),))
+        conn.execute("DELETE FROM prompt_cache WHERE expires_at < ?", (time.time() - self.stale_ttl,))
+        conn.execute(
+            "DELETE FROM prompt_cache WHERE key IN ("
+            " SELECT key FROM prompt_cache ORDER BY created_at DESC LIMIT -1 OFFSET ?)",
+            (self.max_rows,),
+        )
+
+    def clear(self) -> None:
+        self._conn().execute("DELETE FROM prompt_cache")
+        self._conn().execute("DELETE FROM prompt_leases")
+
+
+class PromptCache:
+    """
+    Cache jawaban LLM untuk prompt yang identik setelah normalisasi.
+
+    Statistik dicatat per call site (mis. "chat", "module_summary").
+    """
+
+    def __init__(self, max_entries=PROMPT_CACHE_MAX_ENTRIES, ttl=PROMPT_CACHE_TTL,
+                 sqlite_path=PROMPT_CACHE_SQLITE, sqlite_max_rows=PROMPT_CACHE_SQLITE_MAX_ROWS,
+                 stale_ttl=PROMPT_CACHE_STALE_TTL):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.stale_ttl = stale_ttl
+
+        self._lock = threading.Lock()
+        # { key: (value, expires_at) }
+        self._memory = OrderedDict()
+        self._stats = defaultdict(lambda: {"memory_hits": 0, "disk_hits": 0, "misses": 0, "stale_hits": 0})
+
+        self._disk = None
+        if sqlite_path:
+            try:
+                self._disk = _SqliteTier(sqlite_path, sqlite_max_rows, stale_ttl)
+            except Exception as e:
+                print(f"⚠️ Prompt cache sqlite tidak tersedia, pakai memory saja: {e}")
+
+    # ---------- API ----------
+    def get(self, site: str, key: str, record_miss: bool = True):
+        """record_miss=False untuk polling (single-flight) supaya hit rate tidak terdistorsi."""
+        now = time.time()
+
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is not None:
+                if entry[1] >= now:
+                    self._memory.move_to_end(key)
+                    self._stats[site]["memory_hits"] += 1
+                    return entry[0]
+                if entry[1] + self.stale_ttl < now:
+                    del self._memory[key]
+
+        if self._disk is not None:
+            try:
+                value, expires_at = self._disk.get(key)
+            except Exception as e:
+                print("❌ prompt_cache sqlite get error:", e)
+                value, expires_at = None, None
+
+            if value is not None and expires_at >= now:
+                with self._lock:
+                    self._put_memory(key, value, expires_at)
+                    self._stats[site]["disk_hits"] += 1
+                return value
+
+        if record_miss:
+            with self._lock:
+                self._stats[site]["misses"] += 1
+        return None
+
+    def set(self, site: str, key: str, value: str, ttl: int = None) -> None:
+        expires_at = time.time() + (ttl or self.ttl)
+
+        with self._lock:
+            self._put_memory(key, value, expires_at)
+
+        if self._disk is not None:
+            try:
+                self._disk.set(key, value, expires_at)
+            except Exception as e:
+                print("❌ prompt_cache sqlite set error:", e)
+
+    def get_stale(self, site: str, key: str):
+        """
+        Ambil jawaban walaupun sudah kedaluwarsa (maks. stale_ttl lewat).
+        Hanya untuk fallback saat LLM gagal / circuit breaker terbuka.
+        """
+        now = time.time()
+
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is not None and entry[1] + self.stale_ttl >= now:
+                self._stats[site]["stale_hits"] += 1
+                return entry[0]
+
+        if self._disk is not None:
+            try:
+                value, expires_at = self._disk.get(key)
+            except Exception as e:
+                print("❌ prompt_cache sqlite get error:", e)
+                return None
+            if value is not None and expires_at + self.stale_ttl >= now:
+                with self._lock:
+                    self._stats[site]["stale_hits"] += 1
+                return value
+
+        return None
+
+    def get_or_call(self, site: str, key: str, fn, ttl: int = None):
+        """Ambil dari cache, atau panggil fn() lalu simpan hasilnya."""
+        cached = self.get(site, key)
+        if cached is not None:
+            return cached
+
+        value = fn()
+        if value is not None:
+            self.set(site, key, value, ttl)
+        return value
+
+    # ---------- Lease lintas proses (tier sqlite) ----------
+    @property
+    def shared(self) -> bool:
+        """True jika ada tier sqlite yang dipakai bersama semua worker."""
+        return self._disk is not None
+
+    def acquire_lease(self, key: str, owner: str, ttl: float) -> bool:
+        """
+        Tandai key sedang dikerjakan `owner`. True jika lease didapat (atau
+        tidak ada tier bersama); error sqlite juga dianggap True supaya
+        pemanggil tetap jalan sendiri.
+        """
+        if self._disk is None:
+            return True
+        try:
+            return self._disk.acquire_lease(key, owner, ttl)
+        except Exception as e:
+            print("❌ prompt_cache lease error:", e)
+            return True
+
+    def release_lease(self, key: str, owner: str) -> None:
+        if self._disk is None:
+            return
+        try:
+            self._disk.release_lease(key, owner)
+        except Exception as e:
+            print("❌ prompt_cache lease error:", e)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._memory.clear()
+        if self._disk is not None:
+            self._disk.clear()
+
+    def stats(self) -> dict:
+        with self._lock:
+            sites = {}
+            for site, s in self._stats.items():
+                total = s["memory_hits"] + s["disk_hits"] + s["misses"]
+                hits = s["memory_hits"] + s["disk_hits"]
+                sites[site] = {**s, "hit_rate": round(hits / total, 4) if total else 0.0}
+
+            return {
+                "memory_entries": len(self._memory),
+                "max_entries": self.max_entries,
+                "ttl": self.ttl,
+                "sqlite_enabled": self._disk is not None,
+                "sites": sites,
+            }
+
+    # ---------- Internal ----------
+    def _put_memory(self, key: str, value: str, expires_at: float) -> None:
+        self._memory[key] = (value, expires_at)
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_entries:
+            self._memory.popitem(last=False)
+
+
+prompt_cache = PromptCache()
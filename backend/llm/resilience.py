@@ -0,0 +1,353 @@
+# Ketahanan panggilan LLM: deadline, hedged request, circuit breaker
+# Tujuannya worker Flask tidak ikut macet saat provider LLM melambat:
+# - setiap panggilan punya deadline (LLM_TIMEOUT_SECONDS); streaming punya
+#   batas token pertama dan batas jeda antar chunk
+# - opsional: request kedua dikirim jika yang pertama melewati p95 latensi
+# - circuit breaker membuka (fail fast) jika error rate melewati ambang;
+#   pemanggil bisa menyajikan jawaban cache terakhir sebagai gantinya
+
+import os
+import threading
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from concurrent.futures import TimeoutError as FutureTimeout
+
+# ======================
+# CONFIG
+# ======================
+LLM_TIMEOUT_SECONDS = float(os.getenv("LLM_TIMEOUT_SECONDS", "20"))
+LLM_MAX_RETRIES = int(os.getenv("LLM_MAX_RETRIES", "1"))
+LLM_EXECUTOR_THREADS = int(os.getenv("LLM_EXECUTOR_THREADS", "32"))
+# streaming: batas tunggu token pertama dan jeda antar chunk berikutnya
+LLM_STREAM_FIRST_TOKEN_SECONDS = float(os.getenv("LLM_STREAM_FIRST_TOKEN_SECONDS", str(LLM_TIMEOUT_SECONDS)))
+LLM_STREAM_CHUNK_SECONDS = float(os.getenv("LLM_STREAM_CHUNK_SECONDS", "10"))
+
+LLM_HEDGE = os.getenv("LLM_HEDGE", "0") == "1"
+LLM_HEDGE_MIN_DELAY_MS = float(os.getenv("LLM_HEDGE_MIN_DELAY_MS", "500"))
+LLM_HEDGE_MIN_SAMPLES = int(os.getenv("LLM_HEDGE_MIN_SAMPLES", "20"))
+
+LLM_BREAKER_ERROR_RATE = float(os.getenv("LLM_BREAKER_ERROR_RATE", "0.5"))
+LLM_BREAKER_MIN_CALLS = int(os.getenv("LLM_BREAKER_MIN_CALLS", "10"))
+LLM_BREAKER_WINDOW_SECONDS = float(os.getenv("LLM_BREAKER_WINDOW_SECONDS", "60"))
+LLM_BREAKER_OPEN_SECONDS = float(os.getenv("LLM_BREAKER_OPEN_SECONDS", "30"))
+
+
+class LLMUnavailable(Exception):
+    """LLM tidak bisa dipakai saat ini (breaker terbuka atau deadline habis)."""
+
+
+class LLMTimeout(LLMUnavailable):
+    pass
+
+
+class CircuitBreaker:
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(self, error_rate=LLM_BREAKER_ERROR_RATE, min_calls=LLM_BREAKER_MIN_CALLS,
+                 window_seconds=LLM_BREAKER_WINDOW_SECONDS, open_seconds=LLM_BREAKER_OPEN_SECONDS):
+        self.error_rate = error_rate
+        self.min_calls = min_calls
+        self.window_seconds = window_seconds
+        self.open_seconds = open_seconds
+
+        self._lock = threading.Lock()
+        self._window = deque()  # (timestamp, ok)
+        self.state = self.CLOSED
+        self._opened_at = 0.0
+        self._trial_in_flight = False
+        self.times_opened = 0
+
+    def _trim(self, now):
+        while self._window and self._window[0][0] < now - self.window_seconds:
+            self._window.popleft()
+
+    def allow(self) -> bool:
+        with self._lock:
+            if self.state == self.OPEN:
+                if time.time() - self._opened_at < self.open_seconds:
+                    return False
+                self.state = self.HALF_OPEN
+                self._trial_in_flight = False
+
+            if self.state == self.HALF_OPEN:
+                # hanya satu panggilan percobaan
+                if self._trial_in_flight:
+                    return False
+                self._trial_in_flight = True
+            return True
+
+    def record(self, ok: bool) -> None:
+        with self._lock:
+            now = time.time()
+
+            if self.state == self.HALF_OPEN:
+                self._trial_in_flight = False
+                if ok:
+                    self.state = self.CLOSED
+                    self._window.clear()
+                else:
+                    self._open(now)
+                return
+
+            self._window.append((now, ok))
+            self._trim(now)
+            failures = sum(1 for _, success in self._window if not success)
+            if len(self._window) >= self.min_calls and failures / len(self._window) >= self.error_rate:
+                self._open(now)
+
+    def release(self) -> None:
+        """Panggilan dibatalkan (mis. client putus): bukan sukses, bukan gagal."""
+        with self._lock:
+            if self.state == self.HALF_OPEN:
+                self._trial_in_flight = False
+
+    def _open(self, now):
+        self.state = self.OPEN
+        self._opened_at = now
+        self.times_opened += 1
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            self._trim(time.time())
+            total = len(self._window)
+            failures = sum(1 for _, ok in self._window if not ok)
+            return {
+                "state": self.state,
+                "window_calls": total,
+                "window_error_rate": round(failures / total, 4) if total else 0.0,
+                "times_opened": self.times_opened,
+            }
+
+
+_STREAM_END = object()
+
+
+class _SiteGuard:
+    """Deadline + hedging + breaker untuk satu call site."""
+
+    def __init__(self, executor):
+        self._executor = executor
+        self.breaker = CircuitBreaker()
+        self._lock = threading.Lock()
+        self._latencies = deque(maxlen=200)
+
+        self.calls = 0
+        self.failures = 0
+        self.timeouts = 0
+        self.short_circuited = 0
+        self.hedges = 0
+        self.hedge_wins = 0
+        self.stale_served = 0
+
+    def p95_ms(self):
+        with self._lock:
+            if len(self._latencies) < LLM_HEDGE_MIN_SAMPLES:
+                return None
+            ordered = sorted(self._latencies)
+            return ordered[int(len(ordered) * 0.95) - 1]
+
+    def _record(self, ok: bool, latency_ms: float = None) -> None:
+        self.breaker.record(ok)
+        with self._lock:
+            if ok:
+                self._latencies.append(latency_ms)
+            else:
+                self.failures += 1
+
+    def call(self, fn, timeout=None, hedge=None):
+        timeout = timeout or LLM_TIMEOUT_SECONDS
+        hedge = LLM_HEDGE if hedge is None else hedge
+
+        if not self.breaker.allow():
+            with self._lock:
+                self.short_circuited += 1
+            raise LLMUnavailable("LLM sedang tidak tersedia (circuit breaker terbuka)")
+
+        with self._lock:
+            self.calls += 1
+
+        start = time.perf_counter()
+        deadline = start + timeout
+        hedge_at = None
+        if hedge:
+            p95 = self.p95_ms()
+            if p95 is not None:
+                hedge_at = start + max(p95, LLM_HEDGE_MIN_DELAY_MS) / 1000
+
+        futures = [self._executor.submit(fn)]
+        hedge_future = None
+        last_error = None
+
+        while True:
+            now = time.perf_counter()
+            if now >= deadline:
+                break
+
+            if not futures:
+                # semua gagal; kirim hedge sekarang sebagai retry jika belum
+                if hedge_at is not None and hedge_future is None:
+                    hedge_future = self._executor.submit(fn)
+                    futures.append(hedge_future)
+                    with self._lock:
+                        self.hedges += 1
+                    continue
+                break
+
+            wake = deadline
+            if hedge_at is not None and hedge_future is None:
+                wake = min(wake, hedge_at)
+
+            done, _ = wait(futures, timeout=max(0.0, wake - now), return_when=FIRST_COMPLETED)
+            for future in done:
+                futures.remove(future)
+                error = future.exception()
+                if error is None:
+                    latency_ms = (time.perf_counter() - start) * 1000
+                    self._record(True, latency_ms)
+                    if future is hedge_future:
+                        with self._lock:
+                            self.hedge_wins += 1
+                    return future.result()
+                last_error = error
+
+            if (hedge_at is not None and hedge_future is None and futures
+                    and time.perf_counter() >= hedge_at):
+                hedge_future = self._executor.submit(fn)
+                futures.append(hedge_future)
+                with self._lock:
+                    self.hedges += 1
+
+        self._record(False)
+        if futures or last_error is None:
+            with self._lock:
+                self.timeouts += 1
+            raise LLMTimeout(f"LLM tidak merespons dalam {timeout:.0f} detik")
+        raise last_error
+
+    def stream(self, stream_fn, first_token_timeout=None, chunk_timeout=None):
+        """
+        Bungkus generator streaming: cek breaker di awal, catat hasil di akhir.
+
+        Setiap chunk diambil lewat executor dengan batas waktu (token pertama,
+        lalu jeda antar chunk). Melewati batas dihitung gagal di breaker dan
+        menghasilkan LLMTimeout; provider yang menggantung tidak menahan
+        worker sampai koneksi putus sendiri.
+        """
+        first_token_timeout = first_token_timeout or LLM_STREAM_FIRST_TOKEN_SECONDS
+        chunk_timeout = chunk_timeout or LLM_STREAM_CHUNK_SECONDS
+
+        if not self.breaker.allow():
+            with self._lock:
+                self.short_circuited += 1
+            raise LLMUnavailable("LLM sedang tidak tersedia (circuit breaker terbuka)")
+
+        with self._lock:
+            self.calls += 1
+        start = time.perf_counter()
+        iterator = None
+        pending = None
+        try:
+            iterator = iter(stream_fn())
+            first = True
+            while True:
+                timeout = first_token_timeout if first else chunk_timeout
+                pending = self._executor.submit(next, iterator, _STREAM_END)
+                try:
+                    chunk = pending.result(timeout=timeout)
+                except FutureTimeout:
+                    with self._lock:
+                        self.timeouts += 1
+                    if first:
+                        raise LLMTimeout(f"LLM tidak mengirim token dalam {timeout:.0f} detik")
+                    raise LLMTimeout(f"Stream LLM berhenti lebih dari {timeout:.0f} detik")
+                pending = None
+                if chunk is _STREAM_END:
+                    break
+                yield chunk
+                first = False
+        except Exception:
+            self._record(False)
+            raise
+        except BaseException:
+            # GeneratorExit saat client menutup stream di tengah jalan:
+            # lepaskan slot percobaan half-open tanpa mencatat hasil
+            self.breaker.release()
+            raise
+        finally:
+            # generator yang masih dijalankan executor (timeout) tidak bisa
+            # ditutup; dibiarkan selesai sendiri lalu dibuang
+            if pending is None and hasattr(iterator, "close"):
+                iterator.close()
+        self._record(True, (time.perf_counter() - start) * 1000)
+
+    def snapshot(self) -> dict:
+        p95 = self.p95_ms()
+        with self._lock:
+            return {
+                "calls": self.calls,
+                "failures": self.failures,
+                "timeouts": self.timeouts,
+                "short_circuited": self.short_circuited,
+                "hedges": self.hedges,
+                "hedge_wins": self.hedge_wins,
+                "stale_served": self.stale_served,
+                "p95_ms": round(p95, 1) if p95 is not None else None,
+                "breaker": self.breaker.snapshot(),
+            }
+
+
+class LLMGuard:
+    """Registry _SiteGuard per call site ("chat", "question", "module_summary", ...)."""
+
+    def __init__(self, max_workers=LLM_EXECUTOR_THREADS):
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="llm-call")
+        self._lock = threading.Lock()
+        self._sites = {}
+
+    def site(self, name: str) -> _SiteGuard:
+        with self._lock:
+            guard = self._sites.get(name)
+            if guard is None:
+                guard = _SiteGuard(self._executor)
+                self._sites[name] = guard
+            return guard
+
+    def call(self, site: str, fn, timeout=None, hedge=None):
+        return self.site(site).call(fn, timeout=timeout, hedge=hedge)
+
+    def stream(self, site: str, stream_fn, first_token_timeout=None, chunk_timeout=None):
+        return self.site(site).stream(stream_fn, first_token_timeout=first_token_timeout,
+                                      chunk_timeout=chunk_timeout)
+
+    def call_or_stale(self, site: str, fn, stale_fn):
+        """
+        Seperti call(), tapi jika LLM tidak tersedia / gagal, kembalikan
+        stale_fn() (mis. jawaban cache kedaluwarsa) bila ada.
+        """
+        guard = self.site(site)
+        try:
+            return guard.call(fn)
+        except Exception:
+            stale = stale_fn() if stale_fn else None
+            if stale is None:
+                raise
+            with guard._lock:
+                guard.stale_served += 1
+            return stale
+
+    def stats(self) -> dict:
+        with self._lock:
+            sites = dict(self._sites)
+        return {
+            "timeout_seconds": LLM_TIMEOUT_SECONDS,
+            "stream_first_token_seconds": LLM_STREAM_FIRST_TOKEN_SECONDS,
+            "stream_chunk_seconds": LLM_STREAM_CHUNK_SECONDS,
+            "hedge_enabled": LLM_HEDGE,
+            "sites": {name: guard.snapshot() for name, guard in sites.items()},
+        }
+
+
+llm_guard = LLMGuard()
@@ -0,0 +1,125 @@
+# Single-flight: request identik yang datang bersamaan berbagi satu panggilan LLM
+# Request pertama (leader) memanggil LLM, sisanya menunggu hasil yang sama.
+#
+# Dua tingkat:
+# - dalam proses: Event antar thread. Hanya berguna jika worker melayani
+#   beberapa request sekaligus (gunicorn --threads N / -k gthread).
+# - antar proses: lease di tier sqlite prompt cache (PROMPT_CACHE_SQLITE).
+#   Leader proses lain menunggu hasilnya muncul di prompt cache. Ini yang
+#   berlaku untuk deployment sync worker (gunicorn -w 4 --threads 1).
+
+import os
+import threading
+import time
+import uuid
+from collections import defaultdict
+
+from .prompt_cache import prompt_cache
+
+SINGLEFLIGHT_LEASE_SECONDS = float(os.getenv("SINGLEFLIGHT_LEASE_SECONDS", "30"))
+SINGLEFLIGHT_POLL_MS = float(os.getenv("SINGLEFLIGHT_POLL_MS", "100"))
+
+
+class _Call:
+    def __init__(self):
+        self.event = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class SingleFlight:
+    """
+    Coalescing panggilan berdasarkan key (mis. hash prompt).
+
+    Args:
+        shared: PromptCache opsional untuk koordinasi antar proses; fn()
+            leader harus menyimpan hasilnya ke cache ini dengan key yang sama
+        lease_seconds: umur lease (sebaiknya >= deadline LLM)
+    """
+
+    def __init__(self, shared=None, lease_seconds=SINGLEFLIGHT_LEASE_SECONDS,
+                 poll_ms=SINGLEFLIGHT_POLL_MS):
+        self._shared = shared
+        self.lease_seconds = lease_seconds
+        self.poll_interval = poll_ms / 1000
+        self._token = uuid.uuid4().hex
+
+        self._lock = threading.Lock()
+        self._calls = {}
+        self._stats = defaultdict(lambda: {"calls": 0, "deduplicated": 0, "deduplicated_shared": 0})
+
+    @property
+    def _owner(self) -> str:
+        # instance dibuat saat import (bisa sebelum fork gunicorn --preload):
+        # pid membedakan worker yang berbagi token yang sama
+        return f"{os.getpid()}-{self._token}"
+
+    def do(self, site: str, key: str, fn):
+        """
+        Jalankan fn() sekali untuk semua pemanggil dengan key yang sama
+        selama panggilan masih berjalan. Exception leader diteruskan ke semua.
+        """
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = _Call()
+                self._calls[key] = call
+                self._stats[site]["calls"] += 1
+            else:
+                self._stats[site]["deduplicated"] += 1
+
+        if not leader:
+            call.event.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result
+
+        try:
+            call.result = self._run_shared(site, key, fn)
+            return call.result
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                self._calls.pop(key, None)
+            call.event.set()
+
+    def _run_shared(self, site: str, key: str, fn):
+        """Leader proses ini: ambil lease bersama, atau tunggu hasil proses lain."""
+        shared = self._shared
+        if shared is None or not shared.shared:
+            return fn()
+
+        deadline = time.monotonic() + self.lease_seconds
+        while not shared.acquire_lease(key, self._owner, self.lease_seconds):
+            # proses lain sedang memanggil LLM untuk prompt ini
+            time.sleep(self.poll_interval)
+            cached = shared.get(site, key, record_miss=False)
+            if cached is not None:
+                with self._lock:
+                    self._stats[site]["deduplicated_shared"] += 1
+                return cached
+            if time.monotonic() >= deadline:
+                # lease tidak kunjung lepas: jalan sendiri
+                return fn()
+
+        try:
+            # hasil mungkin sudah masuk tepat sebelum lease didapat
+            cached = shared.get(site, key, record_miss=False)
+            if cached is not None:
+                return cached
+            return fn()
+        finally:
+            shared.release_lease(key, self._owner)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "in_flight": len(self._calls),
+                "sites": {site: dict(s) for site, s in self._stats.items()},
+            }
+
+
+singleflight = SingleFlight(shared=prompt_cache)
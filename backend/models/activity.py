@@ -1,9 +1,12 @@
 from datetime import datetime
 from bson import ObjectId
 from extensions import mongo
+from admin.activity.activity_logger import activity_logger
 
 class Activity:
     def __init__(self, user_id, action, description, timestamp=None, _id=None):
+        # aktivitas baru cukup di-insert (buffered); upsert hanya untuk yang sudah ada
+        self._is_new = _id is None
         self._id = ObjectId(_id) if _id else ObjectId()
         self.user_id = str(user_id)
         self.action = action
@@ -27,7 +30,11 @@ class Activity:
             "description": self.description,
             "timestamp": self.timestamp,
         }
-        mongo.db.activities.update_one({"_id": self._id}, {"$set": data}, upsert=True)
+        if self._is_new:
+            activity_logger.log("activities", data)
+            self._is_new = False
+        else:
+            mongo.db.activities.update_one({"_id": self._id}, {"$set": data}, upsert=True)
         return self
 
     # --- class methods ---
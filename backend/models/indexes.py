@@ -0,0 +1,214 @@
+# Registry index MongoDB untuk semua collection
+# Satu tempat untuk mendeklarasikan index + query "panas" yang harus
+# dilayani index. ensure_indexes() idempotent (create_index dengan nama
+# yang sama tidak melakukan apa-apa), jadi aman dipanggil di setiap startup.
+#
+#   python -m models.indexes            # buat / pastikan index
+#   python -m models.indexes --verify   # explain() query panas, gagal jika COLLSCAN
+
+import argparse
+import os
+import sys
+
+from bson import ObjectId
+from pymongo import ASCENDING, DESCENDING, IndexModel
+from pymongo.errors import OperationFailure
+
+# ======================
+# INDEX
+# ======================
+INDEXES = {
+    "users": [
+        IndexModel([("email", ASCENDING)], name="users_email", unique=True),
+    ],
+    "questions": [
+        IndexModel([("id", ASCENDING)], name="questions_id", unique=True),
+        # urutan stabil untuk cursor "soal berikutnya" (chatbot/question_cursor.py)
+        IndexModel(
+            [("theme", ASCENDING), ("kelas", ASCENDING), ("difficulty", ASCENDING), ("_id", ASCENDING)],
+            name="questions_combo_order",
+        ),
+        # kedalaman pool soal yang belum disajikan (chatbot/question_pool.py)
+        IndexModel(
+            [("theme", ASCENDING), ("kelas", ASCENDING), ("difficulty", ASCENDING), ("served_at", ASCENDING)],
+            name="questions_pool",
+        ),
+    ],
+    "answers": [
+        # insert = cek jawaban dobel (chatbot/answers.py)
+        IndexModel([("user_id", ASCENDING), ("soal_id", ASCENDING)], name="answers_user_soal", unique=True),
+        IndexModel([("user_id", ASCENDING), ("created_at", DESCENDING)], name="answers_user_created"),
+    ],
+    "activity_logs": [
+        IndexModel([("user_id", ASCENDING), ("soal_id", ASCENDING)], name="activity_user_soal"),
+        IndexModel([("user_id", ASCENDING), ("created_at", DESCENDING)], name="activity_user_created"),
+        IndexModel([("user_id", ASCENDING), ("timestamp", DESCENDING)], name="activity_user_timestamp"),
+    ],
+    "chat_history": [
+        IndexModel([("user_id", ASCENDING), ("theme", ASCENDING)], name="chat_history_user_theme"),
+    ],
+    "progress": [
+        # update_feedback_score mencari progress lewat field user_id
+        IndexModel([("user_id", ASCENDING)], name="progress_user_id", sparse=True),
+    ],
+    "activities": [
+        IndexModel([("user_id", ASCENDING), ("timestamp", DESCENDING)], name="activities_user_timestamp"),
+    ],
+}
+
+# ======================
+# QUERY PANAS (untuk --verify)
+# ======================
+# Nilai filter hanya contoh; explain() menilai bentuk query, bukan datanya.
+HOT_QUERIES = [
+    {
+        "name": "login: user by email",
+        "collection": "users",
+        "filter": {"email": "siswa@example.com"},
+    },
+    {
+        "name": "get_question: soal setelah cursor",
+        "collection": "questions",
+        "filter": {"theme": "sains", "kelas": "3", "difficulty": "sedang", "_id": {"$gt": ObjectId("0" * 24)}},
+        "sort": [("_id", ASCENDING)],
+    },
+    {
+        "name": "save_answer: soal by id",
+        "collection": "questions",
+        "filter": {"id": "00000000-0000-0000-0000-000000000000"},
+    },
+    {
+        "name": "question_pool: kedalaman pool",
+        "collection": "questions",
+        "filter": {"theme": "sains", "kelas": "3", "difficulty": "sedang", "served_at": None},
+    },
+    {
+        "name": "get_question: jawaban user di antara kandidat",
+        "collection": "answers",
+        "filter": {"user_id": "0", "soal_id": {"$in": ["a", "b"]}},
+    },
+    {
+        "name": "progress/history: log terbaru user",
+        "collection": "activity_logs",
+        "filter": {"user_id": "0", "theme": "sains"},
+        "sort": [("created_at", DESCENDING)],
+    },
+    {
+        "name": "admin: aktivitas user",
+        "collection": "activity_logs",
+        "filter": {"user_id": "0"},
+        "sort": [("timestamp", DESCENDING)],
+    },
+    {
+        "name": "chat_history: riwayat per theme",
+        "collection": "chat_history",
+        "filter": {"user_id": "0", "theme": "sains"},
+    },
+    {
+        "name": "feedback: progress by user_id",
+        "collection": "progress",
+        "filter": {"user_id": "0"},
+    },
+]
+
+
+def ensure_indexes(db, log=print) -> dict:
+    """
+    Buat semua index di INDEXES (idempotent).
+
+    Returns:
+        {"created": {collection: [nama index]}, "errors": {nama index: pesan}}
+    """
+    report = {"created": {}, "errors": {}}
+
+    for collection, models in INDEXES.items():
+        for model in models:
+            name = model.document["name"]
+            try:
+                # satu per satu supaya satu index bermasalah (mis. data
+                # duplikat untuk index unique) tidak menggagalkan yang lain
+                db[collection].create_indexes([model])
+                report["created"].setdefault(collection, []).append(name)
+            except OperationFailure as e:
+                report["errors"][name] = str(e)
+                log(f"❌ Index {collection}.{name} gagal dibuat: {e}")
+
+    return report
+
+
+def _plan_stages(plan) -> set:
+    """Kumpulkan semua nama stage di winningPlan (rekursif)."""
+    stages = set()
+    if isinstance(plan, dict):
+        if "stage" in plan:
+            stages.add(plan["stage"])
+        for value in plan.values():
+            stages |= _plan_stages(value)
+    elif isinstance(plan, list):
+        for item in plan:
+            stages |= _plan_stages(item)
+    return stages
+
+
+def verify_indexes(db) -> list:
+    """
+    explain() setiap query di HOT_QUERIES.
+
+    Returns:
+        list {"name", "collection", "stages", "ok"}; ok False jika ada COLLSCAN
+    """
+    results = []
+    for query in HOT_QUERIES:
+        cursor = db[query["collection"]].find(query["filter"]).limit(1)
+        if query.get("sort"):
+            cursor = cursor.sort(query["sort"])
+
+        explain = cursor.explain()
+        winning = explain.get("queryPlanner", {}).get("winningPlan", {})
+        stages = _plan_stages(winning)
+
+        results.append({
+            "name": query["name"],
+            "collection": query["collection"],
+            "stages": sorted(stages),
+            "ok": "COLLSCAN" not in stages,
+        })
+    return results
+
+
+# ======================
+# CLI
+# ======================
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Buat / verifikasi index MongoDB")
+    parser.add_argument("--verify", action="store_true",
+                        help="jalankan explain() query panas; exit 1 jika ada COLLSCAN")
+    args = parser.parse_args(argv)
+
+    # index dibuat di bawah, bukan saat startup app; worker pool tidak perlu jalan
+    os.environ["DB_ENSURE_INDEXES_ON_START"] = "0"
+    os.environ["QUESTION_POOL_WORKER"] = "0"
+    from extensions import mongo
+    from app import create_app
+    app = create_app()
+
+    with app.app_context():
+        report = ensure_indexes(mongo.db)
+        for collection, names in report["created"].items():
+            print(f"✅ {collection}: {', '.join(names)}")
+        if report["errors"]:
+            sys.exit(1)
+
+        if args.verify:
+            failed = 0
+            for result in verify_indexes(mongo.db):
+                mark = "✅" if result["ok"] else "❌"
+                print(f"{mark} {result['name']} ({result['collection']}): {', '.join(result['stages'])}")
+                failed += not result["ok"]
+            if failed:
+                print(f"❌ {failed} query masih COLLSCAN")
+                sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,12 +1,25 @@
 import pdfplumber
 import re
 import os
-from groq import Groq
+from llm.backends import get_chat_model, model_id
+from llm.prompt_cache import make_key, prompt_cache
+from llm.resilience import llm_guard
 
 # =========================
-# GROQ CLIENT
+# LLM (backend dari LLM_BACKEND)
 # =========================
-client = Groq(api_key=os.getenv("GROQ_API_KEY"))
+SUMMARY_MODEL = "llama-3.1-8b-instant"  # ✅ MODEL AKTIF
+SUMMARY_TEMPERATURE = 0.4
+SUMMARY_SYSTEM_PROMPT = "Kamu adalah guru SD yang ramah, jelas, dan menggunakan bahasa sederhana."
+
+_summary_model = None
+
+
+def get_summary_model():
+    global _summary_model
+    if _summary_model is None:
+        _summary_model = get_chat_model(SUMMARY_MODEL, SUMMARY_TEMPERATURE, max_tokens=500)
+    return _summary_model
 
 
 # =========================
@@ -41,7 +54,7 @@ def clean_text(text):
 
 
 # =========================
-# 3. AI SUMMARIZER (GROQ)
+# 3. AI SUMMARIZER (LLM)
 # =========================
 def ai_summarize_module(text):
     prompt = f"""
@@ -58,26 +71,29 @@ def ai_summarize_module(text):
     {text[:5000]}
     """
 
-    response = client.chat.completions.create(
-        model="llama-3.1-8b-instant",  # ✅ MODEL AKTIF
-        messages=[
-            {
-                "role": "system",
-                "content": "Kamu adalah guru SD yang ramah, jelas, dan menggunakan bahasa sederhana."
-            },
-            {
-                "role": "user",
-                "content": prompt
-            }
-        ],
-        temperature=0.4,
-        max_tokens=500
+    # PDF yang sama (upload ulang) tidak perlu dirangkum ulang
+    key = make_key(model_id(SUMMARY_MODEL), SUMMARY_TEMPERATURE, prompt, SUMMARY_SYSTEM_PROMPT)
+    cached = prompt_cache.get("module_summary", key)
+    if cached is not None:
+        return cached
+
+    def _summarize():
+        response = get_summary_model().invoke([
+            ("system", SUMMARY_SYSTEM_PROMPT),
+            ("human", prompt),
+        ])
+        summary = response.content.strip()
+        # hanya hasil LLM yang disimpan; ringkasan lama dari fallback
+        # di bawah tidak boleh ditulis ulang sebagai entri baru
+        prompt_cache.set("module_summary", key, summary)
+        return summary
+
+    return llm_guard.call_or_stale(
+        "module_summary", _summarize,
+        lambda: prompt_cache.get_stale("module_summary", key)
     )
 
 
-    return response.choices[0].message.content.strip()
-
-
 # =========================
 # 4. FORMAT HTML
 # =========================
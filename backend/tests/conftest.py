@@ -0,0 +1,13 @@
+# Beberapa modul (admin/*, progress_service) memakai mongo.db saat import.
+# Tes di sini hanya menguji logika murni, jadi PyMongo cukup diinisialisasi
+# dengan client lazy (connect=False): tidak pernah tersambung ke server.
+
+
+def pytest_configure(config):
+    try:
+        from flask import Flask
+        from extensions import mongo
+    except ImportError:
+        return
+    if mongo.db is None:
+        mongo.init_app(Flask("tests"), uri="mongodb://localhost:27017/test_backend", connect=False)
@@ -0,0 +1,131 @@
+import os
+from datetime import datetime
+from types import SimpleNamespace
+
+import pytest
+
+activity_logger_module = pytest.importorskip("admin.activity.activity_logger")
+
+from bson import ObjectId
+from pymongo.errors import AutoReconnect, BulkWriteError
+
+ActivityLogger = activity_logger_module.ActivityLogger
+
+
+class _Collection:
+    """Pengganti collection: gagal `failures` kali, atau sesuai daftar error per panggilan."""
+
+    def __init__(self, failures=0, errors=None):
+        self.failures = failures
+        self.errors = list(errors or [])
+        self.docs = []
+        self.calls = []
+
+    def insert_many(self, docs, ordered=True):
+        self.calls.append(list(docs))
+        for doc in docs:
+            doc.setdefault("_id", ObjectId())
+        if self.failures:
+            self.failures -= 1
+            raise AutoReconnect("mongo tidak tersedia")
+        if self.errors:
+            error = self.errors.pop(0)
+            failed = {e["index"] for e in error.details["writeErrors"]}
+            self.docs.extend(d for i, d in enumerate(docs) if i not in failed)
+            raise error
+        self.docs.extend(docs)
+
+    def insert_one(self, doc):
+        self.insert_many([doc])
+
+
+@pytest.fixture
+def collection(monkeypatch):
+    def use(coll):
+        monkeypatch.setattr(activity_logger_module, "mongo", SimpleNamespace(db={"activity_logs": coll}))
+        return coll
+    return use
+
+
+def _logger(tmp_path, **kwargs):
+    kwargs.setdefault("retries", 2)
+    return ActivityLogger(retry_backoff_ms=0, spill_file=str(tmp_path / "spill.jsonl"), **kwargs)
+
+
+def _docs(n):
+    return [{"user_id": "u1", "soal_id": f"s{i}", "timestamp": datetime(2026, 1, 1)} for i in range(n)]
+
+
+def test_failed_batch_is_retried(tmp_path, collection):
+    coll = collection(_Collection(failures=2))
+    logger = _logger(tmp_path)
+
+    logger._insert_with_retry("activity_logs", _docs(3))
+
+    assert len(coll.calls) == 3
+    assert len(coll.docs) == 3
+    stats = logger.stats()
+    assert stats["written"] == 3
+    assert stats["retried"] == 6
+    assert stats["spilled"] == 0
+
+
+def test_only_failed_documents_are_retried(tmp_path, collection):
+    error = BulkWriteError({"writeErrors": [
+        {"index": 0, "code": activity_logger_module.DUPLICATE_KEY},  # sudah tertulis sebelumnya
+        {"index": 2, "code": 91},
+    ]})
+    coll = collection(_Collection(errors=[error]))
+    logger = _logger(tmp_path)
+    docs = _docs(3)
+
+    logger._insert_with_retry("activity_logs", docs)
+
+    assert coll.calls[1] == [docs[2]]
+    assert logger.stats()["written"] == 3
+    assert logger.stats()["retried"] == 1
+
+
+def test_persistent_failure_spills_and_replays(tmp_path, collection):
+    collection(_Collection(failures=100))
+    logger = _logger(tmp_path)
+    docs = _docs(2)
+
+    logger._insert_with_retry("activity_logs", docs)
+
+    assert logger.stats()["spilled"] == 2
+    assert logger.stats()["failed"] == 0
+    assert os.path.exists(logger.spill_file)
+
+    # worker berikutnya (MongoDB sudah pulih) memasukkan ulang isi spill
+    coll = collection(_Collection())
+    replayer = _logger(tmp_path)
+    assert replayer.replay_spill() == 2
+
+    assert [d["soal_id"] for d in coll.docs] == ["s0", "s1"]
+    assert coll.docs[0]["_id"] == docs[0]["_id"]
+    assert coll.docs[0]["timestamp"] == datetime(2026, 1, 1)
+    assert not os.path.exists(replayer.spill_file)
+    assert replayer.stats()["replayed"] == 2
+
+
+def test_without_spill_file_failures_are_counted(tmp_path, collection):
+    collection(_Collection(failures=100))
+    logger = ActivityLogger(retries=1, retry_backoff_ms=0, spill_file="")
+
+    logger._insert_with_retry("activity_logs", _docs(2))
+
+    assert logger.stats()["failed"] == 2
+
+
+def test_log_queues_a_copy_and_flushes_on_close(tmp_path, collection):
+    coll = collection(_Collection())
+    logger = _logger(tmp_path, enabled=True, flush_ms=10)
+    doc = {"user_id": "u1", "soal_id": "s1"}
+
+    logger.log("activity_logs", doc)
+    logger.close()
+
+    assert "_id" not in doc
+    assert coll.docs == [{**doc, "_id": coll.docs[0]["_id"]}]
+    assert logger.stats()["written"] == 1
@@ -0,0 +1,80 @@
+import threading
+
+import pytest
+
+pytest.importorskip("langchain_core")
+pytest.importorskip("flask")  # chatbot/__init__.py
+
+from chatbot.embedding_batcher import EmbeddingBatcher
+
+
+def _embed_concurrently(batcher, texts):
+    results, errors = {}, {}
+    barrier = threading.Barrier(len(texts))
+
+    def run(text):
+        barrier.wait()
+        try:
+            results[text] = batcher.embed(text)
+        except Exception as e:
+            errors[text] = e
+
+    threads = [threading.Thread(target=run, args=(t,)) for t in texts]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join(5)
+    return results, errors
+
+
+def test_concurrent_queries_are_embedded_together():
+    batches = []
+
+    def embed_documents(texts):
+        batches.append(list(texts))
+        return [[float(len(t))] for t in texts]
+
+    batcher = EmbeddingBatcher(embed_documents, max_batch_size=32, max_wait_ms=200)
+    texts = [f"pertanyaan {'x' * i}" for i in range(8)]
+    results, errors = _embed_concurrently(batcher, texts)
+
+    assert not errors
+    # setiap pemanggil mendapat vektor untuk teksnya sendiri
+    assert results == {t: [float(len(t))] for t in texts}
+    assert len(batches) < len(texts)
+    assert sum(len(b) for b in batches) == len(texts)
+    assert batcher.stats()["batch_size"]["count"] == len(batches)
+
+
+def test_batch_size_is_capped():
+    batches = []
+
+    def embed_documents(texts):
+        batches.append(len(texts))
+        return [[0.0] for _ in texts]
+
+    batcher = EmbeddingBatcher(embed_documents, max_batch_size=3, max_wait_ms=200)
+    _embed_concurrently(batcher, [f"q{i}" for i in range(7)])
+
+    assert max(batches) <= 3
+    assert sum(batches) == 7
+
+
+def test_error_is_raised_to_every_caller_in_batch():
+    failing = [True]
+
+    def embed_documents(texts):
+        if failing[0]:
+            raise RuntimeError("model gagal")
+        return [[1.0] for _ in texts]
+
+    batcher = EmbeddingBatcher(embed_documents, max_batch_size=32, max_wait_ms=200)
+    results, errors = _embed_concurrently(batcher, ["a", "b", "c"])
+
+    assert not results
+    assert set(errors) == {"a", "b", "c"}
+    assert all(isinstance(e, RuntimeError) for e in errors.values())
+
+    # thread worker yang sama tetap hidup setelah error
+    failing[0] = False
+    assert batcher.embed("lagi") == [1.0]
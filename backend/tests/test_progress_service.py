@@ -0,0 +1,70 @@
+from datetime import date
+
+import pytest
+
+progress_service = pytest.importorskip("admin.progress.progress_service")
+
+TODAY = date(2026, 3, 10)
+
+
+def _eval(expr, doc):
+    """Evaluator kecil untuk operator agregasi yang dipakai _activity_day_fields."""
+    if isinstance(expr, str) and expr.startswith("$"):
+        return doc.get(expr[1:])
+    if not isinstance(expr, dict):
+        return expr
+
+    (op, args), = expr.items()
+    if op == "$ifNull":
+        value = _eval(args[0], doc)
+        return _eval(args[1], doc) if value is None else value
+    if op == "$eq":
+        return _eval(args[0], doc) == _eval(args[1], doc)
+    if op == "$max":
+        return max(_eval(a, doc) for a in args)
+    if op == "$add":
+        return sum(_eval(a, doc) for a in args)
+    if op == "$switch":
+        for branch in args["branches"]:
+            if _eval(branch["case"], doc):
+                return _eval(branch["then"], doc)
+        return _eval(args["default"], doc)
+    raise AssertionError(f"operator belum didukung: {op}")
+
+
+def _apply(old_doc):
+    fields = progress_service._activity_day_fields("u1", TODAY)
+    # semua ekspresi dalam satu $set membaca dokumen LAMA
+    return {**old_doc, **{k: _eval(v, old_doc) for k, v in fields.items()}}
+
+
+@pytest.mark.parametrize("old, streak", [
+    ({}, 1),
+    ({"last_activity_date": "2026-03-10", "streak_days": 4}, 4),
+    ({"last_activity_date": "2026-03-10", "streak_days": 0}, 1),
+    ({"last_activity_date": "2026-03-09", "streak_days": 4}, 5),
+    ({"last_activity_date": "2026-03-09"}, 1),
+    ({"last_activity_date": "2026-03-07", "streak_days": 4}, 1),
+])
+def test_streak_rules(old, streak):
+    new = _apply(old)
+    assert new["streak_days"] == streak
+    assert new["last_activity_date"] == "2026-03-10"
+
+
+def test_defaults_for_new_documents_and_existing_rating_kept():
+    assert _apply({}) == {
+        "user_id": "u1",
+        "streak_days": 1,
+        "last_activity_date": "2026-03-10",
+        "rating": 0,
+        "rating_count": 0,
+    }
+    assert _apply({"rating": 4.5, "rating_count": 2})["rating"] == 4.5
+
+
+def test_user_id_stored_as_string():
+    from bson import ObjectId
+
+    user_id = ObjectId()
+    assert progress_service._activity_day_fields(user_id, TODAY)["user_id"] == str(user_id)
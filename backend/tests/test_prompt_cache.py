@@ -0,0 +1,78 @@
+from llm.prompt_cache import PromptCache, make_key, normalize_prompt
+
+SYSTEM = "Kamu adalah guru SD.\n"
+
+
+def test_normalization_ignores_prefix_whitespace_and_case():
+    assert normalize_prompt(SYSTEM + "  Apa itu\n\tFOTOSINTESIS? ", strip_prefix=SYSTEM) == "apa itu fotosintesis?"
+
+    base = make_key("m", 0.3, SYSTEM + "Apa itu fotosintesis?", "4", strip_prefix=SYSTEM)
+    assert make_key("m", 0.3, SYSTEM + " apa  itu FOTOSINTESIS? ", "4", strip_prefix=SYSTEM) == base
+    # model, temperature dan konteks tambahan tetap membedakan key
+    assert make_key("m2", 0.3, SYSTEM + "Apa itu fotosintesis?", "4", strip_prefix=SYSTEM) != base
+    assert make_key("m", 0.7, SYSTEM + "Apa itu fotosintesis?", "4", strip_prefix=SYSTEM) != base
+    assert make_key("m", 0.3, SYSTEM + "Apa itu fotosintesis?", "5", strip_prefix=SYSTEM) != base
+
+
+def test_memory_lru_and_miss_stats():
+    cache = PromptCache(max_entries=2, sqlite_path="")
+    cache.set("chat", "a", "1")
+    cache.set("chat", "b", "2")
+    assert cache.get("chat", "a") == "1"
+    cache.set("chat", "c", "3")  # "b" paling lama tidak dipakai
+
+    assert cache.get("chat", "b") is None
+    assert cache.get("chat", "a") == "1"
+    assert cache.get("chat", "x", record_miss=False) is None
+
+    site = cache.stats()["sites"]["chat"]
+    assert site["memory_hits"] == 2
+    assert site["misses"] == 1
+
+
+def test_sqlite_tier_is_shared_between_instances(tmp_path):
+    path = str(tmp_path / "prompt_cache.db")
+    writer = PromptCache(sqlite_path=path)
+    reader = PromptCache(sqlite_path=path)
+
+    writer.set("module_summary", "k", "ringkasan")
+    assert reader.get("module_summary", "k") == "ringkasan"
+    # setelah hit dari disk, entri ikut masuk tier memory reader
+    assert reader._memory["k"][0] == "ringkasan"
+
+
+def test_stale_entries_only_served_through_get_stale(tmp_path):
+    path = str(tmp_path / "prompt_cache.db")
+    cache = PromptCache(sqlite_path=path, stale_ttl=3600)
+    cache.set("chat", "k", "jawaban lama", ttl=-1)
+
+    assert cache.get("chat", "k") is None
+    assert cache.get_stale("chat", "k") == "jawaban lama"
+    # worker lain hanya punya tier sqlite
+    assert PromptCache(sqlite_path=path, stale_ttl=3600).get_stale("chat", "k") == "jawaban lama"
+
+    expired = PromptCache(sqlite_path="", stale_ttl=0)
+    expired.set("chat", "k", "terlalu lama", ttl=-1)
+    assert expired.get_stale("chat", "k") is None
+
+
+def test_sqlite_lease_is_exclusive_until_released_or_expired(tmp_path):
+    path = str(tmp_path / "prompt_cache.db")
+    a = PromptCache(sqlite_path=path)
+    b = PromptCache(sqlite_path=path)
+
+    assert a.acquire_lease("k", "owner-a", 30)
+    assert not b.acquire_lease("k", "owner-b", 30)
+    a.release_lease("k", "owner-a")
+    assert b.acquire_lease("k", "owner-b", 30)
+
+    # lease kedaluwarsa boleh diambil alih
+    assert a.acquire_lease("k2", "owner-a", -1)
+    assert b.acquire_lease("k2", "owner-b", 30)
+
+
+def test_without_sqlite_lease_always_granted():
+    cache = PromptCache(sqlite_path="")
+    assert not cache.shared
+    assert cache.acquire_lease("k", "a", 30)
+    assert cache.acquire_lease("k", "b", 30)
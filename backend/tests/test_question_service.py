@@ -0,0 +1,70 @@
+import json
+
+import pytest
+
+pytest.importorskip("flask_pymongo")  # extensions.py
+pytest.importorskip("langchain_core")  # chatbot/service.py
+
+from chatbot.question_service import parse_question_batch, validate_question
+
+SOAL = {
+    "pertanyaan": "Hewan yang bernapas dengan insang adalah ...",
+    "opsi": ["Ikan", "Kucing", "Ayam", "Sapi"],
+    "jawaban": "Ikan",
+    "penjelasan": "Ikan bernapas dengan insang.",
+}
+
+
+def test_parse_accepts_wrapped_list_bare_list_and_single_object():
+    assert parse_question_batch(json.dumps({"soal": [SOAL, SOAL]})) == [SOAL, SOAL]
+    assert parse_question_batch(json.dumps([SOAL])) == [SOAL]
+    assert parse_question_batch(json.dumps(SOAL)) == [SOAL]
+
+
+def test_parse_extracts_json_from_surrounding_text():
+    text = "Berikut soalnya:\n```json\n" + json.dumps({"soal": [SOAL]}) + "\n```\nSemoga membantu!"
+    assert parse_question_batch(text) == [SOAL]
+
+
+def test_parse_returns_empty_list_for_garbage():
+    assert parse_question_batch("") == []
+    assert parse_question_batch(None) == []
+    assert parse_question_batch("maaf, saya tidak bisa") == []
+    assert parse_question_batch("{rusak: [}") == []
+    assert parse_question_batch(json.dumps({"soal": "bukan list"})) == []
+
+
+def test_validate_normalizes_fields():
+    soal, reason = validate_question({
+        **SOAL,
+        "pertanyaan": "  " + SOAL["pertanyaan"] + " ",
+        "opsi": [" Ikan", "Kucing ", "Ayam", "Sapi"],
+        "jawaban": 0,
+        "penjelasan": None,
+    })
+
+    assert reason is None
+    assert soal == {
+        "pertanyaan": SOAL["pertanyaan"],
+        "opsi": ["Ikan", "Kucing", "Ayam", "Sapi"],
+        "jawaban": "Ikan",
+        "penjelasan": "",
+    }
+
+
+@pytest.mark.parametrize("override, reason", [
+    ({"pertanyaan": "  "}, "pertanyaan kosong"),
+    ({"opsi": ["Ikan", "Kucing", "Ayam"]}, "opsi harus 4"),
+    ({"opsi": "Ikan, Kucing, Ayam, Sapi"}, "opsi harus 4"),
+    ({"opsi": ["Ikan", "ikan", "Ayam", "Sapi"]}, "opsi kosong / kembar"),
+    ({"opsi": ["Ikan", "", "Ayam", "Sapi"]}, "opsi kosong / kembar"),
+    ({"jawaban": 4}, "index jawaban tidak valid"),
+    ({"jawaban": "Paus"}, "jawaban tidak ada di opsi"),
+    ({"jawaban": True}, "jawaban tidak ada di opsi"),
+])
+def test_validate_rejects_malformed_questions(override, reason):
+    assert validate_question({**SOAL, **override}) == (None, reason)
+
+
+def test_validate_rejects_non_objects():
+    assert validate_question("soal") == (None, "bukan objek")
@@ -0,0 +1,124 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from llm.resilience import CircuitBreaker, LLMTimeout, LLMUnavailable, _SiteGuard
+
+_executor = ThreadPoolExecutor(max_workers=4)
+
+
+def _half_open_guard():
+    guard = _SiteGuard(executor=_executor)
+    guard.breaker = CircuitBreaker(error_rate=0.5, min_calls=1, window_seconds=60, open_seconds=0)
+    guard.breaker.record(False)
+    assert guard.breaker.state == CircuitBreaker.OPEN
+    return guard
+
+
+def _tokens():
+    yield "a"
+    yield "b"
+    yield "c"
+
+
+def test_stream_closed_early_releases_half_open_trial():
+    guard = _half_open_guard()
+
+    stream = guard.stream(_tokens)
+    assert next(stream) == "a"
+    assert guard.breaker.state == CircuitBreaker.HALF_OPEN
+    stream.close()
+
+    # dibatalkan: bukan sukses, bukan gagal
+    assert guard.breaker.state == CircuitBreaker.HALF_OPEN
+    assert guard.failures == 0
+
+    # percobaan berikutnya boleh jalan dan menutup breaker
+    assert list(guard.stream(_tokens)) == ["a", "b", "c"]
+    assert guard.breaker.state == CircuitBreaker.CLOSED
+
+
+def test_stream_error_reopens_breaker():
+    guard = _half_open_guard()
+
+    def failing():
+        yield "a"
+        raise RuntimeError("boom")
+
+    stream = guard.stream(failing)
+    assert next(stream) == "a"
+    try:
+        next(stream)
+    except RuntimeError:
+        pass
+    assert guard.breaker.state == CircuitBreaker.OPEN
+
+    guard.breaker.open_seconds = 60
+    try:
+        next(guard.stream(_tokens))
+        raise AssertionError("breaker seharusnya terbuka")
+    except LLMUnavailable:
+        pass
+
+
+def _stalled(first_delay, then_delay, release):
+    def gen():
+        if first_delay:
+            release.wait(first_delay)
+        yield "a"
+        release.wait(then_delay)
+        yield "b"
+    return gen
+
+
+def test_stream_first_token_timeout_counts_as_failure():
+    guard = _half_open_guard()
+    release = threading.Event()
+
+    stream = guard.stream(_stalled(5, 0, release), first_token_timeout=0.05, chunk_timeout=5)
+    start = time.perf_counter()
+    try:
+        next(stream)
+        raise AssertionError("seharusnya timeout")
+    except LLMTimeout:
+        pass
+    release.set()
+
+    assert time.perf_counter() - start < 1
+    assert guard.timeouts == 1
+    assert guard.failures == 1
+    assert guard.breaker.state == CircuitBreaker.OPEN
+
+
+def test_stream_chunk_gap_timeout_counts_as_failure():
+    guard = _half_open_guard()
+    release = threading.Event()
+
+    stream = guard.stream(_stalled(0, 5, release), first_token_timeout=5, chunk_timeout=0.05)
+    assert next(stream) == "a"
+    try:
+        next(stream)
+        raise AssertionError("seharusnya timeout")
+    except LLMTimeout:
+        pass
+    release.set()
+
+    assert guard.timeouts == 1
+    assert guard.breaker.state == CircuitBreaker.OPEN
+
+
+def test_stream_closed_early_closes_provider_stream():
+    guard = _SiteGuard(executor=_executor)
+    closed = []
+
+    def gen():
+        try:
+            yield "a"
+            yield "b"
+        finally:
+            closed.append(True)
+
+    stream = guard.stream(gen)
+    assert next(stream) == "a"
+    stream.close()
+    assert closed == [True]
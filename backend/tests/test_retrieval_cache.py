@@ -0,0 +1,56 @@
+import pytest
+
+np = pytest.importorskip("numpy")
+pytest.importorskip("flask")  # chatbot/__init__.py
+
+from chatbot.retrieval_cache import RetrievalCache
+
+
+def test_bucket_ignores_scale_and_rounding_noise():
+    cache = RetrievalCache(decimals=2)
+    vec = np.array([0.6, 0.8, 0.0], dtype="float32")
+
+    assert cache.bucket(vec) == cache.bucket(vec * 3)
+    assert cache.bucket(vec) == cache.bucket(vec + np.array([0.0004, -0.0004, 0.0]))
+    assert cache.bucket([0.6, 0.8, 0.0]) == cache.bucket([0.6, 0.8, -0.0])
+    assert cache.bucket(vec) != cache.bucket([0.8, 0.6, 0.0])
+
+
+def test_entries_keyed_by_kelas_and_generation():
+    cache = RetrievalCache()
+    bucket = cache.bucket([1.0, 0.0])
+    cache.put("4", 1, bucket, ["d1", "d2"])
+
+    assert cache.get("4", 1, bucket) == ["d1", "d2"]
+    assert cache.get("5", 1, bucket) is None
+    assert cache.get("4", 2, bucket) is None
+    assert cache.get("4", 1, cache.bucket([0.0, 1.0])) is None
+
+
+def test_new_generation_drops_old_entries_of_that_kelas():
+    cache = RetrievalCache()
+    bucket = cache.bucket([1.0, 0.0])
+    cache.put("4", 1, bucket, ["lama"])
+    cache.put("5", 1, bucket, ["kelas lain"])
+
+    cache.put("4", 2, cache.bucket([0.0, 1.0]), ["baru"])
+
+    assert cache.stats()["entries"] == 2
+    assert cache.get("4", 1, bucket) is None
+    assert cache.get("5", 1, bucket) == ["kelas lain"]
+
+
+def test_lru_and_ttl():
+    cache = RetrievalCache(max_entries=2)
+    a, b, c = (cache.bucket([1.0, i]) for i in (0.0, 1.0, 2.0))
+    cache.put("4", 1, a, ["a"])
+    cache.put("4", 1, b, ["b"])
+    assert cache.get("4", 1, a) == ["a"]
+    cache.put("4", 1, c, ["c"])
+
+    assert cache.get("4", 1, b) is None
+    assert cache.get("4", 1, a) == ["a"]
+
+    expired = RetrievalCache(ttl=-1)
+    expired.put("4", 1, a, ["a"])
+    assert expired.get("4", 1, a) is None
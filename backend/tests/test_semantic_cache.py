@@ -0,0 +1,86 @@
+import hashlib
+
+import pytest
+
+pytest.importorskip("faiss")
+pytest.importorskip("flask")  # chatbot/__init__.py
+
+from chatbot.semantic_cache import SemanticCache
+
+DIM = 64
+
+
+def _embed(text):
+    """Bag-of-words deterministik: kalimat dengan kata yang sama → vektor sama."""
+    vec = [0.0] * DIM
+    for word in text.lower().split():
+        vec[int(hashlib.md5(word.encode()).hexdigest(), 16) % DIM] += 1.0
+    return vec
+
+
+QUESTION = "kenapa daun berwarna hijau pada siang hari"
+
+
+def test_hit_only_within_same_scope():
+    cache = SemanticCache(_embed, threshold=0.9)
+    cache.store(QUESTION, "karena klorofil", kelas="4", theme="sains")
+
+    answer, vec = cache.lookup("Kenapa daun berwarna hijau pada siang hari ", kelas="4", theme="sains")
+    assert answer == "karena klorofil"
+    assert vec is not None
+
+    assert cache.lookup(QUESTION, kelas="5", theme="sains")[0] is None
+    assert cache.lookup(QUESTION, kelas="4", theme="literasi")[0] is None
+
+
+def test_scope_lru_evicts_least_recently_used_scope():
+    cache = SemanticCache(_embed, threshold=0.9, max_scopes=2)
+    cache.store(QUESTION, "a", kelas="1", theme="sains")
+    cache.store(QUESTION, "b", kelas="2", theme="sains")
+
+    # scope kelas 1 dipakai lagi → kelas 2 yang paling lama
+    assert cache.lookup(QUESTION, kelas="1", theme="sains")[0] == "a"
+    cache.store(QUESTION, "c", kelas="3", theme="sains")
+
+    assert cache.scope_evictions == 1
+    assert cache.lookup(QUESTION, kelas="1", theme="sains")[0] == "a"
+    assert cache.lookup(QUESTION, kelas="2", theme="sains")[0] is None
+    assert cache.lookup(QUESTION, kelas="3", theme="sains")[0] == "c"
+
+
+def test_questions_with_digits_bypass_cache():
+    calls = []
+
+    def embed(text):
+        calls.append(text)
+        return _embed(text)
+
+    cache = SemanticCache(embed, threshold=0.9)
+    cache.store("berapa hasil 12 + 5 jika dijumlahkan", "17", kelas="2", theme="numerik")
+
+    assert cache.lookup("berapa hasil 12 + 6 jika dijumlahkan", kelas="2", theme="numerik") == (None, None)
+    assert calls == []
+    assert cache.stats()["skipped"] == 1
+    assert cache.stats()["scopes"] == {}
+
+
+def test_short_questions_need_stricter_threshold():
+    cache = SemanticCache(_embed, threshold=0.5)
+    cache.store("apa itu fotosintesis", "proses membuat makanan", kelas="4", theme="sains")
+
+    # 3 dari 4 kata sama: cukup untuk threshold 0.5, tidak untuk ambang pertanyaan pendek
+    assert cache.lookup("apa itu fotosintesis tumbuhan", kelas="4", theme="sains")[0] is None
+    assert cache.lookup("apa itu fotosintesis", kelas="4", theme="sains")[0] == "proses membuat makanan"
+
+
+def test_embedding_errors_fail_open():
+    def broken(text):
+        raise RuntimeError("model belum siap")
+
+    cache = SemanticCache(broken)
+    assert cache.lookup(QUESTION, kelas="4", theme="sains") == (None, None)
+    cache.store(QUESTION, "jawaban", kelas="4", theme="sains")
+
+    stats = cache.stats()
+    assert stats["errors"] == 2
+    assert stats["scopes"] == {}
@@ -0,0 +1,160 @@
+import os
+import threading
+import time
+
+import pytest
+
+from llm.prompt_cache import PromptCache
+from llm.singleflight import SingleFlight
+
+
+def test_concurrent_callers_share_one_call():
+    flight = SingleFlight()
+    started = threading.Event()
+    release = threading.Event()
+    calls = []
+
+    def slow():
+        calls.append(1)
+        started.set()
+        release.wait(5)
+        return "jawaban"
+
+    results = []
+    leader = threading.Thread(target=lambda: results.append(flight.do("chat", "k", slow)))
+    leader.start()
+    started.wait(5)
+    followers = [threading.Thread(target=lambda: results.append(flight.do("chat", "k", slow)))
+                 for _ in range(3)]
+    for t in followers:
+        t.start()
+    while flight.stats()["sites"]["chat"]["deduplicated"] < 3:
+        time.sleep(0.01)
+    release.set()
+    for t in [leader, *followers]:
+        t.join(5)
+
+    assert calls == [1]
+    assert results == ["jawaban"] * 4
+
+
+def test_leader_error_reaches_followers():
+    flight = SingleFlight()
+    started = threading.Event()
+    release = threading.Event()
+
+    def failing():
+        started.set()
+        release.wait(5)
+        raise RuntimeError("boom")
+
+    errors = []
+
+    def run():
+        try:
+            flight.do("chat", "k", failing)
+        except RuntimeError as e:
+            errors.append(e)
+
+    leader = threading.Thread(target=run)
+    leader.start()
+    started.wait(5)
+    follower = threading.Thread(target=run)
+    follower.start()
+    while flight.stats()["sites"]["chat"]["deduplicated"] < 1:
+        time.sleep(0.01)
+    release.set()
+    leader.join(5)
+    follower.join(5)
+
+    assert len(errors) == 2 and errors[0] is errors[1]
+
+
+def _shared_pair(tmp_path):
+    """Dua "worker": PromptCache + SingleFlight masing-masing, satu file sqlite."""
+    path = str(tmp_path / "prompt_cache.db")
+    cache_a, cache_b = PromptCache(sqlite_path=path), PromptCache(sqlite_path=path)
+    return (cache_a, SingleFlight(shared=cache_a, poll_ms=10)), (cache_b, SingleFlight(shared=cache_b, poll_ms=10))
+
+
+def test_follower_process_waits_for_leader_result(tmp_path):
+    (cache_a, flight_a), (cache_b, flight_b) = _shared_pair(tmp_path)
+    leader_in = threading.Event()
+    release = threading.Event()
+
+    def leader_fn():
+        leader_in.set()
+        release.wait(5)
+        cache_a.set("chat", "k", "dari leader")
+        return "dari leader"
+
+    def follower_fn():
+        raise AssertionError("worker kedua tidak boleh memanggil LLM")
+
+    results = {}
+    t = threading.Thread(target=lambda: results.update(a=flight_a.do("chat", "k", leader_fn)))
+    t.start()
+    leader_in.wait(5)
+    threading.Timer(0.05, release.set).start()
+    results["b"] = flight_b.do("chat", "k", follower_fn)
+    t.join(5)
+
+    assert results == {"a": "dari leader", "b": "dari leader"}
+    assert flight_b.stats()["sites"]["chat"]["deduplicated_shared"] == 1
+
+
+def test_lease_handed_off_when_leader_fails(tmp_path):
+    (cache_a, flight_a), (cache_b, flight_b) = _shared_pair(tmp_path)
+    leader_in = threading.Event()
+    release = threading.Event()
+
+    def leader_fn():
+        leader_in.set()
+        release.wait(5)
+        raise RuntimeError("LLM error")
+
+    def follower_fn():
+        cache_b.set("chat", "k", "dari follower")
+        return "dari follower"
+
+    errors = []
+
+    def run_leader():
+        try:
+            flight_a.do("chat", "k", leader_fn)
+        except RuntimeError as e:
+            errors.append(e)
+
+    t = threading.Thread(target=run_leader)
+    t.start()
+    leader_in.wait(5)
+    threading.Timer(0.05, release.set).start()
+    # leader gagal tanpa hasil → lease dilepas, worker kedua jalan sendiri
+    assert flight_b.do("chat", "k", follower_fn) == "dari follower"
+    t.join(5)
+
+    assert len(errors) == 1
+    assert flight_b.stats()["sites"]["chat"]["deduplicated_shared"] == 0
+
+
+def test_owner_is_bound_to_process():
+    flight = SingleFlight()
+    assert flight._owner.startswith(f"{os.getpid()}-")
+    assert SingleFlight()._owner != flight._owner
+
+
+@pytest.mark.skipif(not hasattr(os, "fork"), reason="butuh os.fork")
+def test_forked_worker_gets_own_owner():
+    flight = SingleFlight()
+    read_fd, write_fd = os.pipe()
+    pid = os.fork()
+    if pid == 0:
+        os.write(write_fd, flight._owner.encode())
+        os._exit(0)
+    os.waitpid(pid, 0)
+    child_owner = os.read(read_fd, 200).decode()
+    os.close(read_fd)
+    os.close(write_fd)
+
+    assert child_owner != flight._owner
+    assert child_owner.startswith(f"{pid}-")
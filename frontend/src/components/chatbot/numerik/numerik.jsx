@@ -4,6 +4,9 @@ import { useNavigate } from "react-router-dom";
 import { getProfile } from "../../../services/api";
 import "./numerik.css";
 
+// batas percobaan ulang otomatis saat bank soal sedang diisi (503)
+const MAX_SOAL_RETRY = 3;
+
 const NumerikChatbot = () => {
   const [name, setName] = useState("");
   const navigate = useNavigate();
@@ -14,6 +17,7 @@ const NumerikChatbot = () => {
   const [showSoal, setShowSoal] = useState(false);
   const [soal, setSoal] = useState(null);
   const [penjelasanSoal, setPenjelasanSoal] = useState(null);
+  const [soalInfo, setSoalInfo] = useState(null);
   const [sidebarVisible, setSidebarVisible] = useState(false);
   const [showPopup, setShowPopup] = useState(false);
   const [showUploadOptions, setShowUploadOptions] = useState(false);
@@ -91,7 +95,12 @@ const NumerikChatbot = () => {
       const response = await fetch("http://localhost:5000/chatbot/chat", {
         method: "POST",
         headers: { "Content-Type": "application/json" },
-        body: JSON.stringify({ message: input }),
+        // theme + user_id: scope cache jawaban per (kelas, tema) di server
+        body: JSON.stringify({
+          message: input,
+          theme,
+          user_id: localStorage.getItem("user_id"),
+        }),
       });
 
       const data = await response.json();
@@ -122,7 +131,7 @@ const NumerikChatbot = () => {
   };
 
   // ✅ Ambil soal baru
-  const handleSoalBaru = async () => {
+  const handleSoalBaru = async (attempt = 0) => {
     const userId = localStorage.getItem("user_id");
 
     if (!userId) {
@@ -136,11 +145,30 @@ const NumerikChatbot = () => {
         `http://localhost:5000/chatbot/get_question?theme=numerik&user_id=${userId}`
       );
 
+      // 🔹 Bank soal sedang diisi ulang di server (503 + Retry-After):
+      // tunggu sebentar lalu coba lagi otomatis
+      if (res.status === 503) {
+        const info = await res.json().catch(() => ({}));
+        const retryAfter = Number(res.headers.get("Retry-After")) || info.retry_after || 5;
+        setSoal(null);
+        setShowSoal(true);
+        setPenjelasanSoal(null);
+
+        if (attempt < MAX_SOAL_RETRY) {
+          setSoalInfo(`⏳ ${info.error || "Soal baru sedang disiapkan"}...`);
+          setTimeout(() => handleSoalBaru(attempt + 1), retryAfter * 1000);
+        } else {
+          setSoalInfo("⚠️ Soal belum tersedia, coba lagi beberapa saat lagi.");
+        }
+        return;
+      }
+
       if (!res.ok) {
         throw new Error(`Gagal mengambil soal (${res.status})`);
       }
 
       const data = await res.json();
+      setSoalInfo(null);
       setSoal(data);
       setShowSoal(true);
       setPenjelasanSoal(null);
@@ -397,7 +425,7 @@ const NumerikChatbot = () => {
         <div className="chatbot-main">
           <div className="numerik-header">
             <h2>Ruang Belajar - numerik</h2>
-            <button className="soal-btn" onClick={handleSoalBaru}>
+            <button className="soal-btn" onClick={() => handleSoalBaru()}>
               + Soal Baru
             </button>
           </div>
@@ -513,7 +541,7 @@ const NumerikChatbot = () => {
               )}
             </div>
           ) : (
-            <p>Klik tombol soal baru untuk mulai</p>
+            <p>{soalInfo || "Klik tombol soal baru untuk mulai"}</p>
           )}
         </div>
       </div>
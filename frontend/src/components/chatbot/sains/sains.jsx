@@ -4,6 +4,9 @@ import { useNavigate } from "react-router-dom";
 import { getProfile } from "../../../services/api";
 import "./sains.css";
 
+// batas percobaan ulang otomatis saat bank soal sedang diisi (503)
+const MAX_SOAL_RETRY = 3;
+
 const SainsChatbot = () => {
   const [name, setName] = useState("");
   const navigate = useNavigate();
@@ -14,6 +17,7 @@ const SainsChatbot = () => {
   const [showSoal, setShowSoal] = useState(false);
   const [soal, setSoal] = useState(null);
   const [penjelasanSoal, setPenjelasanSoal] = useState(null);
+  const [soalInfo, setSoalInfo] = useState(null);
   const theme ="sains";
 
   // ✅ Ambil profil user
@@ -87,7 +91,12 @@ const SainsChatbot = () => {
       const response = await fetch("http://localhost:5000/chatbot/chat", {
         method: "POST",
         headers: { "Content-Type": "application/json" },
-        body: JSON.stringify({ message: input }),
+        // theme + user_id: scope cache jawaban per (kelas, tema) di server
+        body: JSON.stringify({
+          message: input,
+          theme,
+          user_id: localStorage.getItem("user_id"),
+        }),
       });
 
       const data = await response.json();
@@ -118,13 +127,37 @@ const SainsChatbot = () => {
   };
 
   // ✅ Ambil soal baru
-  const handleSoalBaru = async () => {
+  const handleSoalBaru = async (attempt = 0) => {
     try {
       const userId = localStorage.getItem("user_id");
       const res = await fetch(
         `http://localhost:5000/chatbot/get_question?theme=sains&user_id=${userId}`
       );
+
+      // 🔹 Bank soal sedang diisi ulang di server (503 + Retry-After):
+      // tunggu sebentar lalu coba lagi otomatis
+      if (res.status === 503) {
+        const info = await res.json().catch(() => ({}));
+        const retryAfter = Number(res.headers.get("Retry-After")) || info.retry_after || 5;
+        setSoal(null);
+        setShowSoal(true);
+        setPenjelasanSoal(null);
+
+        if (attempt < MAX_SOAL_RETRY) {
+          setSoalInfo(`⏳ ${info.error || "Soal baru sedang disiapkan"}...`);
+          setTimeout(() => handleSoalBaru(attempt + 1), retryAfter * 1000);
+        } else {
+          setSoalInfo("⚠️ Soal belum tersedia, coba lagi beberapa saat lagi.");
+        }
+        return;
+      }
+
+      if (!res.ok) {
+        throw new Error(`Gagal mengambil soal (${res.status})`);
+      }
+
       const data = await res.json();
+      setSoalInfo(null);
       setSoal(data);
       setShowSoal(true);
       setPenjelasanSoal(null);
@@ -305,7 +338,7 @@ const SainsChatbot = () => {
         <div className="chatbot-main">
           <div className="sains-header">
             <h2>Ruang Belajar - sains</h2>
-            <button className="soal-btn" onClick={handleSoalBaru}>
+            <button className="soal-btn" onClick={() => handleSoalBaru()}>
               + Soal Baru
             </button>
           </div>
@@ -432,7 +465,7 @@ const SainsChatbot = () => {
               )}
             </div>
           ) : (
-            <p>Klik tombol soal baru untuk mulai</p>
+            <p>{soalInfo || "Klik tombol soal baru untuk mulai"}</p>
           )}
         </div>
       </div>